@@ -0,0 +1,368 @@
+"""
+Index and partitioning advisor for a seeded database.
+
+Reads pg_stat_user_tables (and pg_stat_statements when the extension is
+installed) to show where sequential scans happen, proposes the missing
+indexes from RECOMMENDED_INDEXES and monthly range partitioning of
+invoices by "CreateDate", and with --apply creates them and re-runs the
+querybench workload to print before/after latency.
+
+The indexes are also declared with @@index in schema.prisma under the same
+names, so `prisma db push` keeps them. Partitioning is not expressible in
+Prisma: the primary key of the partitioned invoices table becomes
+("ID_invoice", "CreateDate") while schema.prisma keeps @id on "ID_invoice",
+so run --partition after `prisma db push`, not before it, and do not run
+`prisma db push` against a partitioned database afterwards: it would try to
+change the primary key back. Other indexes and triggers on invoices (such
+as the aggregates.py delta triggers) are recreated on the partitioned
+table; unique indexes and foreign keys pointing at invoices make
+--partition refuse to run.
+
+    python prisma/advisor.py                      # chỉ đề xuất
+    python prisma/advisor.py --apply --partition  # áp dụng và đo lại
+"""
+import argparse
+from dataclasses import dataclass
+from datetime import date
+
+from db import connect
+import querybench
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    table: str
+    columns: tuple
+    reason: str
+
+    @property
+    def name(self):
+        # Trùng với tên mặc định Prisma sinh cho @@index
+        bare = [column.split()[0].strip('"') for column in self.columns]
+        return f'{self.table}_{"_".join(bare)}_idx'
+
+    def create_sql(self, concurrently=True):
+        return (f'CREATE INDEX {"CONCURRENTLY " if concurrently else ""}IF NOT EXISTS '
+                f'"{self.name}" ON {self.table} ({", ".join(self.columns)})')
+
+
+RECOMMENDED_INDEXES = [
+    IndexSpec('invoices', ('"ID_resident"', '"CreateDate" DESC'),
+              'InvoiceService.getAllByResidentId lọc theo cư dân, sắp xếp theo ngày tạo'),
+    IndexSpec('invoices', ('"ID_service"', '"CreateDate" DESC'),
+              'InvoiceService.getAllByServiceId lọc theo khoản thu, sắp xếp theo ngày tạo'),
+    IndexSpec('invoices', ('"CreateDate" DESC',),
+              'InvoiceService.findAll sắp xếp theo ngày tạo'),
+    IndexSpec('complain', ('"ID_resident"',), 'ComplainService.findByResident'),
+    IndexSpec('shifts', ('"ID_guard"',), 'khóa ngoại tới residents'),
+    IndexSpec('residents', ('"ID_apartment"',), 'khóa ngoại tới apartments'),
+    IndexSpec('resident_notifications', ('"Resident_ID"',),
+              'ResidentNotificationService.getNotificationsByResident'),
+    IndexSpec('services', ('month',), 'tổng phí theo tháng'),
+]
+
+PARTITION_MIN_ROWS = 1_000_000
+
+
+def table_stats(cur):
+    cur.execute(
+        """
+        SELECT relname, n_live_tup, seq_scan, seq_tup_read, COALESCE(idx_scan, 0)
+        FROM pg_stat_user_tables
+        ORDER BY seq_tup_read DESC
+        """
+    )
+    return [{'table': table, 'rows': rows, 'seq_scan': seq_scan, 'seq_tup_read': tup_read,
+             'idx_scan': idx_scan}
+            for table, rows, seq_scan, tup_read, idx_scan in cur.fetchall()]
+
+
+def top_statements(cur, limit=10):
+    """Slowest statements by total time, or None without pg_stat_statements."""
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+    if cur.fetchone() is None:
+        return None
+    cur.execute("SELECT current_setting('server_version_num')::int")
+    total = 'total_exec_time' if cur.fetchone()[0] >= 130000 else 'total_time'
+    cur.execute(
+        f"""
+        SELECT query, calls, {total}, {total} / GREATEST(calls, 1)
+        FROM pg_stat_statements
+        WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+        ORDER BY {total} DESC
+        LIMIT %s
+        """,
+        (limit,),
+    )
+    return [{'query': ' '.join(query.split()), 'calls': calls, 'total_ms': total_ms,
+             'mean_ms': mean_ms}
+            for query, calls, total_ms, mean_ms in cur.fetchall()]
+
+
+def existing_indexes(cur):
+    cur.execute("SELECT indexname FROM pg_indexes WHERE schemaname = 'public'")
+    return {row[0] for row in cur.fetchall()}
+
+
+def is_partitioned(cur, table):
+    cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", (table,))
+    row = cur.fetchone()
+    return bool(row and row[0])
+
+
+def missing_indexes(cur):
+    present = existing_indexes(cur)
+    return [spec for spec in RECOMMENDED_INDEXES if spec.name not in present]
+
+
+def create_indexes(cur, specs):
+    for spec in specs:
+        # CREATE INDEX CONCURRENTLY không dùng được trên bảng phân vùng
+        cur.execute(spec.create_sql(concurrently=not is_partitioned(cur, spec.table)))
+        print(f'   ✓ {spec.name}')
+
+
+def month_starts(first, last):
+    """First day of every month from `first` to `last` inclusive."""
+    year, month = first.year, first.month
+    while (year, month) <= (last.year, last.month):
+        yield date(year, month, 1)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _next_month(day):
+    return date(day.year + 1, 1, 1) if day.month == 12 else date(day.year, day.month + 1, 1)
+
+
+def _add_months(day, months):
+    for _ in range(months):
+        day = _next_month(day)
+    return day
+
+
+def ensure_partitions(cur, first, last):
+    """
+    Create missing monthly invoices partitions covering [first, last]. Rows
+    of that month already in invoices_default are moved into the new
+    partition before it is attached; run this inside a transaction.
+    """
+    cur.execute("SELECT to_regclass('invoices_default')")
+    has_default = cur.fetchone()[0] is not None
+    created = 0
+    for start in month_starts(first, last):
+        name = f'invoices_{start:%Y_%m}'
+        cur.execute('SELECT to_regclass(%s)', (name,))
+        if cur.fetchone()[0] is not None:
+            continue
+        bounds = f"FROM ('{start}') TO ('{_next_month(start)}')"
+        if not has_default:
+            cur.execute(f'CREATE TABLE {name} PARTITION OF invoices FOR VALUES {bounds}')
+        else:
+            # CREATE ... PARTITION OF sẽ lỗi nếu invoices_default đã có dòng của tháng này.
+            # Xóa trực tiếp trên phân vùng nên trigger cấp câu lệnh của invoices không chạy
+            cur.execute(f'CREATE TABLE {name} (LIKE invoices INCLUDING DEFAULTS)')
+            cur.execute(
+                f"""
+                WITH moved AS (
+                    DELETE FROM invoices_default
+                    WHERE "CreateDate" >= %s AND "CreateDate" < %s
+                    RETURNING *
+                )
+                INSERT INTO {name} SELECT * FROM moved
+                """,
+                (start, _next_month(start)),
+            )
+            cur.execute(f'ALTER TABLE invoices ATTACH PARTITION {name} FOR VALUES {bounds}')
+        created += 1
+    return created
+
+
+def invoices_dependents(cur):
+    """
+    Indexes and triggers on invoices that partition_invoices recreates,
+    and objects it cannot carry over (returned as `blockers`).
+    """
+    cur.execute(
+        """
+        SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE i.indrelid = 'invoices'::regclass AND NOT i.indisprimary
+        ORDER BY 1
+        """
+    )
+    indexes, blockers = [], []
+    for name, definition, unique in cur.fetchall():
+        if unique:
+            # Trên bảng phân vùng, index unique phải chứa "CreateDate"
+            blockers.append(f'index unique {name}')
+        else:
+            indexes.append(definition)
+    cur.execute(
+        """
+        SELECT tgname, pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = 'invoices'::regclass AND NOT tgisinternal
+        ORDER BY 1
+        """
+    )
+    triggers = [definition for _, definition in cur.fetchall()]
+    cur.execute(
+        """
+        SELECT conname, conrelid::regclass FROM pg_constraint
+        WHERE confrelid = 'invoices'::regclass AND contype = 'f'
+        """
+    )
+    blockers.extend(f'khóa ngoại {name} từ {table}' for name, table in cur.fetchall())
+    return indexes, triggers, blockers
+
+
+def partition_invoices(conn, months_ahead=3):
+    """
+    Rebuild invoices as a table partitioned by month of "CreateDate", in one
+    transaction. Constraints, indexes and triggers keep their names and
+    definitions; the primary key gains "CreateDate" because PostgreSQL
+    requires the partition key in it. Refuses (ValueError) when invoices has
+    unique indexes or incoming foreign keys, which cannot be carried over.
+    """
+    with conn.cursor() as cur:
+        indexes, triggers, blockers = invoices_dependents(cur)
+        if blockers:
+            raise ValueError('Không thể phân vùng invoices, cần xử lý trước: '
+                             + ', '.join(blockers))
+        cur.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = 'invoices'::regclass AND contype = 'f'
+            """
+        )
+        foreign_keys = cur.fetchall()
+        cur.execute('SELECT MIN("CreateDate"), MAX("CreateDate") FROM invoices')
+        oldest, newest = cur.fetchone()
+        today = date.today()
+        first = (oldest or today).replace(day=1)
+        last = _add_months(max(newest.date() if newest else today, today), months_ahead)
+
+        cur.execute('ALTER TABLE invoices RENAME TO invoices_unpartitioned')
+        cur.execute('CREATE TABLE invoices (LIKE invoices_unpartitioned INCLUDING DEFAULTS) '
+                    'PARTITION BY RANGE ("CreateDate")')
+        partitions = ensure_partitions(cur, first, last)
+        cur.execute('CREATE TABLE invoices_default PARTITION OF invoices DEFAULT')
+        cur.execute('INSERT INTO invoices SELECT * FROM invoices_unpartitioned')
+        moved = cur.rowcount
+        cur.execute('DROP TABLE invoices_unpartitioned')
+
+        cur.execute('ALTER TABLE invoices ADD CONSTRAINT invoices_pkey '
+                    'PRIMARY KEY ("ID_invoice", "CreateDate")')
+        for name, definition in foreign_keys:
+            cur.execute(f'ALTER TABLE invoices ADD CONSTRAINT "{name}" {definition}')
+        # Định nghĩa lấy trước khi đổi tên nên vẫn trỏ tới "invoices"; index cũ đã
+        # bị xóa cùng invoices_unpartitioned nên tên không trùng
+        for definition in indexes:
+            cur.execute(definition)
+        for spec in RECOMMENDED_INDEXES:
+            if spec.table == 'invoices':
+                cur.execute(spec.create_sql(concurrently=False))
+        # Tạo trigger sau khi chuyển dữ liệu để việc chuyển không sinh delta (aggregates.py)
+        for definition in triggers:
+            cur.execute(definition)
+    conn.commit()
+    return partitions, moved
+
+
+def print_inspection(stats, statements):
+    print('\n🔎 pg_stat_user_tables (theo số dòng đọc tuần tự):')
+    for row in stats:
+        print(f'   {row["table"]:<24} {row["rows"]:>12,} dòng  seq_scan {row["seq_scan"]:>8,}  '
+              f'seq_tup_read {row["seq_tup_read"]:>14,}  idx_scan {row["idx_scan"]:>10,}')
+    if statements is None:
+        print('\nℹ️  pg_stat_statements chưa được cài, bỏ qua thống kê theo câu lệnh')
+        return
+    print('\n🐢 Câu lệnh tốn thời gian nhất (pg_stat_statements):')
+    for row in statements:
+        print(f'   {row["total_ms"]:>10,.0f}ms  {row["calls"]:>8,} lần  '
+              f'{row["mean_ms"]:>8.1f}ms/lần  {row["query"][:90]}')
+
+
+def print_proposals(missing, partition):
+    print('\n💡 Đề xuất:')
+    if not missing and not partition:
+        print('   Không có đề xuất mới')
+    for spec in missing:
+        print(f'   {spec.create_sql()};  -- {spec.reason}')
+    if partition:
+        print('   -- phân vùng invoices theo tháng của "CreateDate" (--partition)')
+
+
+def print_comparison(before, after):
+    print(f'\n{"truy vấn":<36} {"trước":>10} {"sau":>10} {"x":>7}')
+    for name, old in before['queries'].items():
+        new = after['queries'].get(name, {})
+        if 'median_ms' not in old or 'median_ms' not in new:
+            continue
+        speedup = old['median_ms'] / new['median_ms'] if new['median_ms'] else float('inf')
+        print(f'{name:<36} {old["median_ms"]:>8.1f}ms {new["median_ms"]:>8.1f}ms '
+              f'{speedup:>6.1f}x')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Đề xuất và áp dụng index/phân vùng')
+    parser.add_argument('--apply', action='store_true',
+                        help='Tạo các index còn thiếu và đo lại workload')
+    parser.add_argument('--partition', action='store_true',
+                        help='Phân vùng invoices theo tháng (cần --apply)')
+    parser.add_argument('--months-ahead', type=int, default=3,
+                        help='Số tháng tương lai tạo sẵn phân vùng')
+    parser.add_argument('--repeat', type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            stats = table_stats(cur)
+            print_inspection(stats, top_statements(cur))
+            missing = missing_indexes(cur)
+            invoice_rows = next((row['rows'] for row in stats if row['table'] == 'invoices'), 0)
+            partitioned = is_partitioned(cur, 'invoices')
+            suggest_partition = not partitioned and (args.partition
+                                                     or invoice_rows >= PARTITION_MIN_ROWS)
+            print_proposals(missing, suggest_partition)
+            if not args.apply:
+                return
+
+            before = querybench.run_suite(cur, args.repeat)
+
+            if args.partition and not partitioned:
+                print('\n🧩 Đang phân vùng invoices...')
+                conn.autocommit = False
+                partitions, moved = partition_invoices(conn, args.months_ahead)
+                conn.autocommit = True
+                print(f'   ✓ {partitions} phân vùng tháng, {moved:,} hóa đơn được chuyển')
+            elif partitioned:
+                today = date.today()
+                conn.autocommit = False
+                created = ensure_partitions(cur, today.replace(day=1),
+                                            _add_months(today, args.months_ahead))
+                conn.commit()
+                conn.autocommit = True
+                if created:
+                    print(f'   ✓ Thêm {created} phân vùng tháng')
+
+            if missing:
+                print('\n🛠️  Đang tạo index...')
+                create_indexes(cur, missing_indexes(cur))
+
+            after = querybench.run_suite(cur, args.repeat)
+            print_comparison(before, after)
+    except Exception:
+        if not conn.autocommit:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
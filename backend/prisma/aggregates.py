@@ -0,0 +1,348 @@
+"""
+Precomputed invoice aggregates for the accountant dashboards.
+
+Two summary tables (declared in schema.prisma so Prisma can read them):
+    invoice_month_summary  (month, service_id, status) -> count, money
+    apartment_balances     apartment -> outstanding money of unpaid/pending
+                           invoices and how many there are
+
+`install` adds statement-level triggers with transition tables on invoices.
+Every INSERT/UPDATE/DELETE, including COPY, appends signed rows
+(-1 old, +1 new) to invoice_deltas in one set-based insert per statement,
+and TRUNCATE empties the summaries. Each delta records the resident's
+apartment at the time of the change, so deleting the resident afterwards
+(ResidentService.remove) still debits the right apartment; moving a resident
+to another apartment moves their invoices' deltas with them. `refresh` folds pending deltas into the
+summaries and deletes them, so the cost follows the number of changed
+invoices, not the table size. It runs in one REPEATABLE READ transaction,
+so deltas committed meanwhile wait for the next run.
+
+`refresh --full` recomputes from invoices (TRUNCATE + INSERT, blocks
+readers); `--full --concurrently` computes into a temp table and merges only
+the differences, so dashboards keep reading the old rows until commit.
+
+    python prisma/aggregates.py install
+    python prisma/aggregates.py refresh
+    python prisma/aggregates.py report --months 6
+"""
+import argparse
+import time
+
+from psycopg2.extensions import ISOLATION_LEVEL_REPEATABLE_READ
+
+from db import connect
+import prisma_schema
+
+
+OPEN_STATUSES = ('unpaid', 'pending')
+
+INSTALL_SQL = [
+    """
+    CREATE OR REPLACE FUNCTION invoice_deltas_capture() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        -- Lấy căn hộ ngay lúc thay đổi: cư dân có thể bị xóa hoặc chuyển căn trước refresh
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            INSERT INTO invoice_deltas
+                (service_id, resident_id, apartment_id, status, money, sign)
+            SELECT o."ID_service", o."ID_resident", r."ID_apartment", o.status, o."Money", -1
+            FROM old_rows o
+            LEFT JOIN residents r ON r."ID_Resident" = o."ID_resident";
+        END IF;
+        IF TG_OP IN ('UPDATE', 'INSERT') THEN
+            INSERT INTO invoice_deltas
+                (service_id, resident_id, apartment_id, status, money, sign)
+            SELECT n."ID_service", n."ID_resident", r."ID_apartment", n.status, n."Money", 1
+            FROM new_rows n
+            LEFT JOIN residents r ON r."ID_Resident" = n."ID_resident";
+        END IF;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION resident_move_capture() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        -- Cư dân chuyển căn: hóa đơn của họ rời căn cũ (-1) và sang căn mới (+1)
+        INSERT INTO invoice_deltas
+            (service_id, resident_id, apartment_id, status, money, sign)
+        SELECT i."ID_service", i."ID_resident", m.apartment_id, i.status, i."Money", m.sign
+        FROM old_rows o
+        JOIN new_rows n ON n."ID_Resident" = o."ID_Resident"
+        JOIN invoices i ON i."ID_resident" = o."ID_Resident"
+        CROSS JOIN LATERAL (VALUES (o."ID_apartment", -1), (n."ID_apartment", 1))
+            AS m(apartment_id, sign)
+        WHERE o."ID_apartment" IS DISTINCT FROM n."ID_apartment";
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION invoice_aggregates_truncate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM invoice_deltas;
+        DELETE FROM invoice_month_summary;
+        DELETE FROM apartment_balances;
+        RETURN NULL;
+    END $$
+    """,
+    'DROP TRIGGER IF EXISTS invoices_deltas_insert ON invoices',
+    'DROP TRIGGER IF EXISTS invoices_deltas_update ON invoices',
+    'DROP TRIGGER IF EXISTS invoices_deltas_delete ON invoices',
+    'DROP TRIGGER IF EXISTS invoices_aggregates_truncate ON invoices',
+    'DROP TRIGGER IF EXISTS residents_invoice_move ON residents',
+    """CREATE TRIGGER invoices_deltas_insert AFTER INSERT ON invoices
+       REFERENCING NEW TABLE AS new_rows
+       FOR EACH STATEMENT EXECUTE FUNCTION invoice_deltas_capture()""",
+    """CREATE TRIGGER invoices_deltas_update AFTER UPDATE ON invoices
+       REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+       FOR EACH STATEMENT EXECUTE FUNCTION invoice_deltas_capture()""",
+    """CREATE TRIGGER invoices_deltas_delete AFTER DELETE ON invoices
+       REFERENCING OLD TABLE AS old_rows
+       FOR EACH STATEMENT EXECUTE FUNCTION invoice_deltas_capture()""",
+    """CREATE TRIGGER invoices_aggregates_truncate AFTER TRUNCATE ON invoices
+       FOR EACH STATEMENT EXECUTE FUNCTION invoice_aggregates_truncate()""",
+    # Trigger có transition table không nhận danh sách cột, nên lọc trong hàm
+    """CREATE TRIGGER residents_invoice_move AFTER UPDATE ON residents
+       REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+       FOR EACH STATEMENT EXECUTE FUNCTION resident_move_capture()""",
+]
+
+# Nguồn dữ liệu của mỗi bảng tổng hợp, dùng chung cho refresh và rebuild
+MONTH_SUMMARY_SOURCE = """
+    SELECT s.month, d.service_id, d.status, SUM(d.sign)::int, SUM(d.sign * d.money)
+    FROM {source} d
+    JOIN services s ON s."ID_khoan_thu" = d.service_id
+    GROUP BY 1, 2, 3
+"""
+BALANCE_SOURCE = """
+    SELECT d.apartment_id, SUM(d.sign * d.money), SUM(d.sign)::int
+    FROM {source} d
+    WHERE d.status IN %(open)s AND d.apartment_id IS NOT NULL
+    GROUP BY 1
+"""
+# Xem toàn bộ invoices như các delta +1 để rebuild dùng lại cùng câu truy vấn
+INVOICES_AS_DELTAS = """(SELECT i."ID_service" AS service_id, i."ID_resident" AS resident_id,
+                                r."ID_apartment" AS apartment_id, i.status, i."Money" AS money,
+                                1 AS sign
+                         FROM invoices i
+                         LEFT JOIN residents r ON r."ID_Resident" = i."ID_resident")"""
+
+SCHEMA = prisma_schema.load()
+MONTH_SUMMARY_COLUMNS = ', '.join(SCHEMA.columns('invoice_month_summary', 'month', 'serviceId',
+                                                 'status', 'invoiceCount', 'totalMoney'))
+BALANCE_COLUMNS = ', '.join(SCHEMA.columns('apartment_balances', 'apartmentId', 'outstanding',
+                                           'openInvoices'))
+# (bảng, cột, nguồn, khóa, cột giá trị) của từng bảng tổng hợp
+SUMMARIES = (
+    ('invoice_month_summary', MONTH_SUMMARY_COLUMNS, MONTH_SUMMARY_SOURCE,
+     ('month', 'service_id', 'status'), ('invoice_count', 'total_money')),
+    ('apartment_balances', BALANCE_COLUMNS, BALANCE_SOURCE,
+     ('apartment_id',), ('outstanding', 'open_invoices')),
+)
+
+
+def install(cur):
+    for statement in INSTALL_SQL:
+        cur.execute(statement)
+
+
+def apply_deltas(cur):
+    """Fold every visible delta into the summaries; returns the number consumed."""
+    cur.execute(
+        f"""
+        INSERT INTO invoice_month_summary ({MONTH_SUMMARY_COLUMNS})
+        {MONTH_SUMMARY_SOURCE.format(source='invoice_deltas')}
+        ON CONFLICT (month, service_id, status) DO UPDATE SET
+            invoice_count = invoice_month_summary.invoice_count + EXCLUDED.invoice_count,
+            total_money = invoice_month_summary.total_money + EXCLUDED.total_money,
+            updated_at = NOW()
+        """
+    )
+    cur.execute(
+        f"""
+        INSERT INTO apartment_balances ({BALANCE_COLUMNS})
+        {BALANCE_SOURCE.format(source='invoice_deltas')}
+        ON CONFLICT (apartment_id) DO UPDATE SET
+            outstanding = apartment_balances.outstanding + EXCLUDED.outstanding,
+            open_invoices = apartment_balances.open_invoices + EXCLUDED.open_invoices,
+            updated_at = NOW()
+        """,
+        {'open': OPEN_STATUSES},
+    )
+    cur.execute('DELETE FROM invoice_month_summary WHERE invoice_count = 0')
+    cur.execute('DELETE FROM apartment_balances WHERE open_invoices = 0')
+    cur.execute('DELETE FROM invoice_deltas')
+    return cur.rowcount
+
+
+def rebuild(cur):
+    """Recompute both summaries from invoices, replacing their contents."""
+    cur.execute('DELETE FROM invoice_deltas')
+    cur.execute('TRUNCATE invoice_month_summary, apartment_balances')
+    cur.execute(f'INSERT INTO invoice_month_summary ({MONTH_SUMMARY_COLUMNS}) '
+                f'{MONTH_SUMMARY_SOURCE.format(source=INVOICES_AS_DELTAS)}')
+    cur.execute(f'INSERT INTO apartment_balances ({BALANCE_COLUMNS}) '
+                f'{BALANCE_SOURCE.format(source=INVOICES_AS_DELTAS)}',
+                {'open': OPEN_STATUSES})
+
+
+def rebuild_concurrently(cur):
+    """Like rebuild(), but only rows that differ are written, under row locks."""
+    cur.execute('DELETE FROM invoice_deltas')
+    for table, columns, source, keys, values in SUMMARIES:
+        fresh = f'_fresh_{table}'
+        cur.execute(f'CREATE TEMP TABLE {fresh} ({columns}) ON COMMIT DROP AS '
+                    f'{source.format(source=INVOICES_AS_DELTAS)}',
+                    {'open': OPEN_STATUSES})
+        key_list = ', '.join(keys)
+        changed = ' OR '.join(f'{table}.{value} IS DISTINCT FROM EXCLUDED.{value}'
+                              for value in values)
+        cur.execute(
+            f"""
+            INSERT INTO {table} ({columns}) SELECT {columns} FROM {fresh}
+            ON CONFLICT ({key_list}) DO UPDATE SET
+                {', '.join(f'{value} = EXCLUDED.{value}' for value in values)},
+                updated_at = NOW()
+            WHERE {changed}
+            """
+        )
+        join = ' AND '.join(f'f.{key} = t.{key}' for key in keys)
+        cur.execute(f'DELETE FROM {table} t WHERE NOT EXISTS '
+                    f'(SELECT 1 FROM {fresh} f WHERE {join})')
+
+
+def refresh(conn, full=False, concurrently=False):
+    """Run one refresh in a single REPEATABLE READ transaction."""
+    conn.set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ, autocommit=False)
+    try:
+        with conn.cursor() as cur:
+            if not full:
+                consumed = apply_deltas(cur)
+            elif concurrently:
+                rebuild_concurrently(cur)
+                consumed = None
+            else:
+                rebuild(cur)
+                consumed = None
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return consumed
+
+
+def stale_rows(cur):
+    """Number of summary rows that differ from a fresh computation over invoices."""
+    stale = 0
+    for table, columns, source, _, _ in SUMMARIES:
+        fresh = source.format(source=INVOICES_AS_DELTAS)
+        cur.execute(
+            f"""
+            SELECT COUNT(*) FROM (
+                (SELECT {columns} FROM {table} EXCEPT {fresh})
+                UNION ALL
+                ({fresh} EXCEPT SELECT {columns} FROM {table})
+            ) d
+            """,
+            {'open': OPEN_STATUSES},
+        )
+        stale += cur.fetchone()[0]
+    return stale
+
+
+def verify(conn):
+    """
+    Fold pending deltas, then compare the summaries with a fresh rebuild and
+    rebuild them if they differ (e.g. after a bulk load with triggers off).
+    Returns the number of rows that differed.
+    """
+    conn.set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ, autocommit=False)
+    try:
+        with conn.cursor() as cur:
+            apply_deltas(cur)
+            stale = stale_rows(cur)
+            if stale:
+                rebuild(cur)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return stale
+
+
+def monthly_report(cur, months=12):
+    """(month, status, invoices, money) for the latest `months` months."""
+    cur.execute(
+        """
+        SELECT month, status, SUM(invoice_count), SUM(total_money)
+        FROM invoice_month_summary
+        WHERE month IN (SELECT DISTINCT month FROM invoice_month_summary
+                        ORDER BY month DESC LIMIT %s)
+        GROUP BY month, status
+        ORDER BY month, status
+        """,
+        (months,),
+    )
+    return cur.fetchall()
+
+
+def debt_report(cur, limit=10):
+    cur.execute(
+        """
+        SELECT a."Name", b.outstanding, b.open_invoices
+        FROM apartment_balances b
+        JOIN apartments a ON a."ID_Apartment" = b.apartment_id
+        ORDER BY b.outstanding DESC
+        LIMIT %s
+        """,
+        (limit,),
+    )
+    return cur.fetchall()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Bảng tổng hợp doanh thu/công nợ')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('install', help='Cài trigger ghi delta trên invoices/residents và dựng lại tổng hợp')
+    refresh_parser = sub.add_parser('refresh', help='Cập nhật bảng tổng hợp')
+    refresh_parser.add_argument('--full', action='store_true',
+                                help='Tính lại toàn bộ từ invoices')
+    refresh_parser.add_argument('--concurrently', action='store_true',
+                                help='Với --full: chỉ ghi phần khác biệt, không chặn người đọc')
+    report = sub.add_parser('report', help='In doanh thu theo tháng và căn hộ nợ nhiều nhất')
+    report.add_argument('--months', type=int, default=12)
+    report.add_argument('--top', type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect()
+    try:
+        started = time.perf_counter()
+        if args.command == 'install':
+            with conn.cursor() as cur:
+                install(cur)
+            refresh(conn, full=True)
+            print(f'✅ Đã cài trigger và dựng bảng tổng hợp trong '
+                  f'{time.perf_counter() - started:.2f}s')
+        elif args.command == 'refresh':
+            consumed = refresh(conn, args.full, args.concurrently)
+            detail = 'tính lại toàn bộ' if consumed is None else f'{consumed:,} delta'
+            print(f'✅ Đã cập nhật bảng tổng hợp ({detail}) trong '
+                  f'{time.perf_counter() - started:.2f}s')
+        else:
+            with conn.cursor() as cur:
+                print('📊 Doanh thu theo tháng:')
+                for month, status, count, money in monthly_report(cur, args.months):
+                    print(f'   {month} {status:<8} {count:>10,} hóa đơn {money:>18,.0f} VNĐ')
+                print('\n💸 Căn hộ nợ nhiều nhất:')
+                for name, outstanding, open_invoices in debt_report(cur, args.top):
+                    print(f'   {name:<10} {outstanding:>14,.0f} VNĐ ({open_invoices} hóa đơn)')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Monthly billing run: split every Service of a month across apartments and
+write all resulting invoices in one COPY.
+
+Each service is allocated by one of three methods:
+    area       proportional to apartments.area
+    headcount  proportional to the number of residents in the apartment
+    flat       equal share per apartment
+
+Shares are computed for all services at once as a (services x apartments)
+NumPy matrix and rounded to whole VNĐ with the largest-remainder method, so
+the invoices of a service always add up to its totalAmount. Invoices go to
+the apartment owner (apartments."ID_owner").
+
+    python prisma/billing.py 2024-11
+    python prisma/billing.py 2024-11 --method flat --dry-run
+"""
+import argparse
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+
+from db import connect
+from loader import copy_rows
+import prisma_schema
+
+
+METHODS = ('area', 'headcount', 'flat')
+
+# Cách phân bổ mặc định theo tên phí; phí không có trong bảng dùng DEFAULT_METHOD
+SERVICE_METHODS = {
+    'Phí thuê': 'area',
+    'Phí nhà ở': 'area',
+    'Phí dịch vụ': 'area',
+    'Phí điện': 'headcount',
+    'Phí nước': 'headcount',
+    'Phí vệ sinh': 'headcount',
+    'Phí gửi xe': 'flat',
+}
+DEFAULT_METHOD = 'flat'
+
+BILLING_COLUMNS = prisma_schema.load().columns('invoices', 'id', 'serviceId', 'residentId',
+                                               'name', 'money', 'status', 'createdAt')
+
+
+@dataclass
+class Apartments:
+    owner_ids: list
+    owner_names: list
+    area: np.ndarray
+    headcount: np.ndarray
+
+    def __len__(self):
+        return len(self.owner_ids)
+
+    def weights(self, method):
+        if method == 'area':
+            return self.area
+        if method == 'headcount':
+            return self.headcount
+        if method == 'flat':
+            return np.ones(len(self))
+        raise ValueError(f'Unknown allocation method: {method}')
+
+
+@dataclass
+class Services:
+    ids: list
+    names: list
+    totals: np.ndarray
+    methods: list
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_apartments(cur):
+    """Billable apartments: those whose owner exists in residents."""
+    cur.execute(
+        """
+        SELECT o."ID_Resident", o.name, a.area,
+               (SELECT COUNT(*) FROM residents r WHERE r."ID_apartment" = a."ID_Apartment")
+        FROM apartments a
+        JOIN residents o ON o."ID_Resident" = a."ID_owner"
+        ORDER BY a."Name"
+        """
+    )
+    rows = cur.fetchall()
+    return Apartments(
+        owner_ids=[row[0] for row in rows],
+        owner_names=[row[1] for row in rows],
+        area=np.array([row[2] for row in rows], dtype=float),
+        headcount=np.array([row[3] for row in rows], dtype=float),
+    )
+
+
+def load_services(cur, month, method=None):
+    """Services of `month` that have no invoices yet, so a re-run is a no-op."""
+    cur.execute(
+        """
+        SELECT s."ID_khoan_thu", s.name, s."totalAmount"
+        FROM services s
+        WHERE s.month = %s
+          AND NOT EXISTS (SELECT 1 FROM invoices i WHERE i."ID_service" = s."ID_khoan_thu")
+        ORDER BY s."ID_khoan_thu"
+        """,
+        (month,),
+    )
+    rows = cur.fetchall()
+    return Services(
+        ids=[row[0] for row in rows],
+        names=[row[1] for row in rows],
+        totals=np.array([row[2] for row in rows], dtype=float),
+        methods=[method or SERVICE_METHODS.get(row[1], DEFAULT_METHOD) for row in rows],
+    )
+
+
+def allocate(totals, weights):
+    """
+    Split each totals[s] across weights[s, :] in whole units.
+    Returns an int64 (services x apartments) matrix whose rows sum to
+    round(totals). Rows with zero total weight fall back to equal shares.
+    """
+    totals = np.rint(np.asarray(totals, dtype=float))
+    weights = np.asarray(weights, dtype=float)
+    sums = weights.sum(axis=1, keepdims=True)
+    weights = np.where(sums > 0, weights, 1.0)
+    sums = weights.sum(axis=1, keepdims=True)
+
+    raw = totals[:, None] * weights / sums
+    shares = np.floor(raw)
+    remainder = (totals - shares.sum(axis=1)).astype(np.int64)
+
+    # Largest remainder: cộng 1 cho `remainder` căn hộ có phần lẻ lớn nhất
+    order = np.argsort(shares - raw, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(order.shape[1]), order.shape),
+                      axis=1)
+    return (shares + (ranks < remainder[:, None])).astype(np.int64)
+
+
+def billing_matrix(services, apartments):
+    weights = np.stack([apartments.weights(method) for method in services.methods])
+    return allocate(services.totals, weights)
+
+
+def invoice_rows(month, services, apartments, shares, created=None, new_id=None):
+    created = created or datetime.now()
+    new_id = new_id or (lambda: str(uuid.uuid4()))
+    for s, (service_id, service_name) in enumerate(zip(services.ids, services.names)):
+        for a, money in enumerate(shares[s].tolist()):
+            yield (new_id(), service_id, apartments.owner_ids[a],
+                   f'HĐ {service_name} tháng {month} - {apartments.owner_names[a]}',
+                   float(money), 'unpaid', created)
+
+
+def run_billing(cur, month, method=None, dry_run=False, created=None, new_id=None):
+    """
+    Bill every apartment for `month`; returns (services, apartments, shares, stats).
+    `created` and `new_id` fix the invoice timestamp and ids (seed.py --deterministic).
+    """
+    apartments = load_apartments(cur)
+    services = load_services(cur, month, method)
+    if not len(services) or not len(apartments):
+        return services, apartments, None, None
+
+    shares = billing_matrix(services, apartments)
+    stats = None
+    if not dry_run:
+        stats = copy_rows(cur, 'invoices', BILLING_COLUMNS,
+                          invoice_rows(month, services, apartments, shares, created, new_id))
+    return services, apartments, shares, stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Tạo hóa đơn hàng tháng cho mọi căn hộ')
+    parser.add_argument('month', help='Tháng cần lập hóa đơn (YYYY-MM)')
+    parser.add_argument('--method', choices=METHODS,
+                        help='Áp một cách phân bổ cho mọi khoản thu '
+                             '(mặc định: theo SERVICE_METHODS)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Chỉ tính toán, không ghi hóa đơn')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect(autocommit=False)
+    cur = conn.cursor()
+
+    try:
+        started = time.perf_counter()
+        services, apartments, shares, stats = run_billing(cur, args.month, args.method,
+                                                          args.dry_run)
+        if shares is None:
+            print(f'⚠️  Không có khoản thu chưa lập hóa đơn cho tháng {args.month} '
+                  f'hoặc không có căn hộ nào ({len(services)} khoản thu, '
+                  f'{len(apartments)} căn hộ)')
+            conn.rollback()
+            return
+
+        print(f'🧾 Tháng {args.month}: {len(services)} khoản thu x {len(apartments):,} căn hộ')
+        for s, name in enumerate(services.names):
+            print(f'   ✓ {name} ({services.methods[s]}): {int(shares[s].sum()):,} VNĐ, '
+                  f'{int(shares[s].min()):,}-{int(shares[s].max()):,} VNĐ/căn hộ')
+
+        if args.dry_run:
+            conn.rollback()
+            print('\n(dry run, không ghi hóa đơn)')
+        else:
+            conn.commit()
+            print(f'\n✅ Đã tạo {stats.rows:,} hóa đơn trong '
+                  f'{time.perf_counter() - started:.2f}s')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Set-based notification broadcast, and a benchmark against the current path.
+
+NotificationService.create fetches every target resident id into Node,
+sends them back in createMany batches, then re-reads the notification with
+include: { residents: true }. broadcast() instead fans out server-side with
+INSERT ... SELECT, in keyset batches of --batch-size residents, each
+committed on its own so one announcement never holds a long transaction.
+Only the per-batch row counts cross the wire.
+
+    python prisma/broadcast.py send "Cắt nước thứ 7" --role resident
+    python prisma/broadcast.py bench --sizes 1000,10000,100000
+"""
+import argparse
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from psycopg2.extras import execute_values
+
+from db import connect
+import prisma_schema
+
+
+SCHEMA = prisma_schema.load()
+NOTIFICATION_COLUMNS = SCHEMA.columns('notifications', 'id', 'info', 'creator', 'createdAt')
+LINK_COLUMNS = SCHEMA.columns('resident_notifications', 'notificationId', 'residentId')
+
+DEFAULT_BATCH_SIZE = 50_000
+# Prisma chia createMany theo giới hạn 32767 tham số bind, 2 cột mỗi dòng
+PRISMA_CREATE_MANY_ROWS = 32767 // 2
+
+
+@dataclass
+class BroadcastStats:
+    notification_id: str
+    recipients: int
+    batches: int
+    seconds: float
+    bytes_sent: int
+    bytes_received: int
+
+
+class WireCounter:
+    """Approximate payload: SQL text sent and rows received as text."""
+
+    def __init__(self):
+        self.sent = 0
+        self.received = 0
+
+    def execute(self, cur, sql, params=None):
+        cur.execute(sql, params)
+        self.sent += len(cur.query)
+
+    def fetch(self, cur, many=True):
+        rows = cur.fetchall() if many else [cur.fetchone()]
+        self.received += sum(len(str(value)) for row in rows if row for value in row)
+        return rows if many else rows[0]
+
+
+def audience_filter(roles=None, resident_ids=None):
+    """(WHERE clause over residents, params)."""
+    clauses, params = [], []
+    if roles:
+        clauses.append('role = ANY(%s)')
+        params.append(list(roles))
+    if resident_ids:
+        clauses.append('"ID_Resident" = ANY(%s)')
+        params.append(list(resident_ids))
+    return ' AND '.join(clauses) or 'TRUE', params
+
+
+def insert_notification(cur, wire, info, creator):
+    notification_id = str(uuid.uuid4())
+    wire.execute(
+        cur,
+        f'INSERT INTO notifications ({", ".join(NOTIFICATION_COLUMNS)}) '
+        'VALUES (%s, %s, %s, %s)',
+        (notification_id, info, creator, datetime.now()),
+    )
+    return notification_id
+
+
+def broadcast(cur, info, creator='Ban Quản Lý', roles=None, resident_ids=None,
+              batch_size=DEFAULT_BATCH_SIZE, limit=None):
+    """
+    Create a notification and link it to every matching resident.
+    `cur` must be on an autocommit connection so each batch commits.
+    `limit` caps the audience to the first N resident ids (for benchmarks).
+    """
+    wire = WireCounter()
+    started = time.perf_counter()
+    notification_id = insert_notification(cur, wire, info, creator)
+    where, params = audience_filter(roles, resident_ids)
+
+    recipients = batches = 0
+    last_id = ''
+    while limit is None or recipients < limit:
+        size = batch_size if limit is None else min(batch_size, limit - recipients)
+        wire.execute(
+            cur,
+            f"""
+            WITH batch AS (
+                SELECT "ID_Resident" FROM residents
+                WHERE {where} AND "ID_Resident" > %s
+                ORDER BY "ID_Resident"
+                LIMIT %s
+            ), linked AS (
+                INSERT INTO resident_notifications ({', '.join(LINK_COLUMNS)})
+                SELECT %s, "ID_Resident" FROM batch
+                ON CONFLICT DO NOTHING
+            )
+            SELECT COUNT(*), MAX("ID_Resident") FROM batch
+            """,
+            (*params, last_id, size, notification_id),
+        )
+        count, last_id = wire.fetch(cur, many=False)
+        if not count:
+            break
+        recipients += count
+        batches += 1
+        if count < size:
+            break
+
+    return BroadcastStats(notification_id, recipients, batches,
+                          time.perf_counter() - started, wire.sent, wire.received)
+
+
+def broadcast_like_service(cur, info, creator='Ban Quản Lý', limit=None):
+    """Replay of NotificationService.create without residentIds, for comparison."""
+    wire = WireCounter()
+    started = time.perf_counter()
+    notification_id = insert_notification(cur, wire, info, creator)
+
+    wire.execute(cur, 'SELECT "ID_Resident" FROM residents ORDER BY "ID_Resident" LIMIT %s',
+                 (limit,))
+    resident_ids = [row[0] for row in wire.fetch(cur)]
+
+    batches = 0
+    for start in range(0, len(resident_ids), PRISMA_CREATE_MANY_ROWS):
+        chunk = resident_ids[start:start + PRISMA_CREATE_MANY_ROWS]
+        execute_values(
+            cur,
+            f'INSERT INTO resident_notifications ({", ".join(LINK_COLUMNS)}) VALUES %s '
+            'ON CONFLICT DO NOTHING',
+            [(notification_id, resident_id) for resident_id in chunk],
+            page_size=len(chunk),
+        )
+        wire.sent += len(cur.query)
+        batches += 1
+
+    # include: { residents: true }
+    wire.execute(cur, 'SELECT * FROM notifications WHERE id_notification = %s',
+                 (notification_id,))
+    wire.fetch(cur)
+    wire.execute(cur, 'SELECT * FROM resident_notifications WHERE "notification_ID" = %s',
+                 (notification_id,))
+    wire.fetch(cur)
+
+    return BroadcastStats(notification_id, len(resident_ids), batches,
+                          time.perf_counter() - started, wire.sent, wire.received)
+
+
+def delete_notification(cur, notification_id):
+    cur.execute('DELETE FROM resident_notifications WHERE "notification_ID" = %s',
+                (notification_id,))
+    cur.execute('DELETE FROM notifications WHERE id_notification = %s', (notification_id,))
+
+
+def run_bench(cur, sizes, batch_size):
+    cur.execute('SELECT COUNT(*) FROM residents')
+    available = cur.fetchone()[0]
+    results = []
+    for size in sizes:
+        if size > available:
+            print(f'⚠️  Chỉ có {available:,} cư dân, bỏ qua cỡ {size:,} '
+                  f'(seed thêm bằng seed.py --apartments)')
+            continue
+        row = {'size': size}
+        for label, run in (('service', lambda: broadcast_like_service(
+                                cur, f'[bench] {size}', limit=size)),
+                           ('set-based', lambda: broadcast(
+                                cur, f'[bench] {size}', batch_size=batch_size, limit=size))):
+            stats = run()
+            delete_notification(cur, stats.notification_id)
+            row[label] = stats
+        results.append(row)
+    return results
+
+
+def print_bench(results):
+    print(f'\n{"cư dân":>9}  {"đường đi":<10} {"thời gian":>10} {"gửi":>10} {"nhận":>10} {"lô":>4}')
+    for row in results:
+        for label in ('service', 'set-based'):
+            stats = row[label]
+            print(f'{row["size"]:>9,}  {label:<10} {stats.seconds * 1000:>8.0f}ms '
+                  f'{stats.bytes_sent / 1e3:>8.1f}KB {stats.bytes_received / 1e3:>8.1f}KB '
+                  f'{stats.batches:>4}')
+        old, new = row['service'], row['set-based']
+        print(f'{"":>9}  → nhanh hơn {old.seconds / max(new.seconds, 1e-9):.1f}x, '
+              f'ít hơn {(old.bytes_sent + old.bytes_received) / 1e3:,.0f}KB → '
+              f'{(new.bytes_sent + new.bytes_received) / 1e3:,.1f}KB')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Gửi thông báo hàng loạt phía server')
+    sub = parser.add_subparsers(dest='command', required=True)
+    send = sub.add_parser('send', help='Tạo thông báo và gửi cho cư dân')
+    send.add_argument('info')
+    send.add_argument('--creator', default='Ban Quản Lý')
+    send.add_argument('--role', action='append',
+                      help='Chỉ gửi cho vai trò này (lặp lại được); mặc định: tất cả')
+    send.add_argument('--resident-ids', type=lambda value: value.split(','),
+                      help='Danh sách ID cư dân, cách nhau bởi dấu phẩy')
+    send.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    bench = sub.add_parser('bench', help='So sánh với NotificationService.create')
+    bench.add_argument('--sizes', default='1000,10000,100000',
+                       type=lambda value: [int(size) for size in value.split(',')])
+    bench.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            if args.command == 'send':
+                stats = broadcast(cur, args.info, args.creator, args.role, args.resident_ids,
+                                  args.batch_size)
+                print(f'✅ Đã gửi thông báo {stats.notification_id} tới {stats.recipients:,} '
+                      f'cư dân ({stats.batches} lô) trong {stats.seconds:.2f}s')
+            else:
+                print_bench(run_bench(cur, args.sizes, args.batch_size))
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
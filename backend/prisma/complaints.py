@@ -0,0 +1,510 @@
+"""
+Complaint workload simulator and inbox (backlog) query benchmark.
+
+simulate() produces a time-ordered stream of complaint events: Poisson
+arrivals at --arrivals-per-hour, routed to a target role by --target-mix,
+and served first-come-first-served by --handlers per role with
+exponentially distributed handling times (--handling-hours, mean per role).
+Each complaint emits 'arrive' (pending), 'start' (in_progress) and
+'resolve' (resolved) events; when arrivals outpace the handlers the
+pending backlog grows exactly as it would in the admin/guard inboxes.
+
+`drive` writes the stream into the database (COPY for arrivals, one
+UPDATE ... FROM VALUES per batch for transitions, timestamps from the
+simulated clock) or replays it against the API with --api (POST/PUT
+/complains; createdAt is then the server's clock).
+
+`bench` drives the database until the complain table reaches each
+--checkpoints size (starting far enough in the past that the last arrivals
+land around now, unless --start is given) and measures the inbox queries at that size: latency
+(median/p95), closed-loop throughput with --clients connections, and
+filtered Seq Scans in the plan. --compare-index repeats the measurement
+with CANDIDATE_INDEX (target_role, status, created_at DESC) created, to
+show whether it is worth declaring in schema.prisma.
+
+    python prisma/complaints.py drive --hours 720 --arrivals-per-hour 1.5
+    python prisma/complaints.py bench --checkpoints 10000,100000,300000 --compare-index
+"""
+import argparse
+import asyncio
+import dataclasses
+import heapq
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from psycopg2.extras import execute_values
+
+from advisor import IndexSpec
+from db import connect
+from generators import COMPLAIN_COLUMNS, COMPLAINT_TEMPLATES
+from loader import copy_rows
+import querybench
+from querybench import BenchQuery
+
+
+RESPONSES = {'in_progress': 'Đang xử lý.', 'resolved': 'Ban quản lý đã xử lý xong.'}
+
+CANDIDATE_INDEX = IndexSpec('complain', ('target_role', 'status', 'created_at DESC'),
+                            'hộp thư khiếu nại lọc theo vai trò và trạng thái, mới nhất trước')
+
+COMPLAIN_SELECT = """SELECT c.*, r."ID_Resident", r.name, r.email, r.phone
+    FROM complain c
+    JOIN residents r ON r."ID_Resident" = c."ID_resident\""""
+
+INBOX_QUERIES = [
+    BenchQuery(
+        'inbox.open', 'hộp thư: khiếu nại chưa xong, mới nhất trước (một trang)',
+        f"""{COMPLAIN_SELECT}
+            WHERE c.target_role = %(role)s AND c.status IN ('pending', 'in_progress')
+            ORDER BY c.created_at DESC
+            LIMIT %(page)s""",
+    ),
+    BenchQuery(
+        'inbox.oldestPending', 'hàng đợi xử lý: khiếu nại chờ lâu nhất',
+        f"""{COMPLAIN_SELECT}
+            WHERE c.target_role = %(role)s AND c.status = 'pending'
+            ORDER BY c.created_at
+            LIMIT %(page)s""",
+    ),
+    BenchQuery(
+        'inbox.counts', 'số khiếu nại theo trạng thái (badge)',
+        """SELECT status, COUNT(*) FROM complain
+           WHERE target_role = %(role)s
+           GROUP BY status""",
+    ),
+    BenchQuery(
+        'complains.findAll', 'ComplainService.findAll (toàn bộ, không phân trang)',
+        f"""{COMPLAIN_SELECT}
+            ORDER BY c.created_at DESC""",
+    ),
+]
+
+
+def parse_role_map(cast):
+    def parse(value):
+        mapping = {}
+        for part in value.split(','):
+            role, _, amount = part.partition('=')
+            mapping[role.strip()] = cast(amount)
+        return mapping
+    return parse
+
+
+@dataclass
+class SimConfig:
+    arrivals_per_hour: float = 1.0
+    target_mix: dict = field(default_factory=lambda: {'admin': 0.7, 'guard': 0.3})
+    handlers: dict = field(default_factory=lambda: {'admin': 2, 'guard': 2})
+    handling_hours: dict = field(default_factory=lambda: {'admin': 2.5, 'guard': 0.5})
+    start: datetime = None
+    seed: int = 42
+
+    def horizon_hours(self, arrivals):
+        """
+        Simulated hours in which `arrivals` complaints almost surely arrive
+        (mean plus three standard deviations of the Poisson count).
+        """
+        return (arrivals + 3 * math.sqrt(arrivals)) / self.arrivals_per_hour
+
+    def utilization(self, role):
+        """Offered load per handler (>= 1 means the backlog grows without bound)."""
+        total = sum(self.target_mix.values())
+        arrivals = self.arrivals_per_hour * self.target_mix[role] / total
+        return arrivals * self.handling_hours[role] / self.handlers[role]
+
+
+@dataclass(frozen=True)
+class Event:
+    time: datetime
+    kind: str  # 'arrive' | 'start' | 'resolve'
+    complaint_id: str
+    role: str
+    # Chỉ có ở sự kiện 'arrive': (ID_resident, title, message)
+    content: tuple = None
+
+
+def simulate(cfg, residents):
+    """Endless, time-ordered stream of Events; stop consuming when done."""
+    rng = random.Random(cfg.seed)
+    start = cfg.start or datetime.now()
+    roles = list(cfg.target_mix)
+    weights = [cfg.target_mix[role] for role in roles]
+    templates = {role: [t for t in COMPLAINT_TEMPLATES if t[2] == role] or COMPLAINT_TEMPLATES
+                 for role in roles}
+    free = dict(cfg.handlers)
+    waiting = {role: deque() for role in roles}
+
+    # (giờ mô phỏng, thứ tự, loại, khiếu nại, vai trò); 'arrive' kế tiếp luôn nằm trong heap
+    heap = [(rng.expovariate(cfg.arrivals_per_hour), 0, 'arrive', None, None)]
+    sequence = 1
+
+    def at(hours):
+        return start + timedelta(hours=hours)
+
+    def begin(hours, complaint_id, role):
+        nonlocal sequence
+        free[role] -= 1
+        done = hours + rng.expovariate(1 / cfg.handling_hours[role])
+        heapq.heappush(heap, (done, sequence, 'resolve', complaint_id, role))
+        sequence += 1
+        return Event(at(hours), 'start', complaint_id, role)
+
+    while heap:
+        hours, _, kind, complaint_id, role = heapq.heappop(heap)
+        if kind == 'arrive':
+            heapq.heappush(heap, (hours + rng.expovariate(cfg.arrivals_per_hour), sequence,
+                                  'arrive', None, None))
+            sequence += 1
+            role = rng.choices(roles, weights)[0]
+            complaint_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            title, message, _ = rng.choice(templates[role])
+            content = (rng.choice(residents), title, message.format(floor=rng.randint(1, 40)))
+            yield Event(at(hours), 'arrive', complaint_id, role, content)
+            if free[role]:
+                yield begin(hours, complaint_id, role)
+            else:
+                waiting[role].append(complaint_id)
+        else:
+            yield Event(at(hours), 'resolve', complaint_id, role)
+            free[role] += 1
+            if waiting[role]:
+                yield begin(hours, waiting[role].popleft(), role)
+
+
+def resident_pool(cur, limit=10_000):
+    cur.execute(
+        """SELECT "ID_Resident" FROM residents
+           WHERE role = 'resident' AND approved
+           ORDER BY random() LIMIT %s""",
+        (limit,),
+    )
+    pool = [row[0] for row in cur.fetchall()]
+    if not pool:
+        raise RuntimeError('Chưa có cư dân nào, hãy chạy seed.py trước')
+    return pool
+
+
+def write_batch(cur, events):
+    """Apply a batch of events: COPY the arrivals, then one UPDATE for all transitions."""
+    arrivals = [(event.complaint_id, event.content[0], event.content[1], event.content[2],
+                 'pending', None, event.role, event.time, event.time)
+                for event in events if event.kind == 'arrive']
+    if arrivals:
+        copy_rows(cur, 'complain', COMPLAIN_COLUMNS, arrivals)
+
+    # Trong một lô chỉ trạng thái cuối cùng của mỗi khiếu nại là quan trọng
+    latest = {}
+    for event in events:
+        if event.kind != 'arrive':
+            status = 'in_progress' if event.kind == 'start' else 'resolved'
+            latest[event.complaint_id] = (event.complaint_id, status, RESPONSES[status],
+                                          event.time)
+    if latest:
+        execute_values(
+            cur,
+            """
+            UPDATE complain c SET status = v.status, response = v.response,
+                                  updated_at = v.updated_at
+            FROM (VALUES %s) AS v(id, status, response, updated_at)
+            WHERE c."ID_request" = v.id
+            """,
+            list(latest.values()),
+            template='(%s, %s, %s, %s::timestamp)',
+            page_size=len(latest),
+        )
+    return len(arrivals)
+
+
+def drive_db(cur, events, batch_size=5_000, until=None, stop_after=None):
+    """
+    Write events until the simulated clock passes `until` or `stop_after`
+    complaints have arrived. Returns the number of arrivals written.
+    """
+    arrived, batch = 0, []
+    for event in events:
+        if until is not None and event.time > until:
+            break
+        batch.append(event)
+        if event.kind == 'arrive':
+            arrived += 1
+        if len(batch) >= batch_size:
+            write_batch(cur, batch)
+            batch = []
+        if stop_after is not None and arrived >= stop_after:
+            break
+    if batch:
+        write_batch(cur, batch)
+    return arrived
+
+
+async def drive_api(base_url, email, password, events, until, concurrency=16, speedup=0):
+    """
+    Replay events through the API. With speedup > 0, `speedup` simulated
+    seconds pass per real second; 0 sends as fast as `concurrency` allows.
+    """
+    import aiohttp
+
+    import loadtest
+
+    stats = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    created = {}
+
+    async with aiohttp.ClientSession() as http:
+        session = await loadtest.login(http, base_url, 'resident', email, password)
+
+        async def call(route, method, path, body):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    async with http.request(method, f'{base_url}{path}', json=body,
+                                            headers=session.headers) as response:
+                        payload = await response.json(content_type=None)
+                        status = response.status
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    payload, status = None, type(e).__name__
+            stats.setdefault(route, loadtest.RouteStats()).record(
+                time.perf_counter() - started, status)
+            return payload if isinstance(status, int) and status < 400 else None
+
+        async def create(event):
+            _, title, message = event.content
+            body = await call('POST /complains', 'POST', '/complains',
+                              {'residentId': session.user_id, 'title': title,
+                               'message': message, 'targetRole': event.role})
+            return body and body.get('id')
+
+        async def update(event):
+            api_id = await created[event.complaint_id]
+            if api_id:
+                status = 'in_progress' if event.kind == 'start' else 'resolved'
+                await call('PUT /complains/:id', 'PUT', f'/complains/{api_id}',
+                           {'status': status, 'responseText': RESPONSES[status]})
+
+        tasks, first, real_start = [], None, time.perf_counter()
+        for event in events:
+            if event.time > until:
+                break
+            first = first or event.time
+            if speedup:
+                delay = (event.time - first).total_seconds() / speedup
+                delay -= time.perf_counter() - real_start
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if event.kind == 'arrive':
+                created[event.complaint_id] = asyncio.ensure_future(create(event))
+                tasks.append(created[event.complaint_id])
+            else:
+                tasks.append(asyncio.ensure_future(update(event)))
+        await asyncio.gather(*tasks)
+    return stats, time.perf_counter() - real_start
+
+
+def throughput(query, params, clients, seconds):
+    """Closed-loop queries/second with `clients` connections for `seconds`."""
+    counts = [0] * clients
+    deadline = time.perf_counter() + seconds
+
+    def worker(slot):
+        conn = connect()
+        try:
+            with conn.cursor() as cur:
+                while time.perf_counter() < deadline:
+                    cur.execute(query.sql, params)
+                    cur.fetchall()
+                    counts[slot] += 1
+        finally:
+            conn.close()
+
+    threads = [threading.Thread(target=worker, args=(slot,)) for slot in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def measure(cur, role, page=50, repeat=5, warmup=1, clients=4, seconds=3.0):
+    cur.execute('ANALYZE complain')
+    params = {'role': role, 'page': page}
+    results = {}
+    for query in INBOX_QUERIES:
+        plan = querybench.explain(cur, query, params)
+        result = querybench.time_query(cur, query, params, repeat, warmup)
+        result.update(
+            source=query.source,
+            seq_scans=querybench.seq_scans(plan),
+            qps=throughput(query, params, clients, seconds) if clients else None,
+        )
+        results[query.name] = result
+    return results
+
+
+def index_exists(cur, name):
+    cur.execute('SELECT 1 FROM pg_indexes WHERE indexname = %s', (name,))
+    return cur.fetchone() is not None
+
+
+def run_bench(cur, sim, checkpoints, role, compare_index=False, batch_size=5_000, **options):
+    cur.execute('SELECT COUNT(*) FROM complain')
+    rows = cur.fetchone()[0]
+    if sim.start is None:
+        # Như `drive`: lùi thời điểm bắt đầu đúng bằng thời gian mô phỏng cần thiết, để
+        # created_at không nằm ở tương lai và các truy vấn "chờ lâu hơn X" đo đúng dữ liệu
+        needed = max(max(checkpoints, default=0) - rows, 0)
+        sim = dataclasses.replace(
+            sim, start=datetime.now() - timedelta(hours=sim.horizon_hours(needed)))
+    events = simulate(sim, resident_pool(cur))
+    results = []
+    for checkpoint in sorted(checkpoints):
+        if checkpoint > rows:
+            rows += drive_db(cur, events, batch_size, stop_after=checkpoint - rows)
+        cur.execute('SELECT status, COUNT(*) FROM complain WHERE target_role = %s GROUP BY 1',
+                    (role,))
+        entry = {'rows': rows, 'backlog': dict(cur.fetchall()),
+                 'queries': measure(cur, role, **options)}
+        if compare_index and not index_exists(cur, CANDIDATE_INDEX.name):
+            cur.execute(CANDIDATE_INDEX.create_sql(concurrently=False))
+            try:
+                entry['with_index'] = measure(cur, role, **options)
+            finally:
+                cur.execute(f'DROP INDEX "{CANDIDATE_INDEX.name}"')
+        results.append(entry)
+        print_checkpoint(entry, role)
+    return results
+
+
+def print_queries(results, indent='   '):
+    for name, result in results.items():
+        qps = f', {result["qps"]:,.0f} truy vấn/s' if result['qps'] is not None else ''
+        print(f'{indent}✓ {name}: {result["rows"]:,} dòng, median {result["median_ms"]:.1f}ms, '
+              f'p95 {result["p95_ms"]:.1f}ms{qps}')
+        for scan in result['seq_scans']:
+            print(f'{indent}  ⚠️  Seq Scan {scan["table"]} ({scan["rows_scanned"]:,} dòng) '
+                  f'lọc theo {scan["filter"]}')
+
+
+def print_checkpoint(entry, role):
+    backlog = ', '.join(f'{status} {count:,}' for status, count in sorted(entry['backlog'].items()))
+    print(f'\n📊 {entry["rows"]:,} khiếu nại — hộp thư {role}: {backlog}')
+    print_queries(entry['queries'])
+    if 'with_index' in entry:
+        print(f'   🔎 Với index {CANDIDATE_INDEX.name}:')
+        print_queries(entry['with_index'], indent='      ')
+
+
+def print_utilization(sim):
+    for role in sim.target_mix:
+        load = sim.utilization(role)
+        note = ' → backlog tăng mãi' if load >= 1 else ''
+        print(f'   {role}: {sim.handlers[role]} người xử lý, tải {load:.0%}{note}')
+
+
+def sim_config(args):
+    return SimConfig(
+        arrivals_per_hour=args.arrivals_per_hour,
+        target_mix=args.target_mix,
+        handlers=args.handlers,
+        handling_hours=args.handling_hours,
+        start=datetime.fromisoformat(args.start) if args.start else None,
+        seed=args.seed,
+    )
+
+
+def parse_args(argv=None):
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--arrivals-per-hour', type=float, default=1.0,
+                        help='Tốc độ đến trung bình (quá trình Poisson)')
+    common.add_argument('--target-mix', type=parse_role_map(float),
+                        default={'admin': 0.7, 'guard': 0.3},
+                        help='Tỉ lệ khiếu nại theo vai trò xử lý, ví dụ admin=0.7,guard=0.3')
+    common.add_argument('--handlers', type=parse_role_map(int), default={'admin': 2, 'guard': 2},
+                        help='Số người xử lý song song mỗi vai trò, ví dụ admin=2,guard=2')
+    common.add_argument('--handling-hours', type=parse_role_map(float),
+                        default={'admin': 2.5, 'guard': 0.5},
+                        help='Thời gian xử lý trung bình (giờ, phân phối mũ) mỗi vai trò')
+    common.add_argument('--start', help='Thời điểm bắt đầu mô phỏng (ISO), mặc định: bây giờ')
+    common.add_argument('--seed', type=int, default=42)
+    common.add_argument('--batch-size', type=int, default=5_000,
+                        help='Số sự kiện mỗi lô ghi vào DB')
+
+    parser = argparse.ArgumentParser(description='Mô phỏng khiếu nại và benchmark hộp thư')
+    sub = parser.add_subparsers(dest='command', required=True)
+    drive = sub.add_parser('drive', parents=[common], help='Ghi luồng khiếu nại vào DB/API')
+    drive.add_argument('--hours', type=float, default=24 * 30,
+                       help='Độ dài mô phỏng (giờ)')
+    drive.add_argument('--api', metavar='URL', help='Gửi qua API thay vì ghi thẳng vào DB')
+    drive.add_argument('--email', default='nguyenvanan@gmail.com',
+                       help='Tài khoản đăng nhập khi dùng --api')
+    drive.add_argument('--password', default='123')
+    drive.add_argument('--concurrency', type=int, default=16)
+    drive.add_argument('--speedup', type=float, default=0,
+                       help='Với --api: số giây mô phỏng mỗi giây thực (0 = nhanh nhất có thể)')
+
+    bench = sub.add_parser('bench', parents=[common], help='Đo truy vấn hộp thư khi bảng lớn dần')
+    bench.add_argument('--checkpoints', default='10000,100000,300000',
+                       type=lambda value: [int(size) for size in value.split(',')],
+                       help='Số dòng complain tại đó đo truy vấn')
+    bench.add_argument('--role', default='admin', help='Hộp thư cần đo')
+    bench.add_argument('--page', type=int, default=50, help='Số dòng một trang hộp thư')
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.add_argument('--clients', type=int, default=4,
+                       help='Số kết nối đo throughput (0 = bỏ qua)')
+    bench.add_argument('--seconds', type=float, default=3.0,
+                       help='Thời gian đo throughput cho mỗi truy vấn')
+    bench.add_argument('--compare-index', action='store_true',
+                       help=f'Đo thêm với index {CANDIDATE_INDEX.name} rồi xóa nó')
+    bench.add_argument('--json', help='Ghi kết quả ra file JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sim = sim_config(args)
+    print('🧮 Mô phỏng khiếu nại:')
+    print_utilization(sim)
+
+    if args.command == 'drive' and args.api:
+        # Tài khoản API là cư dân nên không cần pool cư dân từ DB
+        events = simulate(sim, [None])
+        until = (sim.start or datetime.now()) + timedelta(hours=args.hours)
+        stats, elapsed = asyncio.run(drive_api(args.api.rstrip('/'), args.email, args.password,
+                                               events, until, args.concurrency, args.speedup))
+        for route, route_stats in sorted(stats.items()):
+            summary = route_stats.summary(elapsed)
+            print(f'   ✓ {route}: {summary["requests"]:,} yêu cầu, {summary["rps"]:.1f}/s, '
+                  f'p95 {summary["p95_ms"]:.0f}ms, lỗi {summary["errors"]:,}')
+        return
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            if args.command == 'drive':
+                sim.start = sim.start or datetime.now() - timedelta(hours=args.hours)
+                until = sim.start + timedelta(hours=args.hours)
+                arrived = drive_db(cur, simulate(sim, resident_pool(cur)), args.batch_size,
+                                   until=until)
+                print(f'✅ Đã ghi {arrived:,} khiếu nại ({args.hours:g} giờ mô phỏng) trong '
+                      f'{time.perf_counter() - started:.2f}s')
+            else:
+                results = run_bench(cur, sim, args.checkpoints, args.role, args.compare_index,
+                                    args.batch_size, page=args.page, repeat=args.repeat,
+                                    clients=args.clients, seconds=args.seconds)
+                if args.json:
+                    with open(args.json, 'w', encoding='utf-8') as f:
+                        json.dump(results, f, indent=2, ensure_ascii=False)
+                    print(f'\n📄 Đã ghi kết quả vào {args.json}')
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Password strategies and a persistent bcrypt hash cache for seeding.
+
+bcrypt is deliberately slow, so hashes are cached on disk keyed by
+(password, cost) and reused across runs; missing hashes are computed in
+parallel across a process pool.
+
+Strategies:
+    shared  every account uses DEFAULT_PASSWORD (one hash)
+    pool    accounts cycle through `pool_size` distinct passwords
+    unique  every account gets its own password derived from its email
+"""
+import hashlib
+import json
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+
+DEFAULT_PASSWORD = '123'
+# Như bcrypt.gensalt() mặc định mà seed gốc dùng; --bcrypt-cost có thể giảm
+DEFAULT_COST = 12
+STRATEGIES = ('shared', 'pool', 'unique')
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
+def password_for(strategy, email, pool_size=100):
+    """Plain-text password of a seeded account; load tests reuse this."""
+    if strategy == 'shared':
+        return DEFAULT_PASSWORD
+    if strategy == 'pool':
+        return f'{DEFAULT_PASSWORD}-{zlib.crc32(email.encode("utf-8")) % pool_size}'
+    if strategy == 'unique':
+        return f'{DEFAULT_PASSWORD}-{hashlib.sha1(email.encode("utf-8")).hexdigest()[:12]}'
+    raise ValueError(f'Unknown password strategy: {strategy}')
+
+
+def _hash_one(args):
+    password, cost = args
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=cost)).decode('utf-8')
+
+
+class HashCache:
+    """JSON file per cost factor mapping password -> bcrypt hash."""
+
+    def __init__(self, cost=DEFAULT_COST, cache_dir=CACHE_DIR):
+        self.cost = cost
+        self.path = os.path.join(cache_dir, f'bcrypt-{cost}.json')
+        self._hashes = None
+
+    def _load(self):
+        if self._hashes is None:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._hashes = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._hashes = {}
+        return self._hashes
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._hashes, f)
+        os.replace(tmp_path, self.path)
+
+    def hash_all(self, passwords, workers=None):
+        """Return {password: hash} for `passwords`, hashing only cache misses."""
+        hashes = self._load()
+        wanted = set(passwords)
+        missing = sorted(wanted - hashes.keys())
+        if missing:
+            if len(missing) == 1 or workers == 1:
+                computed = [_hash_one((password, self.cost)) for password in missing]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    computed = list(pool.map(
+                        _hash_one,
+                        ((password, self.cost) for password in missing),
+                        chunksize=max(1, len(missing) // ((workers or os.cpu_count() or 1) * 4)),
+                    ))
+            hashes.update(zip(missing, computed))
+            self._save()
+        return {password: hashes[password] for password in wanted}, len(missing)
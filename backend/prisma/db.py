@@ -0,0 +1,66 @@
+import os
+from urllib.parse import urlparse
+
+import psycopg2
+import psycopg2.extensions
+
+
+def get_db_connection_params(database_url=None):
+    """
+    Build psycopg2 connection kwargs using DATABASE_URL when available so that
+    the seed script stays in sync with Prisma configuration.
+    """
+    database_url = database_url or os.environ.get("DATABASE_URL")
+
+    if database_url:
+        parsed = urlparse(database_url)
+        if parsed.scheme not in ("postgresql", "postgres"):
+            raise ValueError(
+                f"Unsupported DATABASE_URL scheme: {parsed.scheme}. "
+                "Expected postgresql:// or postgres://"
+            )
+
+        return {
+            "host": parsed.hostname or "localhost",
+            "port": parsed.port or 5432,
+            "database": (parsed.path or "/").lstrip("/"),
+            "user": parsed.username or "postgres",
+            "password": parsed.password,
+        }
+
+    # Fall back to discrete env vars or final hardcoded defaults for dev usage.
+    return {
+        "host": os.environ.get("DB_HOST", "localhost"),
+        "port": int(os.environ.get("DB_PORT", 5432)),
+        "database": os.environ.get("DB_NAME", "BlueMoon"),
+        "user": os.environ.get("DB_USER", "postgres"),
+        "password": os.environ.get("DB_PASSWORD", "200103"),
+    }
+
+
+def connect(autocommit=True, **overrides):
+    """Open a psycopg2 connection using the shared connection params."""
+    params = get_db_connection_params()
+    params.update(overrides)
+    conn = psycopg2.connect(**params)
+    conn.autocommit = autocommit
+    return conn
+
+
+def connect_readonly(database_url=None, **overrides):
+    """
+    Open a read-only REPEATABLE READ connection for reporting.
+
+    Uses `database_url`, else READ_DATABASE_URL (e.g. a streaming replica),
+    else the primary from DATABASE_URL, so long exports can be pointed away
+    from the primary without touching the app configuration.
+    """
+    params = get_db_connection_params(database_url or os.environ.get("READ_DATABASE_URL"))
+    params.update(overrides)
+    conn = psycopg2.connect(**params)
+    conn.set_session(
+        isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ,
+        readonly=True,
+        autocommit=False,
+    )
+    return conn
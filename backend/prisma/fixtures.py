@@ -0,0 +1,200 @@
+"""
+Deterministic fixture databases for backend test runs.
+
+`build` creates a PostgreSQL template database once: `prisma db push` for
+the schema, then `seed.py --deterministic` (ids from --seed, fixed clock),
+then VACUUM FREEZE/ANALYZE. The template is named after a hash of
+schema.prisma, the seed sources and the seed arguments, so it is rebuilt
+only when one of them changes. It is seeded under a temporary name and
+renamed at the end, so an interrupted build never leaves a half-seeded
+template behind.
+
+`clone` builds the template if needed and then copies it with
+CREATE DATABASE ... TEMPLATE, a file-level copy that takes well under a
+second for the demo data, instead of a full reseed per test run.
+
+    python prisma/fixtures.py build
+    python prisma/fixtures.py clone bluemoon_test
+    DATABASE_URL=$(python prisma/fixtures.py clone bluemoon_test --print-url) npm run test:e2e
+    python prisma/fixtures.py prune
+
+Extra arguments go to seed.py (e.g. `build --apartments 200`). Needs a
+role with CREATEDB; where that is not available, use snapshot.py to keep
+a binary COPY archive of a deterministic seed instead.
+"""
+import argparse
+import contextlib
+import hashlib
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from db import connect, get_db_connection_params
+import seed
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(HERE)
+FIXTURE_PREFIX = 'bluemoon_fixture_'
+# Đổi một trong các file này thì dữ liệu seed có thể khác, nên template phải dựng lại
+SOURCES = ('schema.prisma', 'prisma_schema.py', 'seed.py', 'generators.py', 'billing.py',
+           'credentials.py', 'loader.py', 'parallel.py', 'db.py')
+
+
+def fixture_key(seed_argv):
+    digest = hashlib.sha256()
+    for name in SOURCES:
+        with open(os.path.join(HERE, name), 'rb') as f:
+            digest.update(f.read())
+    digest.update('\0'.join(seed_argv).encode())
+    return digest.hexdigest()[:12]
+
+
+def template_name(seed_argv):
+    return f'{FIXTURE_PREFIX}{fixture_key(seed_argv)}'
+
+
+def database_url(name):
+    params = get_db_connection_params()
+    credentials = quote(params['user'], safe='')
+    if params['password']:
+        credentials += ':' + quote(params['password'], safe='')
+    return f'postgresql://{credentials}@{params["host"]}:{params["port"]}/{quote(name, safe="")}'
+
+
+def connect_maintenance():
+    # CREATE/DROP DATABASE không chạy được khi đang kết nối vào chính DB đó
+    return connect(database='postgres')
+
+
+def database_exists(cur, name):
+    cur.execute('SELECT 1 FROM pg_database WHERE datname = %s', (name,))
+    return cur.fetchone() is not None
+
+
+def drop_database(cur, name):
+    cur.execute(f'ALTER DATABASE "{name}" WITH IS_TEMPLATE false ALLOW_CONNECTIONS true')
+    cur.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+
+
+def build(seed_argv, rebuild=False):
+    """Create the template for `seed_argv` unless it exists; returns (name, built)."""
+    name = template_name(seed_argv)
+    staging = f'{name}_building'
+    conn = connect_maintenance()
+    try:
+        with conn.cursor() as cur:
+            if database_exists(cur, name):
+                if not rebuild:
+                    return name, False
+                drop_database(cur, name)
+            if database_exists(cur, staging):
+                drop_database(cur, staging)
+            cur.execute(f'CREATE DATABASE "{staging}"')
+
+            url = database_url(staging)
+            subprocess.run(['npx', 'prisma', 'db', 'push', '--skip-generate'], cwd=BACKEND_DIR,
+                           env={**os.environ, 'DATABASE_URL': url}, stdout=sys.stdout, check=True)
+
+            # db.connect() đọc DATABASE_URL mỗi lần kết nối, kể cả trong worker của seed.py
+            previous = os.environ.get('DATABASE_URL')
+            os.environ['DATABASE_URL'] = url
+            try:
+                seed.main(['--deterministic', *seed_argv])
+                fixture = connect()
+                try:
+                    with fixture.cursor() as fixture_cur:
+                        fixture_cur.execute('VACUUM (FREEZE, ANALYZE)')
+                finally:
+                    fixture.close()
+            finally:
+                if previous is None:
+                    os.environ.pop('DATABASE_URL')
+                else:
+                    os.environ['DATABASE_URL'] = previous
+
+            cur.execute(f'ALTER DATABASE "{staging}" RENAME TO "{name}"')
+            # Không cho kết nối vào template: CREATE DATABASE ... TEMPLATE sẽ thất bại nếu có
+            cur.execute(f'ALTER DATABASE "{name}" WITH IS_TEMPLATE true ALLOW_CONNECTIONS false')
+    finally:
+        conn.close()
+    return name, True
+
+
+def clone(target, template, force=False):
+    """Replace database `target` with a copy of `template`; returns the seconds taken."""
+    if target == get_db_connection_params()['database'] and not force:
+        raise ValueError(f'{target} là DB trong DATABASE_URL, dùng --force nếu thật sự muốn ghi đè')
+    conn = connect_maintenance()
+    try:
+        with conn.cursor() as cur:
+            started = time.perf_counter()
+            cur.execute(f'DROP DATABASE IF EXISTS "{target}" WITH (FORCE)')
+            cur.execute(f'CREATE DATABASE "{target}" TEMPLATE "{template}"')
+            return time.perf_counter() - started
+    finally:
+        conn.close()
+
+
+def prune(keep=None):
+    """Drop fixture templates other than `keep`; returns their names."""
+    conn = connect_maintenance()
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT datname FROM pg_database WHERE datname LIKE %s ORDER BY 1',
+                        (f'{FIXTURE_PREFIX}%',))
+            names = [row[0] for row in cur.fetchall() if row[0] != keep]
+            for name in names:
+                drop_database(cur, name)
+    finally:
+        conn.close()
+    return names
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='DB mẫu cố định cho test, clone từ template',
+                                     allow_abbrev=False)
+    sub = parser.add_subparsers(dest='command', required=True)
+    build_parser = sub.add_parser('build', help='Dựng template nếu chưa có')
+    build_parser.add_argument('--rebuild', action='store_true', help='Dựng lại dù đã có')
+    clone_parser = sub.add_parser('clone', help='Tạo (hoặc thay) DB test từ template')
+    clone_parser.add_argument('target', help='Tên DB test, ví dụ bluemoon_test')
+    clone_parser.add_argument('--print-url', action='store_true',
+                              help='Chỉ in DATABASE_URL của DB vừa tạo ra stdout')
+    clone_parser.add_argument('--force', action='store_true',
+                              help='Cho phép ghi đè DB đang cấu hình trong DATABASE_URL')
+    prune_parser = sub.add_parser('prune', help='Xóa các template cũ')
+    prune_parser.add_argument('--all', action='store_true', help='Xóa cả template hiện tại')
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    args, seed_argv = parse_args(argv)
+    # Tham số không nhận ra được chuyển cho seed.py; kiểm tra sớm để báo lỗi rõ ràng
+    seed.parse_args(['--deterministic', *seed_argv])
+
+    if args.command == 'prune':
+        dropped = prune(None if args.all else template_name(seed_argv))
+        print(f'🧹 Đã xóa {len(dropped)} template: {", ".join(dropped) or "không có"}')
+        return
+
+    # Với --print-url, stdout chỉ chứa URL để dùng trong $(...)
+    quiet = args.command == 'clone' and args.print_url
+    with contextlib.redirect_stdout(sys.stderr) if quiet else contextlib.nullcontext():
+        started = time.perf_counter()
+        template, built = build(seed_argv, getattr(args, 'rebuild', False))
+        if built:
+            print(f'🧱 Đã dựng template {template} trong {time.perf_counter() - started:.2f}s')
+        else:
+            print(f'♻️  Dùng lại template {template}')
+        if args.command == 'clone':
+            seconds = clone(args.target, template, args.force)
+            print(f'✅ Đã tạo {args.target} từ {template} trong {seconds:.3f}s')
+    if quiet:
+        print(database_url(args.target))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""
+Streaming generators for large-scale synthetic data.
+
+Every row is derived deterministically from (seed, entity index), so each
+table can be produced independently and in any order without keeping the
+previously generated rows in memory. Foreign keys are recomputed on demand
+instead of being looked up from materialized lists.
+"""
+import itertools
+import random
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+
+from credentials import password_for
+import prisma_schema
+
+
+SCHEMA = prisma_schema.load()
+
+
+HO = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ',
+      'Đặng', 'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương', 'Lý']
+DEM = ['Văn', 'Thị', 'Minh', 'Thu', 'Hoàng', 'Thanh', 'Ngọc', 'Quốc', 'Đức',
+       'Hải', 'Bảo', 'Gia']
+TEN = ['An', 'Bình', 'Cường', 'Dung', 'Đức', 'Giang', 'Hà', 'Hải', 'Hoa',
+       'Hùng', 'Khoa', 'Lan', 'Linh', 'Long', 'Mai', 'Minh', 'Nam', 'Oanh',
+       'Phúc', 'Quân', 'Sơn', 'Tâm', 'Thảo', 'Trang', 'Tuấn', 'Vy', 'Yến']
+
+# (tên phí, phí cơ sở cho mỗi căn hộ / tháng)
+SERVICE_TYPES = [
+    ('Phí thuê', 750000),
+    ('Phí điện', 225000),
+    ('Phí nước', 100000),
+    ('Phí gửi xe', 75000),
+    ('Phí vệ sinh', 50000),
+    ('Phí dịch vụ', 125000),
+    ('Phí nhà ở', 75000),
+]
+
+SHIFT_TYPES = ['morning', 'afternoon', 'night']
+
+NOTIFICATION_TEMPLATES = [
+    'Thông báo bảo trì hệ thống điện tháng {month}. Vui lòng chuẩn bị nguồn điện dự phòng.',
+    'Lịch cắt nước định kỳ tháng {month} để vệ sinh bể nước.',
+    'Thông báo họp cư dân định kỳ tháng {month} tại hội trường tầng 1.',
+    'Nhắc nhở đóng phí dịch vụ tháng {month} đúng hạn.',
+    'Nhắc nhở cư dân giữ gìn vệ sinh chung, không xả rác bừa bãi.',
+    'Thông báo phun thuốc diệt muỗi toàn khu vào cuối tháng {month}.',
+]
+
+COMPLAINT_TEMPLATES = [
+    ('Thang máy bị hỏng', 'Thang máy tầng {floor} không hoạt động, rất bất tiện cho cư dân.', 'admin'),
+    ('Tiếng ồn vào ban đêm', 'Căn hộ bên cạnh thường xuyên gây ồn vào ban đêm.', 'guard'),
+    ('Rò rỉ nước tại hành lang', 'Phát hiện rò rỉ nước tại hành lang tầng {floor}.', 'admin'),
+    ('Đèn hành lang không sáng', 'Đèn hành lang tầng {floor} đã hỏng, ban đêm rất tối.', 'admin'),
+    ('Người lạ ra vào tòa nhà', 'Có người lạ ra vào tầng {floor} vào ban đêm.', 'guard'),
+    ('Wifi khu vực công cộng yếu', 'Tín hiệu wifi tại sảnh rất yếu, không sử dụng được.', 'admin'),
+]
+
+# Nhân sự ban quản lý (không thuộc căn hộ nào)
+STAFF_ROLES = ['admin', 'accountant', 'police']
+
+APARTMENTS_PER_FLOOR = 20
+FLOORS_PER_BLOCK = 40
+# Giờ trong ngày của mốc thời gian cố định khi có `today` (--deterministic)
+SEED_TIME = time(9, 0)
+
+
+@dataclass(frozen=True)
+class ScaleConfig:
+    apartments: int = 1000
+    months: int = 12
+    residents_min: int = 1
+    residents_max: int = 6
+    guards: int = 12
+    staff_per_role: int = 2
+    notifications_per_month: int = 4
+    notification_reach: float = 0.2
+    complaint_rate: float = 0.05
+    shift_days_ahead: int = 30
+    end_month: str = None
+    seed: int = 42
+    password_strategy: str = 'shared'
+    password_pool_size: int = 100
+    # {mật khẩu: bcrypt hash}, được điền sẵn bởi credentials.HashCache
+    password_hashes: dict = field(default_factory=dict, compare=False)
+    # Chế độ incremental: các tháng đã có trong DB và ngày trực đầu tiên còn thiếu
+    existing_months: frozenset = field(default_factory=frozenset, compare=False)
+    shifts_from: date = None
+    # Ngày "hôm nay" cố định cho seed.py --deterministic; None = ngày hiện tại
+    today: date = None
+
+    @property
+    def current_date(self):
+        return self.today or date.today()
+
+    def seeded_at(self):
+        """updated_at of generated rows: fixed with `today`, else the wall clock."""
+        if self.today is None:
+            return datetime.now()
+        return datetime.combine(self.today, SEED_TIME)
+
+    def password_hash(self, email):
+        return self.password_hashes[password_for(self.password_strategy, email,
+                                                 self.password_pool_size)]
+
+    @property
+    def month_keys(self):
+        """YYYY-MM keys of the generated billing period, oldest first."""
+        end = self.end_month or self.current_date.strftime('%Y-%m')
+        year, month = (int(part) for part in end.split('-'))
+        keys = []
+        for _ in range(self.months):
+            keys.append(f'{year:04d}-{month:02d}')
+            month -= 1
+            if month == 0:
+                year, month = year - 1, 12
+        return keys[::-1]
+
+    def pending_months(self):
+        """(index, YYYY-MM) of billing months that are not loaded yet."""
+        return [(m, month) for m, month in enumerate(self.month_keys)
+                if month not in self.existing_months]
+
+
+@dataclass(frozen=True)
+class ResidentRow:
+    id: str
+    apartment_id: str
+    name: str
+    phone: str
+    email: str
+    role: str
+    temporary: bool
+    id_number: str
+    birth: date
+    approved: bool
+
+    def as_tuple(self, cfg, updated_at):
+        return (self.id, self.apartment_id, self.name, self.phone, cfg.password_hash(self.email),
+                self.email, self.role, self.temporary, self.id_number,
+                self.birth, self.approved, updated_at)
+
+
+@dataclass(frozen=True)
+class ApartmentProfile:
+    index: int
+    id: str
+    name: str
+    floor: int
+    area: float
+    contract_start: date
+    contract_end: date
+    residents: tuple
+
+    @property
+    def owner(self):
+        return self.residents[0]
+
+
+# Cột lấy từ schema.prisma theo tên trường Prisma, theo đúng thứ tự giá trị
+# mà các generator bên dưới sinh ra
+RESIDENT_COLUMNS = SCHEMA.columns('residents', 'id', 'apartmentId', 'fullName', 'phone',
+                                  'password', 'email', 'role', 'temporaryStatus', 'idNumber',
+                                  'birthDate', 'approved', 'updatedAt')
+APARTMENT_COLUMNS = SCHEMA.columns('apartments', 'id', 'name', 'contractStartDate',
+                                   'contractEndDate', 'ownerId', 'area', 'updatedAt')
+SERVICE_COLUMNS = SCHEMA.columns('services', 'id', 'name', 'month', 'totalAmount', 'status',
+                                 'createdAt', 'updatedAt')
+INVOICE_COLUMNS = SCHEMA.columns('invoices', 'id', 'serviceId', 'residentId', 'name', 'money',
+                                 'status', 'createdAt')
+SHIFT_COLUMNS = SCHEMA.columns('shifts', 'id', 'date', 'shiftType', 'guardId', 'createdAt',
+                               'updatedAt')
+NOTIFICATION_COLUMNS = SCHEMA.columns('notifications', 'id', 'info', 'creator', 'createdAt')
+RESIDENT_NOTIFICATION_COLUMNS = SCHEMA.columns('resident_notifications', 'notificationId',
+                                               'residentId')
+COMPLAIN_COLUMNS = SCHEMA.columns('complain', 'id', 'residentId', 'title', 'message', 'status',
+                                  'responseText', 'targetRole', 'createdAt', 'updatedAt')
+
+
+def _rng(cfg, kind, index):
+    return random.Random(f'{cfg.seed}:{kind}:{index}')
+
+
+def _uuid(rng):
+    # Tương đương str(uuid.UUID(int=..., version=4)) nhưng nhanh hơn nhiều
+    h = '%032x' % rng.getrandbits(128)
+    return f'{h[:8]}-{h[8:12]}-4{h[13:16]}-{"89ab"[int(h[16], 16) & 3]}{h[17:20]}-{h[20:]}'
+
+
+def _full_name(rng):
+    return f'{rng.choice(HO)} {rng.choice(DEM)} {rng.choice(TEN)}'
+
+
+def _month_start(month_key):
+    year, month = (int(part) for part in month_key.split('-'))
+    return datetime(year, month, 1)
+
+
+def _random_time_in_month(rng, month_start):
+    return month_start + timedelta(seconds=int(rng.random() * 28 * 86400))
+
+
+def apartment_name(index):
+    block, rest = divmod(index, FLOORS_PER_BLOCK * APARTMENTS_PER_FLOOR)
+    floor, unit = divmod(rest, APARTMENTS_PER_FLOOR)
+    prefix = ''
+    while block >= 0:
+        block, letter = divmod(block, 26)
+        prefix = chr(ord('A') + letter) + prefix
+        block -= 1
+    return f'{prefix}{floor + 1}{unit + 1:02d}', floor + 1
+
+
+def apartment_profile(cfg, index, owner_only=False):
+    """
+    Derive an apartment and its residents (owner first) from its index.
+    owner_only stops after the owner, which is all invoice generation needs.
+    """
+    rng = _rng(cfg, 'apartment', index)
+    apartment_id = _uuid(rng)
+    name, floor = apartment_name(index)
+    area = round(rng.uniform(45, 140), 1)
+    contract_start = date(2018, 1, 1) + timedelta(days=rng.randrange(365 * 6))
+    contract_end = contract_start + timedelta(days=365 * rng.choice([1, 2, 3, 5]))
+
+    count = rng.randint(cfg.residents_min, cfg.residents_max)
+    residents = []
+    for k in range(1 if owner_only else count):
+        residents.append(ResidentRow(
+            id=_uuid(rng),
+            apartment_id=apartment_id,
+            name=_full_name(rng),
+            phone=f'09{rng.randrange(10 ** 8):08d}',
+            email=f'resident{index:07d}.{k}@bluemoon.vn',
+            role='resident',
+            temporary=k > 0 and rng.random() < 0.15,
+            id_number=f'0{index:07d}{k:04d}',
+            birth=date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 55)),
+            approved=k == 0 or rng.random() < 0.95,
+        ))
+    return ApartmentProfile(index, apartment_id, name, floor, area,
+                            contract_start, contract_end, tuple(residents))
+
+
+def apartment_indexes(cfg, shard=None):
+    """shard = (start, stop) restricts generation to a slice of apartments."""
+    if shard is None:
+        return range(cfg.apartments)
+    start, stop = shard
+    return range(max(start, 0), min(stop, cfg.apartments))
+
+
+def iter_apartment_profiles(cfg, shard=None):
+    for index in apartment_indexes(cfg, shard):
+        yield apartment_profile(cfg, index)
+
+
+def staff_member(cfg, role, index):
+    rng = _rng(cfg, role, index)
+    return ResidentRow(
+        id=_uuid(rng),
+        apartment_id=None,
+        name=_full_name(rng),
+        phone=f'08{rng.randrange(10 ** 8):08d}',
+        email=f'{role}{index + 1}@bluemoon.vn',
+        role=role,
+        temporary=False,
+        id_number=f'9{STAFF_ROLES.index(role) if role in STAFF_ROLES else 9}{index:010d}',
+        birth=date(1965, 1, 1) + timedelta(days=rng.randrange(365 * 35)),
+        approved=True,
+    )
+
+
+def guard_ids(cfg):
+    return [staff_member(cfg, 'guard', i).id for i in range(cfg.guards)]
+
+
+def iter_staff(cfg):
+    for i in range(cfg.guards):
+        yield staff_member(cfg, 'guard', i)
+    for role in STAFF_ROLES:
+        for i in range(cfg.staff_per_role):
+            yield staff_member(cfg, role, i)
+
+
+def account_passwords(cfg):
+    """Distinct plain-text passwords needed for every generated account."""
+    if cfg.password_strategy == 'shared':
+        return {password_for('shared', '')}
+    emails = itertools.chain(
+        (staff.email for staff in iter_staff(cfg)),
+        (resident.email for apt in iter_apartment_profiles(cfg) for resident in apt.residents),
+    )
+    return {password_for(cfg.password_strategy, email, cfg.password_pool_size) for email in emails}
+
+
+def generate_apartments(cfg, shard=None):
+    updated_at = cfg.seeded_at()
+    for apt in iter_apartment_profiles(cfg, shard):
+        yield (apt.id, apt.name, apt.contract_start, apt.contract_end, apt.owner.id, apt.area,
+               updated_at)
+
+
+def generate_residents(cfg, shard=None):
+    updated_at = cfg.seeded_at()
+    # Nhân sự chỉ thuộc về shard đầu tiên để không bị sinh trùng
+    if shard is None or shard[0] == 0:
+        for staff in iter_staff(cfg):
+            yield staff.as_tuple(cfg, updated_at)
+    for apt in iter_apartment_profiles(cfg, shard):
+        for resident in apt.residents:
+            yield resident.as_tuple(cfg, updated_at)
+
+
+def service_id(month_key, type_index):
+    """
+    Stable id derived from the calendar month (months since 2000-01), so a
+    later incremental run adds new months without colliding with old ones.
+    """
+    year, month = (int(part) for part in month_key.split('-'))
+    return ((year - 2000) * 12 + month - 1) * len(SERVICE_TYPES) + type_index + 1
+
+
+def generate_services(cfg):
+    last = len(cfg.month_keys) - 1
+    for m, month in cfg.pending_months():
+        created = _month_start(month)
+        status = 'unpaid' if m == last else 'paid'
+        for t, (name, per_apartment) in enumerate(SERVICE_TYPES):
+            yield (service_id(month, t), name, month, float(per_apartment * cfg.apartments),
+                   status, created, created)
+
+
+def _invoice_status(rng, age):
+    """age = số tháng tính từ tháng hiện tại (0 = tháng hiện tại)."""
+    roll = rng.random()
+    if age == 0:
+        return 'unpaid' if roll < 0.7 else ('pending' if roll < 0.85 else 'paid')
+    if age == 1:
+        return 'paid' if roll < 0.75 else ('pending' if roll < 0.85 else 'unpaid')
+    return 'paid' if roll < 0.97 else 'unpaid'
+
+
+def generate_invoices(cfg, shard=None):
+    """Month-major so the physical order matches a real monthly billing run."""
+    last = len(cfg.month_keys) - 1
+    for m, month in cfg.pending_months():
+        age = last - m
+        start = _month_start(month)
+        for index in apartment_indexes(cfg, shard):
+            owner = apartment_profile(cfg, index, owner_only=True).owner
+            rng = _rng(cfg, f'invoice:{month}', index)
+            for t, (name, per_apartment) in enumerate(SERVICE_TYPES):
+                yield (_uuid(rng), service_id(month, t), owner.id,
+                       f'HĐ {name} tháng {month} - {owner.name}', float(per_apartment),
+                       _invoice_status(rng, age), _random_time_in_month(rng, start))
+
+
+def shift_dates(cfg):
+    first = cfg.shifts_from or _month_start(cfg.month_keys[0]).date()
+    last = cfg.current_date + timedelta(days=cfg.shift_days_ahead)
+    day = first
+    while day < last:
+        yield day
+        day += timedelta(days=1)
+
+
+def generate_shifts(cfg):
+    """Ids and the guard rotation depend only on the day, not on the window start."""
+    guards = guard_ids(cfg)
+    if not guards:
+        return
+    for day in shift_dates(cfg):
+        rng = _rng(cfg, 'shift', day.isoformat())
+        stamp = datetime.combine(day, datetime.min.time())
+        for shift_index, shift_type in enumerate(SHIFT_TYPES):
+            guard_index = (day.toordinal() * len(SHIFT_TYPES) + shift_index) % len(guards)
+            yield (_uuid(rng), day, shift_type, guards[guard_index], stamp, stamp)
+
+
+def notification_ids(cfg, month):
+    return [_uuid(_rng(cfg, f'notification:{month}', k))
+            for k in range(cfg.notifications_per_month)]
+
+
+def generate_notifications(cfg):
+    for _, month in cfg.pending_months():
+        for k, notification_id in enumerate(notification_ids(cfg, month)):
+            rng = _rng(cfg, f'notification-body:{month}', k)
+            info = rng.choice(NOTIFICATION_TEMPLATES).format(month=month)
+            yield (notification_id, info, 'Ban Quản Lý', _random_time_in_month(rng, _month_start(month)))
+
+
+def generate_resident_notifications(cfg, shard=None):
+    """Each notification reaches ~notification_reach of the apartments."""
+    ids = {month: notification_ids(cfg, month) for _, month in cfg.pending_months()}
+    if not ids:
+        return
+    for apt in iter_apartment_profiles(cfg, shard):
+        for month, month_ids in ids.items():
+            rng = _rng(cfg, f'reach:{month}', apt.index)
+            for notification_id in month_ids:
+                if rng.random() < cfg.notification_reach:
+                    for resident in apt.residents:
+                        yield (notification_id, resident.id)
+
+
+def generate_complains(cfg, shard=None):
+    months = cfg.pending_months()
+    if not months:
+        return
+    last = len(cfg.month_keys) - 1
+    for apt in iter_apartment_profiles(cfg, shard):
+        for m, month in months:
+            rng = _rng(cfg, f'complain:{month}', apt.index)
+            if rng.random() >= cfg.complaint_rate:
+                continue
+            age = last - m
+            title, message, target = rng.choice(COMPLAINT_TEMPLATES)
+            created = _random_time_in_month(rng, _month_start(month))
+            if age >= 2 or rng.random() < 0.4:
+                status, response = 'resolved', 'Ban quản lý đã xử lý xong.'
+                updated = created + timedelta(hours=rng.randint(2, 240))
+            elif rng.random() < 0.5:
+                status, response, updated = 'in_progress', 'Đang xử lý.', created + timedelta(hours=rng.randint(1, 48))
+            else:
+                status, response, updated = 'pending', None, created
+            yield (_uuid(rng), rng.choice(apt.residents).id, title,
+                   message.format(floor=apt.floor), status, response, target, created, updated)
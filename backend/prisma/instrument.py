@@ -0,0 +1,204 @@
+"""
+Per-phase timing and resource instrumentation for the seed tooling.
+
+An Instrument records, for each named phase: wall and CPU time, rows
+written, SQL statements issued and bytes sent on the instrumented
+connection, and the RSS high-water mark reached by the end of the phase.
+ru_maxrss only ever grows over a process's lifetime, so that column is
+"process peak so far", not the memory the phase itself used: every phase
+after the heaviest one repeats its value.
+Statements and bytes are counted by CountingConnection/CountingCursor,
+which connect() uses when given instrument.connection_kwargs().
+
+Phases are opened either with `with inst.phase(name):` or linearly with
+inst.mark(name), which closes the previous phase. A disabled Instrument
+(the default) does nothing, so call sites need no conditionals.
+"""
+import json
+import resource
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import psycopg2.extensions
+
+
+class _CountingReader:
+    def __init__(self, source, conn):
+        self._source = source
+        self._conn = conn
+
+    def read(self, size=-1):
+        chunk = self._source.read(size)
+        self._conn.bytes_sent += len(chunk)
+        return chunk
+
+    def readline(self, size=-1):
+        chunk = self._source.readline(size)
+        self._conn.bytes_sent += len(chunk)
+        return chunk
+
+
+class CountingCursor(psycopg2.extensions.cursor):
+    def execute(self, query, vars=None):
+        try:
+            return super().execute(query, vars)
+        finally:
+            self.connection.statements += 1
+            self.connection.bytes_sent += len(self.query or b'')
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            self.connection.statements += len(vars_list)
+            self.connection.bytes_sent += len(self.query or b'') * len(vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        if hasattr(file, 'read'):
+            file = _CountingReader(file, self.connection)
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            self.connection.statements += 1
+            self.connection.bytes_sent += len(sql)
+
+
+class CountingConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = 0
+        self.bytes_sent = 0
+
+
+def connection_kwargs():
+    """Extra connect() arguments that enable statement/byte counting."""
+    return {'connection_factory': CountingConnection, 'cursor_factory': CountingCursor}
+
+
+def peak_rss_mb():
+    """Lifetime peak RSS of this process and of its (finished) children, in MB."""
+    scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss: byte trên macOS, KB trên Linux
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    return own / 1e6, children / 1e6
+
+
+@dataclass
+class PhaseStats:
+    name: str
+    wall_s: float = 0.0
+    cpu_s: float = None
+    rows: int = 0
+    statements: int = 0
+    bytes_sent: int = 0
+    # Đỉnh RSS của tiến trình tính đến cuối phase (ru_maxrss), không phải riêng phase này
+    rss_high_water_mb: float = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.wall_s if self.wall_s else 0.0
+
+
+class Instrument:
+    def __init__(self, enabled=False, conn=None):
+        self.enabled = enabled
+        self.conn = conn
+        self.phases = []
+        self._open = None
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+
+    def _counters(self):
+        statements = getattr(self.conn, 'statements', 0)
+        return statements, getattr(self.conn, 'bytes_sent', 0)
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        self.stop()
+        self._open = (PhaseStats(name), time.perf_counter(), time.process_time(),
+                      self._counters())
+
+    def stop(self):
+        if not self.enabled or self._open is None:
+            return
+        stats, wall, cpu, (statements, nbytes) = self._open
+        now_statements, now_bytes = self._counters()
+        stats.wall_s = time.perf_counter() - wall
+        stats.cpu_s = time.process_time() - cpu
+        stats.statements += now_statements - statements
+        stats.bytes_sent += now_bytes - nbytes
+        stats.rss_high_water_mb = max(peak_rss_mb())
+        self.phases.append(stats)
+        self._open = None
+
+    @contextmanager
+    def phase(self, name):
+        self.mark(name)
+        try:
+            yield self
+        finally:
+            self.stop()
+
+    def add_rows(self, rows):
+        if self.enabled and self._open is not None:
+            self._open[0].rows += rows
+
+    def record(self, name, rows=0, bytes_sent=0, wall_s=0.0, statements=0, cpu_s=None,
+               rss_mb=None):
+        """
+        Add figures measured elsewhere (e.g. a LoadStats from a worker process).
+        cpu_s adds up across calls; rss_mb is the worker's RSS high-water mark
+        and defaults to this process's.
+        """
+        if not self.enabled:
+            return
+        stats = next((phase for phase in self.phases if phase.name == name), None)
+        if stats is None:
+            stats = PhaseStats(name)
+            self.phases.append(stats)
+        stats.rows += rows
+        stats.bytes_sent += bytes_sent
+        stats.wall_s += wall_s
+        stats.statements += statements
+        if cpu_s is not None:
+            stats.cpu_s = (stats.cpu_s or 0.0) + cpu_s
+        if rss_mb is None:
+            rss_mb = max(peak_rss_mb())
+        stats.rss_high_water_mb = max(stats.rss_high_water_mb, rss_mb)
+
+    def report(self, argv=None):
+        self.stop()
+        own, children = peak_rss_mb()
+        return {
+            'started_at': self.started_at,
+            'argv': list(argv or []),
+            'wall_s': time.perf_counter() - self._started,
+            'cpu_s': time.process_time() - self._cpu_started,
+            'peak_rss_mb': own,
+            'peak_rss_children_mb': children,
+            'phases': [dict(asdict(phase), rows_per_second=phase.rows_per_second)
+                       for phase in self.phases],
+        }
+
+    def print_summary(self):
+        if not self.enabled:
+            return
+        self.stop()
+        print(f'\n⏱️  {"giai đoạn":<28} {"wall":>8} {"cpu":>8} {"dòng":>12} {"dòng/s":>10} '
+              f'{"lệnh":>7} {"MB gửi":>8} {"RSS*":>7}')
+        for phase in self.phases:
+            cpu = f'{phase.cpu_s:.2f}s' if phase.cpu_s is not None else '-'
+            print(f'   {phase.name:<28} {phase.wall_s:>7.2f}s {cpu:>8} {phase.rows:>12,} '
+                  f'{phase.rows_per_second:>10,.0f} {phase.statements:>7,} '
+                  f'{phase.bytes_sent / 1e6:>8.1f} {phase.rss_high_water_mb:>7.0f}')
+        print('   * MB, đỉnh RSS của tiến trình tính đến cuối giai đoạn (không riêng giai đoạn đó)')
+
+    def write_report(self, path, argv=None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(argv), f, indent=2)
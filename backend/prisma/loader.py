@@ -0,0 +1,132 @@
+"""
+COPY FROM STDIN loader fed directly by row generators.
+
+Rows are encoded to PostgreSQL's text COPY format in small chunks as
+psycopg2 asks for them, so a table of any size is streamed through a
+bounded buffer instead of being materialized as a list first.
+"""
+import dataclasses
+import re
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+
+_SPECIAL = re.compile(r'[\\\t\n\r]')
+_ESCAPES = {'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'}
+
+
+def _encode_str(value):
+    # Phần lớn chuỗi không có ký tự đặc biệt, chỉ escape khi cần
+    if _SPECIAL.search(value) is None:
+        return value
+    return _SPECIAL.sub(lambda match: _ESCAPES[match.group()], value)
+
+
+_ENCODERS = {
+    str: _encode_str,
+    bool: lambda value: 't' if value else 'f',
+    int: str,
+    float: repr,
+    datetime: lambda value: value.isoformat(sep=' '),
+    date: date.isoformat,
+}
+
+
+def encode_value(value):
+    if value is None:
+        return '\\N'
+    encoder = _ENCODERS.get(type(value))
+    if encoder is None:
+        return str(value)
+    return encoder(value)
+
+
+def encode_row(row):
+    return '\t'.join([encode_value(value) for value in row]) + '\n'
+
+
+class RowStream:
+    """
+    Minimal file-like object that copy_expert reads from. Each read() pulls
+    just enough rows from the generator to satisfy the requested size.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = bytearray()
+        self.rows = 0
+        self.bytes = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = 1 << 20
+        while len(self._buffer) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buffer += encode_row(row).encode('utf-8')
+            self.rows += 1
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes += len(chunk)
+        return chunk
+
+    def readline(self, size=-1):
+        return self.read(size)
+
+
+@dataclass
+class LoadStats:
+    table: str
+    rows: int
+    bytes: int
+    seconds: float
+    # Chỉ có khi chạy trong worker (parallel.run_task): CPU của tiến trình
+    # worker cho task này và đỉnh RSS của worker tính đến lúc đó (ru_maxrss)
+    cpu_s: float = None
+    rss_high_water_mb: float = None
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else float('inf')
+
+    def __str__(self):
+        return (f'{self.table}: {self.rows:,} dòng trong {self.seconds:.2f}s '
+                f'({self.rows_per_second:,.0f} dòng/s, {self.bytes / 1e6:.1f} MB)')
+
+
+def copy_rows(cur, table, columns, rows, buffer_size=1 << 20):
+    """Stream `rows` into `table` with COPY FROM STDIN and return LoadStats."""
+    stream = RowStream(rows)
+    started = time.perf_counter()
+    cur.copy_expert(
+        f'COPY {table} ({", ".join(columns)}) FROM STDIN',
+        stream,
+        size=buffer_size,
+    )
+    return LoadStats(table, stream.rows, stream.bytes, time.perf_counter() - started)
+
+
+def upsert_rows(cur, table, columns, rows, buffer_size=1 << 20):
+    """
+    COPY `rows` into a temporary staging table, then move them into `table`
+    with INSERT ... ON CONFLICT DO NOTHING. Rows that already exist (primary
+    key or any unique constraint) are skipped; LoadStats.rows counts only
+    the rows actually inserted.
+    """
+    stage = f'_stage_{table}'
+    started = time.perf_counter()
+    cur.execute(f'CREATE TEMP TABLE {stage} (LIKE {table} INCLUDING DEFAULTS)')
+    try:
+        stats = copy_rows(cur, stage, columns, rows, buffer_size)
+        column_list = ', '.join(columns)
+        cur.execute(
+            f'INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {stage} '
+            'ON CONFLICT DO NOTHING'
+        )
+        inserted = cur.rowcount
+    finally:
+        cur.execute(f'DROP TABLE IF EXISTS {stage}')
+    return dataclasses.replace(stats, table=table, rows=inserted,
+                               seconds=time.perf_counter() - started)
@@ -0,0 +1,293 @@
+"""
+Open-loop HTTP load generator for the NestJS API.
+
+Seeded accounts are logged in through POST /auth/login, then requests are
+fired at a fixed target rate, each one drawn from a role-weighted mix of
+dashboard routes. Latency is measured from the request's scheduled start,
+so a slow server shows up as queueing delay instead of silently lowering
+the offered load (coordinated omission).
+
+Accounts and passwords come from the same ScaleConfig/password strategy as
+seed.py, and every seed.py option is accepted, so one command can seed and
+then benchmark:
+
+    python prisma/loadtest.py --seed-first --apartments 20000 --workers 8 \\
+        --rps 200 --duration 60 --mix resident=6,accountant=2,guard=1,admin=1
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import aiohttp
+
+from credentials import DEFAULT_PASSWORD, password_for
+import generators as gen
+import seed
+
+
+ROLES = ('resident', 'accountant', 'guard', 'admin')
+
+# Tài khoản của dữ liệu demo (seed.py không có --apartments)
+DEMO_ACCOUNTS = {
+    'resident': ['nguyenvanan@gmail.com', 'tranthibinh@gmail.com',
+                 'leminhcuong@gmail.com', 'phamthudung@gmail.com'],
+    'guard': ['guard1@gmail.com', 'guard2@gmail.com', 'guard3@gmail.com'],
+}
+
+
+def _shift_range(days):
+    start = date.today()
+    return f'startDate={start.isoformat()}&endDate={(start + timedelta(days=days)).isoformat()}'
+
+
+# (route dùng để gom thống kê, hàm sinh path từ phiên đăng nhập)
+SCENARIOS = {
+    'resident': [
+        ('GET /invoices/resident/:id', lambda s: f'/invoices/resident/{s.user_id}'),
+        ('GET /resident-notifications/by-resident',
+         lambda s: f'/resident-notifications/by-resident?residentId={s.user_id}'),
+        ('GET /complains?residentId', lambda s: f'/complains?residentId={s.user_id}'),
+        ('GET /auth/profile', lambda s: '/auth/profile'),
+    ],
+    'accountant': [
+        ('GET /invoices', lambda s: '/invoices'),
+        ('GET /services', lambda s: '/services'),
+    ],
+    'guard': [
+        ('GET /shifts?range', lambda s: f'/shifts?{_shift_range(7)}'),
+        ('GET /complains', lambda s: '/complains'),
+    ],
+    'admin': [
+        ('GET /residents', lambda s: '/residents'),
+        ('GET /apartments', lambda s: '/apartments'),
+        ('GET /notifications', lambda s: '/notifications'),
+        ('GET /complains', lambda s: '/complains'),
+    ],
+}
+
+
+@dataclass
+class Session:
+    role: str
+    email: str
+    token: str
+    user_id: str
+
+    @property
+    def headers(self):
+        return {'Authorization': f'Bearer {self.token}'}
+
+
+@dataclass
+class RouteStats:
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    statuses: dict = field(default_factory=dict)
+
+    def record(self, seconds, status):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not isinstance(status, int) or status >= 400:
+            self.errors += 1
+
+    def percentile(self, p):
+        """Nearest-rank percentile in milliseconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, -(-len(ordered) * p // 100))
+        return ordered[int(rank) - 1] * 1000
+
+    def summary(self, elapsed):
+        count = len(self.latencies)
+        return {
+            'requests': count,
+            'rps': count / elapsed if elapsed else 0.0,
+            'errors': self.errors,
+            'error_rate': self.errors / count if count else 0.0,
+            'p50_ms': self.percentile(50),
+            'p95_ms': self.percentile(95),
+            'p99_ms': self.percentile(99),
+            'max_ms': max(self.latencies, default=0.0) * 1000,
+            'statuses': {str(status): n for status, n in self.statuses.items()},
+        }
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        role, _, weight = part.partition('=')
+        role = role.strip()
+        if role not in ROLES:
+            raise argparse.ArgumentTypeError(f'Vai trò không hợp lệ: {role}')
+        mix[role] = float(weight or 1)
+    return mix
+
+
+def scale_accounts(cfg, role, limit, rng):
+    """Emails of `limit` seeded accounts of `role` in scale mode."""
+    if role == 'resident':
+        # Chủ căn hộ (k = 0) luôn được duyệt nên đăng nhập được
+        indexes = rng.sample(range(cfg.apartments), min(limit, cfg.apartments))
+        return [f'resident{index:07d}.0@bluemoon.vn' for index in indexes]
+    count = cfg.guards if role == 'guard' else cfg.staff_per_role
+    return [gen.staff_member(cfg, role, i).email for i in range(min(limit, count))]
+
+
+def account_plan(seed_args, mix, users_per_role, rng):
+    """[(role, email, password)] for every role in the mix."""
+    plan = []
+    if seed_args.apartments:
+        cfg = seed.scale_config(seed_args)
+        for role in mix:
+            for email in scale_accounts(cfg, role, users_per_role, rng):
+                plan.append((role, email, password_for(cfg.password_strategy, email,
+                                                       cfg.password_pool_size)))
+    else:
+        for role in mix:
+            for email in DEMO_ACCOUNTS.get(role, [])[:users_per_role]:
+                plan.append((role, email, DEFAULT_PASSWORD))
+    return plan
+
+
+async def login(http, base_url, role, email, password):
+    async with http.post(f'{base_url}/auth/login',
+                         json={'email': email, 'password': password}) as response:
+        body = await response.json(content_type=None)
+        if response.status >= 400:
+            raise RuntimeError(f'{email}: {response.status} {body}')
+        return Session(role, email, body['access_token'], body['user']['id'])
+
+
+async def login_all(http, base_url, plan, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(role, email, password):
+        async with semaphore:
+            try:
+                return await login(http, base_url, role, email, password)
+            except (aiohttp.ClientError, RuntimeError, KeyError) as e:
+                print(f'⚠️  Đăng nhập thất bại {e}')
+                return None
+
+    sessions = await asyncio.gather(*(one(*account) for account in plan))
+    return [session for session in sessions if session is not None]
+
+
+async def fire(http, base_url, session, route, path, scheduled, stats, semaphore):
+    async with semaphore:
+        try:
+            async with http.get(f'{base_url}{path}', headers=session.headers) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            status = type(e).__name__
+    stats.setdefault(route, RouteStats()).record(time.perf_counter() - scheduled, status)
+
+
+async def run_load(http, base_url, sessions, mix, rps, duration, concurrency, rng):
+    """Issue requests at `rps` for `duration` seconds; returns ({route: RouteStats}, elapsed)."""
+    by_role = {}
+    for session in sessions:
+        by_role.setdefault(session.role, []).append(session)
+    roles = [role for role in mix if role in by_role]
+    weights = [mix[role] for role in roles]
+
+    stats = {}
+    semaphore = asyncio.Semaphore(concurrency)
+    pending = set()
+    interval = 1.0 / rps
+    started = time.perf_counter()
+    total = int(rps * duration)
+    for i in range(total):
+        scheduled = started + i * interval
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        role = rng.choices(roles, weights)[0]
+        session = rng.choice(by_role[role])
+        route, make_path = rng.choice(SCENARIOS[role])
+        task = asyncio.create_task(fire(http, base_url, session, route, make_path(session),
+                                        scheduled, stats, semaphore))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+    return stats, time.perf_counter() - started
+
+
+def print_report(stats, elapsed):
+    header = f'{"route":<44} {"req":>7} {"rps":>7} {"err%":>6} {"p50":>8} {"p95":>8} {"p99":>8}'
+    print('\n' + header)
+    print('-' * len(header))
+    overall = RouteStats()
+    for route in sorted(stats):
+        s = stats[route]
+        overall.latencies.extend(s.latencies)
+        overall.errors += s.errors
+        row = s.summary(elapsed)
+        print(f'{route:<44} {row["requests"]:>7,} {row["rps"]:>7.1f} '
+              f'{row["error_rate"] * 100:>5.1f}% {row["p50_ms"]:>6.0f}ms '
+              f'{row["p95_ms"]:>6.0f}ms {row["p99_ms"]:>6.0f}ms')
+    row = overall.summary(elapsed)
+    print('-' * len(header))
+    print(f'{"TỔNG":<44} {row["requests"]:>7,} {row["rps"]:>7.1f} '
+          f'{row["error_rate"] * 100:>5.1f}% {row["p50_ms"]:>6.0f}ms '
+          f'{row["p95_ms"]:>6.0f}ms {row["p99_ms"]:>6.0f}ms')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Load test API BlueMoon (các tùy chọn khác được chuyển cho seed.py)',
+        allow_abbrev=False)
+    parser.add_argument('--base-url', default='http://localhost:3000')
+    parser.add_argument('--rps', type=float, default=50, help='Số request mỗi giây mục tiêu')
+    parser.add_argument('--duration', type=float, default=30, help='Thời gian chạy (giây)')
+    parser.add_argument('--concurrency', type=int, default=100,
+                        help='Số request đồng thời tối đa')
+    parser.add_argument('--mix', type=parse_mix,
+                        default=parse_mix('resident=6,accountant=2,guard=1,admin=1'),
+                        help='Tỉ trọng vai trò, ví dụ resident=6,accountant=2,guard=1,admin=1')
+    parser.add_argument('--users-per-role', type=int, default=50,
+                        help='Số tài khoản đăng nhập cho mỗi vai trò')
+    parser.add_argument('--seed-first', action='store_true',
+                        help='Chạy seed.py với cùng tùy chọn trước khi đo')
+    parser.add_argument('--json', help='Ghi kết quả ra file JSON')
+    args, seed_argv = parser.parse_known_args(argv)
+    return args, seed_argv, seed.parse_args(seed_argv)
+
+
+async def main_async(args, seed_args):
+    rng = random.Random(seed_args.seed)
+    plan = account_plan(seed_args, args.mix, args.users_per_role, rng)
+    timeout = aiohttp.ClientTimeout(total=60)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as http:
+        sessions = await login_all(http, args.base_url, plan, min(args.concurrency, 16))
+        if not sessions:
+            raise SystemExit('❌ Không đăng nhập được tài khoản nào')
+        print(f'🔑 Đã đăng nhập {len(sessions)}/{len(plan)} tài khoản')
+        print(f'🚀 {args.rps:g} req/s trong {args.duration:g}s → {args.base_url}')
+        return await run_load(http, args.base_url, sessions, args.mix, args.rps,
+                              args.duration, args.concurrency, rng)
+
+
+def main(argv=None):
+    args, seed_argv, seed_args = parse_args(argv)
+    if args.seed_first:
+        seed.main(seed_argv)
+
+    stats, elapsed = asyncio.run(main_async(args, seed_args))
+    print_report(stats, elapsed)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({route: s.summary(elapsed) for route, s in stats.items()}, f, indent=2)
+        print(f'\n💾 Đã ghi {args.json}')
+
+
+if __name__ == '__main__':
+    main()
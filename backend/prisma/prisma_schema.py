@@ -0,0 +1,314 @@
+"""
+Schema model parsed from schema.prisma, shared by the Python tooling.
+
+Column names (@map), table names (@@map), types, primary/unique keys,
+indexes and relations are read from the same file Prisma uses, so column
+lists and table dependency order are never hand-copied or probed from
+information_schema at run time.
+
+load() parses the file once per process and caches the parsed model under
+prisma/.cache keyed by the SHA-256 of schema.prisma; editing the schema
+invalidates the cache automatically, and the stale file is removed on the
+next write.
+
+    SCHEMA = prisma_schema.load()
+    SCHEMA.columns('residents', 'id', 'fullName')   # ('"ID_Resident"', 'name')
+    SCHEMA.dependency_order(['invoices', 'services'])  # bảng cha trước
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import tempfile
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(HERE, 'schema.prisma')
+# Dùng chung thư mục cache với bcrypt hash cache (credentials.py)
+CACHE_DIR = os.path.join(HERE, '.cache')
+# Tăng khi cấu trúc dữ liệu cache thay đổi
+CACHE_VERSION = 1
+
+_BLOCK = re.compile(r'^(model|enum)\s+(\w+)\s*\{(.*?)^\}', re.MULTILINE | re.DOTALL)
+_FIELD = re.compile(r'^(\w+)\s+(\w+)(\[\])?(\?)?\s*(.*)$')
+_ATTRIBUTE = re.compile(r'@@?([\w.]+)')
+_UNQUOTED = re.compile(r'^[a-z_][a-z0-9_]*$')
+_RESERVED = {'all', 'and', 'as', 'check', 'column', 'default', 'desc', 'from', 'group',
+             'limit', 'order', 'table', 'to', 'user', 'where'}
+
+
+def quote_ident(name):
+    """Quote a column/table name the way PostgreSQL's quote_ident() would."""
+    if _UNQUOTED.match(name) and name not in _RESERVED:
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+@dataclass(frozen=True)
+class Field:
+    name: str
+    type: str
+    column: str
+    optional: bool = False
+    is_list: bool = False
+    # Kiểu là một model khác (quan hệ), không phải cột
+    is_relation: bool = False
+    default: str = None
+    updated_at: bool = False
+    db_type: str = None
+    # Với phía giữ khóa ngoại: @relation(fields: [...], references: [...])
+    relation_fields: tuple = ()
+    references: tuple = ()
+
+    @property
+    def quoted(self):
+        return quote_ident(self.column)
+
+
+@dataclass(frozen=True)
+class Model:
+    name: str
+    table: str
+    fields: tuple
+    primary_key: tuple
+    unique: tuple = ()
+    indexes: tuple = ()
+
+    @property
+    def scalar_fields(self):
+        return tuple(field for field in self.fields if not field.is_relation)
+
+    @property
+    def foreign_keys(self):
+        return tuple(field for field in self.fields if field.relation_fields)
+
+    def field(self, name):
+        for field in self.fields:
+            if field.name == name:
+                return field
+        raise KeyError(f'{self.name} không có trường {name!r} trong schema.prisma')
+
+    def columns(self, *names):
+        """Quoted columns for the given Prisma field names (default: every scalar field)."""
+        fields = [self.field(name) for name in names] if names else self.scalar_fields
+        for field in fields:
+            if field.is_relation:
+                raise ValueError(f'{self.name}.{field.name} là quan hệ, không phải cột')
+        return tuple(field.quoted for field in fields)
+
+
+class Schema:
+    def __init__(self, models):
+        self.models = {model.name: model for model in models}
+        self._tables = {model.table: model for model in models}
+
+    def model(self, table):
+        """Model by table name (@@map) or by Prisma model name."""
+        model = self._tables.get(table) or self.models.get(table)
+        if model is None:
+            raise KeyError(f'Không có bảng {table!r} trong schema.prisma')
+        return model
+
+    def columns(self, table, *fields):
+        return self.model(table).columns(*fields)
+
+    def depends_on(self, table):
+        """Tables `table` references through foreign keys, in declaration order."""
+        parents = []
+        for field in self.model(table).foreign_keys:
+            parent = self.models[field.type].table
+            if parent != self.model(table).table and parent not in parents:
+                parents.append(parent)
+        return tuple(parents)
+
+    def dependency_order(self, tables=None):
+        """`tables` (default: all) ordered so that referenced tables come first."""
+        tables = list(tables) if tables is not None else list(self._tables)
+        ordered, visiting = [], set()
+
+        def visit(table):
+            if table in ordered:
+                return
+            if table in visiting:
+                raise ValueError(f'Phụ thuộc vòng giữa các bảng qua {table}')
+            visiting.add(table)
+            for parent in self.depends_on(table):
+                if parent in tables:
+                    visit(parent)
+            visiting.discard(table)
+            ordered.append(table)
+
+        for table in tables:
+            visit(self.model(table).table)
+        return ordered
+
+    def to_json(self):
+        return {'version': CACHE_VERSION,
+                'models': [asdict(model) for model in self.models.values()]}
+
+    @classmethod
+    def from_json(cls, data):
+        models = []
+        for model in data['models']:
+            fields = tuple(Field(**{key: tuple(value) if isinstance(value, list) else value
+                                    for key, value in field.items()})
+                           for field in model['fields'])
+            models.append(Model(
+                name=model['name'],
+                table=model['table'],
+                fields=fields,
+                primary_key=tuple(model['primary_key']),
+                unique=tuple(tuple(key) for key in model['unique']),
+                indexes=tuple(tuple(key) for key in model['indexes']),
+            ))
+        return cls(models)
+
+
+def _strip_comment(line):
+    in_string = False
+    for i, char in enumerate(line):
+        if char == '"' and (i == 0 or line[i - 1] != '\\'):
+            in_string = not in_string
+        elif not in_string and line.startswith('//', i):
+            return line[:i]
+    return line
+
+
+def _attributes(text):
+    """[(name, arguments or None)] for every @attr / @@attr in `text`."""
+    found, pos = [], 0
+    while True:
+        match = _ATTRIBUTE.search(text, pos)
+        if not match:
+            return found
+        start = pos = match.end()
+        if start < len(text) and text[start] == '(':
+            # Tìm dấu ) tương ứng, bỏ qua ngoặc và @ nằm trong chuỗi
+            depth, in_string = 0, False
+            for pos in range(start, len(text)):
+                char = text[pos]
+                if char == '"' and text[pos - 1] != '\\':
+                    in_string = not in_string
+                elif not in_string and char in '()':
+                    depth += 1 if char == '(' else -1
+                    if depth == 0:
+                        break
+            found.append((match.group(1), text[start + 1:pos]))
+            pos += 1
+        else:
+            found.append((match.group(1), None))
+
+
+def _string_arg(args):
+    match = re.search(r'"((?:[^"\\]|\\.)*)"', args or '')
+    return match.group(1) if match else None
+
+
+def _list_arg(args, key=None):
+    pattern = rf'{key}\s*:\s*\[([^\]]*)\]' if key else r'\[([^\]]*)\]'
+    match = re.search(pattern, args or '')
+    if not match:
+        return ()
+    # createdAt(sort: Desc) -> createdAt
+    return tuple(item.split('(')[0].strip() for item in match.group(1).split(',') if item.strip())
+
+
+def parse(text):
+    blocks = [(kind, name, body) for kind, name, body in _BLOCK.findall(text)]
+    model_names = {name for kind, name, _ in blocks if kind == 'model'}
+
+    models = []
+    for kind, name, body in blocks:
+        if kind != 'model':
+            continue
+        table, fields, primary_key, unique, indexes = name, [], (), [], []
+        for raw in body.splitlines():
+            line = _strip_comment(raw).strip()
+            if not line:
+                continue
+            if line.startswith('@@'):
+                for attr, args in _attributes(line):
+                    if attr == 'map':
+                        table = _string_arg(args)
+                    elif attr == 'id':
+                        primary_key = _list_arg(args)
+                    elif attr == 'unique':
+                        unique.append(_list_arg(args))
+                    elif attr == 'index':
+                        indexes.append(_list_arg(args))
+                continue
+
+            match = _FIELD.match(line)
+            if not match:
+                raise ValueError(f'Không đọc được dòng trong model {name}: {raw.strip()!r}')
+            field_name, field_type, is_list, optional, rest = match.groups()
+            options = {'column': field_name}
+            for attr, args in _attributes(rest):
+                if attr == 'map':
+                    options['column'] = _string_arg(args)
+                elif attr == 'id':
+                    primary_key = (field_name,)
+                elif attr == 'unique':
+                    unique.append((field_name,))
+                elif attr == 'default':
+                    options['default'] = args
+                elif attr == 'updatedAt':
+                    options['updated_at'] = True
+                elif attr == 'relation':
+                    options['relation_fields'] = _list_arg(args, 'fields')
+                    options['references'] = _list_arg(args, 'references')
+                elif attr.startswith('db.'):
+                    options['db_type'] = attr[3:]
+            fields.append(Field(name=field_name, type=field_type, optional=bool(optional),
+                                is_list=bool(is_list), is_relation=field_type in model_names,
+                                **options))
+        models.append(Model(name, table, tuple(fields), primary_key, tuple(unique),
+                            tuple(indexes)))
+    return Schema(models)
+
+
+@lru_cache(maxsize=None)
+def load(path=SCHEMA_PATH, cache_dir=CACHE_DIR):
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f'schema-{digest}.json')
+
+    try:
+        with open(cache_path, encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') == CACHE_VERSION:
+            return Schema.from_json(data)
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    schema = parse(content.decode('utf-8'))
+    try:
+        _write_cache(cache_dir, cache_path, schema)
+    except OSError:
+        pass  # Cache chỉ để tăng tốc, thư mục chỉ đọc thì vẫn dùng kết quả vừa parse
+    return schema
+
+
+def _write_cache(cache_dir, cache_path, schema):
+    os.makedirs(cache_dir, exist_ok=True)
+    # File tạm riêng cho mỗi tiến trình: các worker parse cùng lúc không ghi đè lẫn nhau
+    with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_dir, prefix='schema-',
+                                     suffix='.tmp', delete=False) as f:
+        tmp_path = f.name
+        try:
+            json.dump(schema.to_json(), f, ensure_ascii=False)
+        except BaseException:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+    os.replace(tmp_path, cache_path)
+    # Mỗi lần sửa schema.prisma sinh một file mới, xóa các bản của schema cũ
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name.startswith('schema-') and name.endswith('.json') and path != cache_path:
+            with contextlib.suppress(OSError):
+                os.remove(path)
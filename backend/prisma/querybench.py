@@ -0,0 +1,293 @@
+"""
+Benchmark the hot Prisma queries as plain SQL and keep a JSON baseline.
+
+Each query mirrors a findMany in the NestJS services (same filters,
+include joins and ordering, no LIMIT). For every dataset the suite records
+per-query timings, the EXPLAIN (ANALYZE, BUFFERS) plan, sequential scans on
+filtered tables, and foreign keys without a supporting index.
+
+    # đo trên DB hiện tại và lưu baseline
+    python prisma/querybench.py --save bench.json
+    # seed lần lượt ~1k/100k/1M hóa đơn rồi so với baseline
+    python prisma/querybench.py --invoices 1000,100000,1000000 --workers 8 --compare bench.json
+"""
+import argparse
+import json
+import math
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+
+from db import connect
+from generators import SERVICE_TYPES
+import seed
+
+
+@dataclass(frozen=True)
+class BenchQuery:
+    name: str
+    source: str
+    sql: str
+    # SQL trả về một dòng tham số thực tế cho truy vấn (None = không tham số)
+    params_sql: str = None
+
+
+RESIDENT_SELECT = 'r."ID_Resident", r.name, r.email, r.phone'
+
+QUERIES = [
+    BenchQuery(
+        'invoices.findAll', 'InvoiceService.findAll',
+        f"""SELECT i.*, s.*, {RESIDENT_SELECT}
+            FROM invoices i
+            JOIN services s ON s."ID_khoan_thu" = i."ID_service"
+            JOIN residents r ON r."ID_Resident" = i."ID_resident"
+            ORDER BY i."CreateDate" DESC""",
+    ),
+    BenchQuery(
+        'invoices.byResident', 'InvoiceService.getAllByResidentId',
+        f"""SELECT i.*, s.*, {RESIDENT_SELECT}
+            FROM invoices i
+            JOIN services s ON s."ID_khoan_thu" = i."ID_service"
+            JOIN residents r ON r."ID_Resident" = i."ID_resident"
+            WHERE i."ID_resident" = %s
+            ORDER BY i."CreateDate" DESC""",
+        'SELECT "ID_resident" FROM invoices LIMIT 1',
+    ),
+    BenchQuery(
+        'invoices.byService', 'InvoiceService.getAllByServiceId',
+        f"""SELECT i.*, s.*, {RESIDENT_SELECT}
+            FROM invoices i
+            JOIN services s ON s."ID_khoan_thu" = i."ID_service"
+            JOIN residents r ON r."ID_Resident" = i."ID_resident"
+            WHERE i."ID_service" = %s
+            ORDER BY i."CreateDate" DESC""",
+        'SELECT "ID_service" FROM invoices LIMIT 1',
+    ),
+    BenchQuery(
+        'shifts.range', 'ShiftService.findAll(startDate, endDate)',
+        f"""SELECT sh.*, {RESIDENT_SELECT}
+            FROM shifts sh
+            JOIN residents r ON r."ID_Resident" = sh."ID_guard"
+            WHERE sh.date >= %s AND sh.date <= %s
+            ORDER BY sh.date ASC""",
+        """SELECT date_trunc('day', NOW()), date_trunc('day', NOW()) + interval '7 days'""",
+    ),
+    BenchQuery(
+        'resident_notifications.byResident',
+        'ResidentNotificationService.getNotificationsByResident',
+        """SELECT rn.*, n.*
+           FROM resident_notifications rn
+           JOIN notifications n ON n.id_notification = rn."notification_ID"
+           WHERE rn."Resident_ID" = %s""",
+        'SELECT "Resident_ID" FROM resident_notifications LIMIT 1',
+    ),
+    BenchQuery(
+        'services.totalByMonth', 'seed.py / dashboard tổng phí theo tháng',
+        'SELECT SUM("totalAmount") FROM services WHERE month = %s',
+        'SELECT MAX(month) FROM services',
+    ),
+]
+
+# Khóa ngoại không có index nào bắt đầu bằng đúng các cột của nó
+UNINDEXED_FOREIGN_KEYS_SQL = """
+    SELECT c.conrelid::regclass::text, c.conname,
+           array_agg(a.attname ORDER BY k.ord)
+    FROM pg_constraint c
+    CROSS JOIN LATERAL unnest(c.conkey) WITH ORDINALITY AS k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum
+    WHERE c.contype = 'f'
+      AND c.connamespace = 'public'::regnamespace
+      AND NOT EXISTS (
+          SELECT 1 FROM pg_index i
+          WHERE i.indrelid = c.conrelid
+            AND (string_to_array(i.indkey::text, ' ')::int2[])[1:cardinality(c.conkey)]
+                @> c.conkey
+      )
+    GROUP BY c.conrelid, c.conname
+    ORDER BY 1, 2
+"""
+
+
+def query_params(cur, query):
+    if query.params_sql is None:
+        return None
+    cur.execute(query.params_sql)
+    row = cur.fetchone()
+    return tuple(row) if row else None
+
+
+def explain(cur, query, params):
+    cur.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query.sql}', params)
+    return cur.fetchone()[0][0]
+
+
+def iter_plan_nodes(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from iter_plan_nodes(child)
+
+
+def seq_scans(plan, min_rows=1000):
+    """Filtered sequential scans that read at least `min_rows` rows."""
+    found = []
+    for node in iter_plan_nodes(plan['Plan']):
+        if node['Node Type'] != 'Seq Scan' or 'Filter' not in node:
+            continue
+        scanned = node.get('Actual Rows', 0) + node.get('Rows Removed by Filter', 0)
+        if scanned >= min_rows:
+            found.append({'table': node['Relation Name'], 'filter': node['Filter'],
+                          'rows_scanned': scanned})
+    return found
+
+
+def time_query(cur, query, params, repeat, warmup):
+    for _ in range(warmup):
+        cur.execute(query.sql, params)
+        cur.fetchall()
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cur.execute(query.sql, params)
+        rows = len(cur.fetchall())
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'rows': rows,
+        'min_ms': timings[0],
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, math.ceil(len(timings) * 0.95) - 1)],
+    }
+
+
+def unindexed_foreign_keys(cur):
+    cur.execute(UNINDEXED_FOREIGN_KEYS_SQL)
+    return [{'table': table, 'constraint': name, 'columns': list(columns)}
+            for table, name, columns in cur.fetchall()]
+
+
+def table_counts(cur):
+    counts = {}
+    for table in seed.SEED_TABLES:
+        cur.execute(f'SELECT COUNT(*) FROM {table}')
+        counts[table] = cur.fetchone()[0]
+    return counts
+
+
+def run_suite(cur, repeat=5, warmup=1):
+    """Benchmark every query on the current database."""
+    cur.execute('ANALYZE')
+    results = {}
+    for query in QUERIES:
+        params = query_params(cur, query)
+        if query.params_sql is not None and params is None:
+            results[query.name] = {'source': query.source, 'skipped': 'không có dữ liệu'}
+            continue
+        plan = explain(cur, query, params)
+        result = time_query(cur, query, params, repeat, warmup)
+        result.update(
+            source=query.source,
+            plan_ms=plan['Execution Time'],
+            seq_scans=seq_scans(plan),
+            plan=plan,
+        )
+        results[query.name] = result
+    return {
+        'counts': table_counts(cur),
+        'unindexed_foreign_keys': unindexed_foreign_keys(cur),
+        'queries': results,
+    }
+
+
+def dataset_label(counts):
+    return f'{counts["invoices"]:,} invoices'
+
+
+def compare(baseline, current, tolerance):
+    """[(dataset, query, baseline_ms, current_ms)] whose median grew beyond `tolerance`x."""
+    regressions = []
+    for label, dataset in current.items():
+        old_queries = baseline.get(label, {}).get('queries', {})
+        for name, result in dataset['queries'].items():
+            old = old_queries.get(name, {})
+            if 'median_ms' in old and 'median_ms' in result \
+                    and result['median_ms'] > old['median_ms'] * tolerance:
+                regressions.append((label, name, old['median_ms'], result['median_ms']))
+    return regressions
+
+
+def print_dataset(label, dataset):
+    print(f'\n📊 {label}')
+    for name, result in dataset['queries'].items():
+        if 'skipped' in result:
+            print(f'   - {name}: bỏ qua ({result["skipped"]})')
+            continue
+        print(f'   ✓ {name}: {result["rows"]:,} dòng, median {result["median_ms"]:.1f}ms, '
+              f'p95 {result["p95_ms"]:.1f}ms')
+        for scan in result['seq_scans']:
+            print(f'     ⚠️  Seq Scan {scan["table"]} ({scan["rows_scanned"]:,} dòng) '
+                  f'lọc theo {scan["filter"]}')
+    for fk in dataset['unindexed_foreign_keys']:
+        print(f'   ⚠️  Khóa ngoại thiếu index: {fk["table"]}({", ".join(fk["columns"])})')
+
+
+def apartments_for(invoices, months):
+    return max(1, math.ceil(invoices / (months * len(SERVICE_TYPES))))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark truy vấn Prisma bằng SQL tương đương')
+    parser.add_argument('--invoices',
+                        help='Danh sách số hóa đơn cần seed trước mỗi lần đo, ví dụ '
+                             '1000,100000,1000000 (mặc định: đo DB hiện tại)')
+    parser.add_argument('--months', type=int, default=12)
+    parser.add_argument('--workers', type=int, default=1, help='Truyền cho seed.py')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--save', help='Ghi kết quả làm baseline JSON')
+    parser.add_argument('--compare', help='So sánh với baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help='Báo hồi quy khi median vượt baseline x tolerance')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.invoices.split(',')] if args.invoices else [None]
+
+    datasets = {}
+    for size in sizes:
+        if size is not None:
+            apartments = apartments_for(size, args.months)
+            seed.main(['--apartments', str(apartments), '--months', str(args.months),
+                       '--workers', str(args.workers)])
+        conn = connect()
+        try:
+            with conn.cursor() as cur:
+                dataset = run_suite(cur, args.repeat, args.warmup)
+        finally:
+            conn.close()
+        label = dataset_label(dataset['counts'])
+        datasets[label] = dataset
+        print_dataset(label, dataset)
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(datasets, f, indent=2, default=str)
+        print(f'\n💾 Đã ghi baseline {args.save}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, datasets, args.tolerance)
+        if regressions:
+            print(f'\n❌ {len(regressions)} truy vấn chậm hơn baseline x{args.tolerance:g}:')
+            for label, name, old_ms, new_ms in regressions:
+                print(f'   - [{label}] {name}: {old_ms:.1f}ms → {new_ms:.1f}ms')
+            sys.exit(1)
+        print(f'\n✅ Không có hồi quy so với {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,297 @@
+"""
+Streaming resident/apartment exports for the Police and Admin reports.
+
+ResidentsStatusView and ResidentsView load every resident through the live
+API. For periodic reports this script reads from a read-only connection
+instead: --read-url, else READ_DATABASE_URL (a replica), else DATABASE_URL.
+Every dataset is streamed through a server-side named cursor, --batch-size
+rows per round trip, and written batch by batch to CSV or Parquet, so
+memory stays constant however many residents there are. All datasets of
+one run share a single REPEATABLE READ snapshot.
+
+Datasets:
+    residents   every resident with apartment name and temporaryStatus
+    temporary   only residents marked tạm vắng (temporaryStatus = true); a
+                --since delta holds every resident changed since then with
+                their temporaryStatus, so residents who came back (false)
+                are dropped by the consumer instead of going stale
+    apartments  apartments with owner, headcount and number of residents away
+
+--since exports only rows changed after a timestamp (residents.updated_at,
+or their apartment's). It accepts an ISO timestamp or the manifest.json of
+a previous export. updated_at holds UTC without a time zone (as Prisma
+writes it), so a timestamp without an offset is read as UTC and one with an
+offset (+07:00, Z) is converted to UTC first. A manifest's `until` is
+reused minus DELTA_OVERLAP to catch updates that were still uncommitted
+when that snapshot was taken; a row may therefore appear in two deltas.
+Deleted rows never appear in a delta, so run a full export periodically.
+
+    python prisma/reports.py exports/full
+    python prisma/reports.py exports/delta --since exports/full/manifest.json --format parquet
+"""
+import argparse
+import csv
+import gzip
+import itertools
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from db import connect_readonly
+
+
+FORMATS = ('csv', 'parquet')
+MANIFEST = 'manifest.json'
+DEFAULT_BATCH_SIZE = 20_000
+DELTA_OVERLAP = timedelta(minutes=5)
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    sql: str
+    # (tên cột, kiểu pyarrow) theo đúng thứ tự SELECT
+    columns: tuple
+    # Điều kiện {where} chỉ áp dụng cho bản xuất đầy đủ
+    where: str = 'TRUE'
+
+    def query(self, since=None):
+        """SQL for a full export, or for a delta when `since` is given."""
+        return self.sql.format(where='TRUE' if since is not None else self.where)
+
+
+RESIDENT_COLUMNS = (
+    ('id', 'string'), ('fullName', 'string'), ('email', 'string'), ('phone', 'string'),
+    ('idNumber', 'string'), ('role', 'string'), ('apartmentId', 'string'),
+    ('apartmentName', 'string'), ('temporaryStatus', 'bool'), ('statusLabel', 'string'),
+    ('approved', 'bool'), ('updatedAt', 'timestamp'),
+)
+
+RESIDENT_SQL = """
+    SELECT r."ID_Resident", r.name, r.email, r.phone, r."CMND", r.role,
+           r."ID_apartment", a."Name", r."temporaryStatus",
+           CASE WHEN r."temporaryStatus" THEN 'Tạm vắng' ELSE 'Đang cư trú' END,
+           r.approved, r.updated_at
+    FROM residents r
+    LEFT JOIN apartments a ON a."ID_Apartment" = r."ID_apartment"
+    WHERE {where}
+      AND (%(since)s::timestamp IS NULL OR r.updated_at > %(since)s OR a.updated_at > %(since)s)
+      AND (%(roles)s::text[] IS NULL OR r.role = ANY(%(roles)s))
+    ORDER BY r."ID_Resident"
+"""
+
+DATASETS = {
+    'residents': Dataset('residents', RESIDENT_SQL, RESIDENT_COLUMNS),
+    'temporary': Dataset('temporary', RESIDENT_SQL, RESIDENT_COLUMNS,
+                         where='r."temporaryStatus"'),
+    'apartments': Dataset(
+        'apartments',
+        """
+        SELECT a."ID_Apartment", a."Name", a.area, a.contract_startdate, a.contract_enddate,
+               a."ID_owner", o.name, COALESCE(c.residents, 0), COALESCE(c.away, 0),
+               a.updated_at
+        FROM apartments a
+        LEFT JOIN residents o ON o."ID_Resident" = a."ID_owner"
+        LEFT JOIN (
+            SELECT "ID_apartment", COUNT(*) AS residents,
+                   COUNT(*) FILTER (WHERE "temporaryStatus") AS away,
+                   MAX(updated_at) AS updated_at
+            FROM residents
+            WHERE %(roles)s::text[] IS NULL OR role = ANY(%(roles)s)
+            GROUP BY "ID_apartment"
+        ) c ON c."ID_apartment" = a."ID_Apartment"
+        WHERE %(since)s::timestamp IS NULL OR a.updated_at > %(since)s
+              OR c.updated_at > %(since)s
+        ORDER BY a."ID_Apartment"
+        """,
+        (
+            ('id', 'string'), ('name', 'string'), ('area', 'float64'),
+            ('contractStartDate', 'timestamp'), ('contractEndDate', 'timestamp'),
+            ('ownerId', 'string'), ('ownerName', 'string'), ('residents', 'int64'),
+            ('away', 'int64'), ('updatedAt', 'timestamp'),
+        ),
+    ),
+}
+
+
+class CsvSink:
+    """UTF-8 with BOM like the dashboards' CSV export, so Excel shows Vietnamese."""
+
+    extension = 'csv'
+
+    def __init__(self, path, columns, compress=False):
+        if compress:
+            self._file = gzip.open(path, 'wt', encoding='utf-8-sig', newline='')
+        else:
+            self._file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetSink:
+    """One row group per batch; needs pyarrow (imported only when used)."""
+
+    extension = 'parquet'
+
+    def __init__(self, path, columns, compress=False):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self._pa = pa
+        types = {'string': pa.string(), 'bool': pa.bool_(), 'float64': pa.float64(),
+                 'int64': pa.int64(), 'timestamp': pa.timestamp('ms')}
+        self._schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        self._writer = pq.ParquetWriter(path, self._schema,
+                                        compression='zstd' if compress else 'snappy')
+
+    def write(self, rows):
+        arrays = [self._pa.array(values, type=field.type)
+                  for values, field in zip(zip(*rows), self._schema)]
+        self._writer.write_batch(self._pa.record_batch(arrays, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+SINKS = {'csv': CsvSink, 'parquet': ParquetSink}
+
+
+def parse_timestamp(value):
+    """ISO timestamp as naive UTC, the form Prisma stores in updated_at."""
+    if value.endswith(('Z', 'z')):
+        value = value[:-1] + '+00:00'
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        # psycopg2 sẽ gửi giá trị có múi giờ dạng timestamptz, và PostgreSQL đổi nó theo
+        # TimeZone của phiên khi so với cột timestamp; tự đổi về UTC để không lệch giờ
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def parse_since(value):
+    """ISO timestamp, or the manifest.json (or directory) of a previous export."""
+    if value is None:
+        return None
+    path = os.path.join(value, MANIFEST) if os.path.isdir(value) else value
+    if os.path.isfile(path):
+        with open(path, encoding='utf-8') as f:
+            return parse_timestamp(json.load(f)['until']) - DELTA_OVERLAP
+    return parse_timestamp(value)
+
+
+def stream(cur, batch_size):
+    """Yield lists of up to `batch_size` rows from an executed named cursor."""
+    rows = iter(cur)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def export_dataset(conn, dataset, path, fmt='csv', since=None, roles=None,
+                   batch_size=DEFAULT_BATCH_SIZE, compress=False):
+    """Stream one dataset into `path`; returns the number of rows written."""
+    rows = 0
+    sink = SINKS[fmt](path, dataset.columns, compress)
+    try:
+        # Cursor có tên = cursor phía server: mỗi lần chỉ kéo itersize dòng về client
+        with conn.cursor(name=f'report_{dataset.name}') as cur:
+            cur.itersize = batch_size
+            cur.execute(dataset.query(since), {'since': since, 'roles': roles})
+            for batch in stream(cur, batch_size):
+                sink.write(batch)
+                rows += len(batch)
+    finally:
+        sink.close()
+    return rows
+
+
+def export(directory, datasets=tuple(DATASETS), fmt='csv', since=None, roles=None,
+           batch_size=DEFAULT_BATCH_SIZE, compress=False, read_url=None):
+    os.makedirs(directory, exist_ok=True)
+    conn = connect_readonly(read_url, application_name='bluemoon-reports')
+    try:
+        with conn.cursor() as cur:
+            # Thời điểm snapshot theo UTC như Prisma: lần export delta sau dùng làm --since
+            cur.execute("SELECT now() AT TIME ZONE 'UTC', pg_is_in_recovery()")
+            until, on_replica = cur.fetchone()
+
+        manifest = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'since': since.isoformat() if since else None,
+            'until': until.isoformat(),
+            'source': 'replica' if on_replica else 'primary',
+            'format': fmt,
+            'roles': roles,
+            'datasets': [],
+        }
+        for name in datasets:
+            dataset = DATASETS[name]
+            filename = f'{name}.{SINKS[fmt].extension}'
+            if compress and fmt == 'csv':
+                filename += '.gz'
+            started = time.perf_counter()
+            rows = export_dataset(conn, dataset, os.path.join(directory, filename), fmt, since,
+                                  roles, batch_size, compress)
+            manifest['datasets'].append({'name': name, 'file': filename, 'rows': rows,
+                                         'seconds': round(time.perf_counter() - started, 3)})
+        conn.rollback()
+    finally:
+        conn.close()
+
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Xuất báo cáo cư dân/căn hộ từ DB chỉ đọc')
+    parser.add_argument('directory', help='Thư mục ghi file export và manifest.json')
+    parser.add_argument('--datasets', default=','.join(DATASETS),
+                        type=lambda value: value.split(','),
+                        help=f'Danh sách dataset, cách nhau bởi dấu phẩy ({", ".join(DATASETS)})')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('--compress', action='store_true',
+                        help='CSV: nén gzip; Parquet: zstd thay cho snappy')
+    parser.add_argument('--since',
+                        help='Chỉ xuất thay đổi sau mốc này: ISO timestamp hoặc '
+                             'manifest.json/thư mục của lần export trước')
+    parser.add_argument('--role', action='append',
+                        help='Chỉ xuất cư dân có vai trò này (lặp lại được)')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help='Số dòng mỗi lần kéo từ cursor phía server')
+    parser.add_argument('--read-url', help='URL DB chỉ đọc, mặc định READ_DATABASE_URL')
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.datasets if name not in DATASETS]
+    if unknown:
+        parser.error(f'Dataset không hợp lệ: {", ".join(unknown)}')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    since = parse_since(args.since)
+    started = time.perf_counter()
+    manifest = export(args.directory, args.datasets, args.format, since, args.role,
+                      args.batch_size, args.compress, args.read_url)
+
+    mode = f'thay đổi sau {manifest["since"]}' if since else 'toàn bộ'
+    print(f'📤 Export {mode} từ {manifest["source"]} (snapshot {manifest["until"]})')
+    for entry in manifest['datasets']:
+        print(f'   ✓ {entry["name"]}: {entry["rows"]:,} dòng → {entry["file"]} '
+              f'({entry["seconds"]:.2f}s)')
+    print(f'✅ Hoàn tất trong {time.perf_counter() - started:.2f}s, '
+          f'lần sau dùng --since {os.path.join(args.directory, MANIFEST)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,381 @@
+"""
+Guard shift roster scheduler.
+
+Fills every (date, shift_type) slot of a planning window with one guard,
+matching the @@unique([date, shiftType]) constraint on shifts.
+
+Hard constraints:
+    - at most one shift per guard per day
+    - no night shift followed by the next day's morning shift
+    - at most --max-per-week shifts per guard per calendar week
+    - no shift on a guard's days off
+Soft constraint (fairness): spread total shifts and night shifts evenly.
+
+A greedy pass assigns each slot to the least-loaded feasible guard, then a
+local search repeatedly moves single slots to the guard that lowers the
+cost most. Candidate guards for a slot are scored together as NumPy
+vectors, so one step costs O(guards) array work. Slots already in the
+database are pinned unless --replace is given. The roster is written in
+one transaction with INSERT ... ON CONFLICT (date, shift_type).
+
+    python prisma/roster.py --start 2026-01-01 --days 90 --max-per-week 5 \\
+        --day-off guard1@bluemoon.vn=2026-01-01 --days-off leave.json
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from psycopg2.extras import execute_values
+
+from db import connect
+from generators import SCHEMA, SHIFT_COLUMNS, SHIFT_TYPES
+
+
+MORNING, NIGHT = SHIFT_TYPES.index('morning'), SHIFT_TYPES.index('night')
+UNASSIGNED = -1
+# Ca đã có trong DB của người không còn là bảo vệ: giữ nguyên, không tính cho ai
+OTHER_GUARD = -2
+# Trọng số: vi phạm ràng buộc cứng luôn đắt hơn mọi chênh lệch công bằng
+HARD_PENALTY = 1_000_000
+NIGHT_WEIGHT = 2
+
+
+@dataclass
+class RosterProblem:
+    start: date
+    days: int
+    guard_ids: list
+    # available[g, d] = False nếu bảo vệ g nghỉ ngày d
+    available: np.ndarray
+    max_per_week: int = 6
+    # pinned[d, s] = chỉ số bảo vệ đã được xếp cố định, UNASSIGNED nếu còn trống,
+    # OTHER_GUARD nếu ca thuộc về người không có trong guard_ids
+    pinned: np.ndarray = None
+    # Bảo vệ trực ca đêm ngay trước ngày start (UNASSIGNED nếu không có)
+    night_before: int = UNASSIGNED
+    # week_before[g] = số ca bảo vệ g đã trực trong tuần của start, trước ngày start
+    week_before: np.ndarray = None
+
+    @property
+    def guards(self):
+        return len(self.guard_ids)
+
+    def week_of(self, day):
+        return (self.start.weekday() + day) // 7
+
+    @property
+    def weeks(self):
+        return self.week_of(self.days - 1) + 1
+
+
+class Roster:
+    """Assignment matrix plus the per-guard counters the cost needs."""
+
+    def __init__(self, problem):
+        self.problem = problem
+        p = problem
+        self.assigned = (p.pinned.copy() if p.pinned is not None
+                         else np.full((p.days, len(SHIFT_TYPES)), UNASSIGNED, dtype=np.int64))
+        self.fixed = self.assigned != UNASSIGNED
+        self.works = np.zeros((p.guards, p.days), dtype=np.int64)
+        self.totals = np.zeros(p.guards, dtype=np.int64)
+        self.nights = np.zeros(p.guards, dtype=np.int64)
+        self.weekly = np.zeros((p.guards, p.weeks), dtype=np.int64)
+        self.day_week = np.array([p.week_of(d) for d in range(p.days)])
+        if p.week_before is not None:
+            self.weekly[:, 0] += p.week_before
+        for d, s in zip(*np.nonzero(self.assigned >= 0)):
+            self._count(self.assigned[d, s], d, s, 1)
+
+    def _count(self, g, d, s, sign):
+        self.works[g, d] += sign
+        self.totals[g] += sign
+        self.weekly[g, self.day_week[d]] += sign
+        if s == NIGHT:
+            self.nights[g] += sign
+
+    def assign(self, d, s, g):
+        old = self.assigned[d, s]
+        if old != UNASSIGNED:
+            self._count(old, d, s, -1)
+        self.assigned[d, s] = g
+        self._count(g, d, s, 1)
+
+    def night_on(self, d):
+        if d < 0:
+            return self.problem.night_before
+        return self.assigned[d, NIGHT]
+
+    def violations(self, d, s):
+        """Hard-constraint violations for every guard if it took slot (d, s)."""
+        p = self.problem
+        current = self.assigned[d, s]
+        works = self.works[:, d].copy()
+        weekly = self.weekly[:, self.day_week[d]].copy()
+        if current != UNASSIGNED:
+            works[current] -= 1
+            weekly[current] -= 1
+
+        bad = works + (~p.available[:, d]).astype(np.int64)
+        bad += np.maximum(weekly + 1 - p.max_per_week, 0)
+        if s == MORNING:
+            previous = self.night_on(d - 1)
+            if previous >= 0:
+                bad[previous] += 1
+        if s == NIGHT and d + 1 < p.days:
+            following = self.assigned[d + 1, MORNING]
+            if following >= 0:
+                bad[following] += 1
+        return bad
+
+    def fairness_delta(self, d, s):
+        """Change of the fairness cost for moving slot (d, s) to each guard."""
+        current = self.assigned[d, s]
+        # Tổng bình phương thay đổi 2(c_g - c_h) + 2 khi chuyển 1 ca từ h sang g
+        delta = 2 * self.totals + 1
+        if s == NIGHT:
+            delta += NIGHT_WEIGHT * (2 * self.nights + 1)
+        if current != UNASSIGNED:
+            delta -= 2 * self.totals[current] - 1
+            if s == NIGHT:
+                delta -= NIGHT_WEIGHT * (2 * self.nights[current] - 1)
+            delta[current] = 0
+        return delta
+
+    def slot_costs(self, d, s):
+        return HARD_PENALTY * self.violations(d, s) + self.fairness_delta(d, s)
+
+    def hard_violations(self):
+        """(slot, reason) for every remaining hard-constraint violation."""
+        p = self.problem
+        found = []
+        for d in range(p.days):
+            day = p.start + timedelta(days=d)
+            for s, shift_type in enumerate(SHIFT_TYPES):
+                g = self.assigned[d, s]
+                if g == UNASSIGNED:
+                    found.append(((day, shift_type), 'chưa có bảo vệ'))
+                    continue
+                if g == OTHER_GUARD:
+                    continue
+                if self.works[g, d] > 1:
+                    found.append(((day, shift_type), 'trực 2 ca trong ngày'))
+                if not p.available[g, d]:
+                    found.append(((day, shift_type), 'trùng ngày nghỉ'))
+                if self.weekly[g, self.day_week[d]] > p.max_per_week:
+                    found.append(((day, shift_type), 'vượt số ca/tuần'))
+                if s == MORNING and self.night_on(d - 1) == g:
+                    found.append(((day, shift_type), 'ca sáng ngay sau ca đêm'))
+        return found
+
+
+def greedy(roster, rng):
+    """Give each open slot to the cheapest guard, random tie-break."""
+    p = roster.problem
+    for d in range(p.days):
+        for s in range(len(SHIFT_TYPES)):
+            if roster.fixed[d, s]:
+                continue
+            costs = roster.slot_costs(d, s)
+            best = np.flatnonzero(costs == costs.min())
+            roster.assign(d, s, int(best[rng.randrange(len(best))]))
+    return roster
+
+
+def local_search(roster, rng, max_passes=50, time_limit=None):
+    """
+    Best-improvement moves, slot by slot in random order, until a full pass
+    finds nothing better (or time runs out). Returns the number of moves.
+    """
+    p = roster.problem
+    open_slots = [(d, s) for d in range(p.days) for s in range(len(SHIFT_TYPES))
+                  if not roster.fixed[d, s]]
+    started = time.perf_counter()
+    moves = 0
+    for _ in range(max_passes):
+        rng.shuffle(open_slots)
+        improved = False
+        for d, s in open_slots:
+            costs = roster.slot_costs(d, s)
+            current = roster.assigned[d, s]
+            best = int(costs.argmin())
+            if best != current and costs[best] < costs[current]:
+                roster.assign(d, s, best)
+                moves += 1
+                improved = True
+        if not improved or (time_limit and time.perf_counter() - started > time_limit):
+            break
+    return moves
+
+
+def solve(problem, seed=42, max_passes=50, time_limit=None):
+    rng = random.Random(seed)
+    roster = greedy(Roster(problem), rng)
+    moves = local_search(roster, rng, max_passes, time_limit)
+    return roster, moves
+
+
+def load_guards(cur):
+    cur.execute(
+        'SELECT "ID_Resident", email FROM residents WHERE role = %s ORDER BY email', ('guard',)
+    )
+    return cur.fetchall()
+
+
+def load_problem(cur, start, days, max_per_week, days_off, replace=False):
+    """Build a RosterProblem from the DB; days_off maps email -> set of dates."""
+    guards = load_guards(cur)
+    if not guards:
+        raise ValueError('Không có bảo vệ nào (role = guard)')
+    guard_ids = [guard_id for guard_id, _ in guards]
+    index = {guard_id: g for g, guard_id in enumerate(guard_ids)}
+
+    available = np.ones((len(guards), days), dtype=bool)
+    for g, (_, email) in enumerate(guards):
+        for day in days_off.get(email, ()):
+            d = (day - start).days
+            if 0 <= d < days:
+                available[g, d] = False
+
+    pinned = np.full((days, len(SHIFT_TYPES)), UNASSIGNED, dtype=np.int64)
+    night_before = UNASSIGNED
+    week_before = np.zeros(len(guards), dtype=np.int64)
+    # Từ thứ Hai của tuần chứa start (để tính --max-per-week khi bắt đầu giữa tuần),
+    # và ít nhất từ hôm trước start cho ràng buộc ca đêm -> ca sáng
+    week_start = start - timedelta(days=start.weekday())
+    cur.execute(
+        'SELECT date, shift_type, "ID_guard" FROM shifts WHERE date >= %s AND date < %s',
+        (min(week_start, start - timedelta(days=1)), start + timedelta(days=days)),
+    )
+    for day, shift_type, guard_id in cur.fetchall():
+        if shift_type not in SHIFT_TYPES:
+            continue
+        g = index.get(guard_id, OTHER_GUARD)
+        d = (day.date() - start).days
+        if d < 0:
+            if g == OTHER_GUARD:
+                continue
+            if day.date() >= week_start:
+                week_before[g] += 1
+            if d == -1 and shift_type == 'night':
+                night_before = g
+        elif not replace:
+            # Ca của người không còn là bảo vệ vẫn giữ cố định: nếu coi là ca trống,
+            # ON CONFLICT DO NOTHING sẽ bỏ qua dòng đó và lịch in ra lệch với DB
+            pinned[d, SHIFT_TYPES.index(shift_type)] = g
+
+    return RosterProblem(start, days, guard_ids, available, max_per_week, pinned, night_before,
+                         week_before)
+
+
+def write_roster(cur, roster, replace=False):
+    """Upsert every non-pinned slot; returns the number of rows written."""
+    p = roster.problem
+    now = datetime.now()
+    rows = []
+    for d, s in zip(*np.nonzero(~roster.fixed)):
+        day = datetime.combine(p.start + timedelta(days=int(d)), datetime.min.time())
+        rows.append((str(uuid.uuid4()), day, SHIFT_TYPES[s],
+                     p.guard_ids[roster.assigned[d, s]], now, now))
+    if not rows:
+        return 0
+    guard, updated_at = SCHEMA.columns('shifts', 'guardId', 'updatedAt')
+    conflict = (f'DO UPDATE SET {guard} = EXCLUDED.{guard}, {updated_at} = EXCLUDED.{updated_at}'
+                if replace else 'DO NOTHING')
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO shifts ({', '.join(SHIFT_COLUMNS)})
+        VALUES %s
+        ON CONFLICT ({', '.join(SCHEMA.columns('shifts', 'date', 'shiftType'))}) {conflict}
+        """,
+        rows,
+        page_size=len(rows),
+    )
+    return cur.rowcount
+
+
+def parse_day_off(value):
+    email, _, day = value.partition('=')
+    return email, date.fromisoformat(day)
+
+
+def collect_days_off(args):
+    days_off = {}
+    if args.days_off:
+        with open(args.days_off, encoding='utf-8') as f:
+            for email, days in json.load(f).items():
+                days_off.setdefault(email, set()).update(date.fromisoformat(d) for d in days)
+    for email, day in args.day_off or ():
+        days_off.setdefault(email, set()).add(day)
+    return days_off
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Xếp lịch trực bảo vệ')
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today(),
+                        help='Ngày bắt đầu (YYYY-MM-DD), mặc định hôm nay')
+    parser.add_argument('--days', type=int, default=90, help='Số ngày cần xếp lịch')
+    parser.add_argument('--max-per-week', type=int, default=6,
+                        help='Số ca tối đa của một bảo vệ trong một tuần')
+    parser.add_argument('--days-off', help='File JSON {email: ["YYYY-MM-DD", ...]}')
+    parser.add_argument('--day-off', type=parse_day_off, action='append',
+                        help='email=YYYY-MM-DD, lặp lại được')
+    parser.add_argument('--replace', action='store_true',
+                        help='Ghi đè các ca đã có trong khoảng thời gian')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--time-limit', type=float, default=10,
+                        help='Giới hạn thời gian tìm kiếm cục bộ (giây)')
+    parser.add_argument('--dry-run', action='store_true')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = connect(autocommit=False)
+    cur = conn.cursor()
+    try:
+        started = time.perf_counter()
+        problem = load_problem(cur, args.start, args.days, args.max_per_week,
+                               collect_days_off(args), args.replace)
+        roster, moves = solve(problem, args.seed, time_limit=args.time_limit)
+        solved = time.perf_counter() - started
+
+        end = args.start + timedelta(days=args.days - 1)
+        print(f'📅 {args.start} → {end}: {problem.guards} bảo vệ, '
+              f'{int((~roster.fixed).sum())} ca cần xếp, {int(roster.fixed.sum())} ca giữ nguyên')
+        others = int((roster.assigned == OTHER_GUARD).sum())
+        if others:
+            print(f'   ⚠️  {others} ca giữ nguyên thuộc về người không còn là bảo vệ '
+                  f'(dùng --replace để xếp lại)')
+        print(f'🧮 Giải trong {solved:.2f}s ({moves} bước cải thiện)')
+        print(f'   Số ca/bảo vệ: {roster.totals.min()}-{roster.totals.max()}, '
+              f'ca đêm: {roster.nights.min()}-{roster.nights.max()}')
+        violations = roster.hard_violations()
+        for (day, shift_type), reason in violations[:20]:
+            print(f'   ⚠️  {day} {shift_type}: {reason}')
+        if len(violations) > 20:
+            print(f'   ⚠️  ... và {len(violations) - 20} vi phạm khác')
+
+        if args.dry_run:
+            conn.rollback()
+            print('\n(dry run, không ghi lịch)')
+            return
+        written = write_roster(cur, roster, args.replace)
+        conn.commit()
+        print(f'\n✅ Đã ghi {written} ca trực trong một transaction')
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
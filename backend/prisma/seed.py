@@ -1,169 +1,148 @@
-import os
-import psycopg2
-from psycopg2.extras import execute_values
-import bcrypt
-from datetime import datetime, timedelta
-from urllib.parse import urlparse
+import argparse
+import cProfile
+import dataclasses
+import random
+import sys
+from datetime import date, datetime, timedelta
 import uuid
 
+from psycopg2.extras import execute_values
+
+from billing import run_billing
+from db import connect
+from loader import copy_rows, upsert_rows
+from credentials import DEFAULT_COST, DEFAULT_PASSWORD, STRATEGIES, HashCache, password_for
+import generators as gen
+import instrument
+from instrument import Instrument
+from parallel import TableSpec, plan_tasks, run_tasks
+
+
+# "Hôm nay" của chế độ --deterministic, khớp tháng 2024-11 của dữ liệu demo
+DETERMINISTIC_TODAY = date(2024, 11, 15)
+
+# Dữ liệu demo không đặt target_role (giữ mặc định 'admin') nên dùng ít cột hơn scale mode
+DEMO_COMPLAIN_COLUMNS = gen.SCHEMA.columns('complain', 'id', 'residentId', 'title', 'message',
+                                           'status', 'responseText', 'createdAt', 'updatedAt')
+
+# Bảng con trước bảng cha, theo quan hệ khai báo trong schema.prisma
+SEED_TABLES = tuple(reversed(gen.SCHEMA.dependency_order(
+    ['apartments', 'residents', 'notifications', 'resident_notifications', 'services',
+     'invoices', 'complain', 'shifts'])))
 
-def get_db_connection_params():
+
+def truncate_all(cur):
+    # Một lệnh TRUNCATE thay cho từng DELETE: không quét từng dòng, không để lại
+    # dead tuple cần VACUUM, và đặt lại sequence của services về 1
+    cur.execute(f"TRUNCATE {', '.join(SEED_TABLES)} RESTART IDENTITY CASCADE")
+
+
+def seed_demo(cur, hashed_password, inst=None, rng=None, now=None):
     """
-    Build psycopg2 connection kwargs using DATABASE_URL when available so that
-    the seed script stays in sync with Prisma configuration.
+    Load the small demo dataset. With `rng` (a seeded random.Random) and a
+    fixed `now`, every id and timestamp is reproducible (--deterministic).
     """
-    database_url = os.environ.get("DATABASE_URL")
-
-    if database_url:
-        parsed = urlparse(database_url)
-        if parsed.scheme not in ("postgresql", "postgres"):
-            raise ValueError(
-                f"Unsupported DATABASE_URL scheme: {parsed.scheme}. "
-                "Expected postgresql:// or postgres://"
-            )
-
-        return {
-            "host": parsed.hostname or "localhost",
-            "port": parsed.port or 5432,
-            "database": (parsed.path or "/").lstrip("/"),
-            "user": parsed.username or "postgres",
-            "password": parsed.password,
-        }
-
-    # Fall back to discrete env vars or final hardcoded defaults for dev usage.
-    return {
-        "host": os.environ.get("DB_HOST", "localhost"),
-        "port": int(os.environ.get("DB_PORT", 5432)),
-        "database": os.environ.get("DB_NAME", "BlueMoon"),
-        "user": os.environ.get("DB_USER", "postgres"),
-        "password": os.environ.get("DB_PASSWORD", "200103"),
-    }
-
-# Kết nối database
-conn = psycopg2.connect(**get_db_connection_params())
-conn.autocommit = True
-cur = conn.cursor()
-
-try:
-    print('🌱 Bắt đầu seed dữ liệu...')
-    
-    # Xóa dữ liệu cũ (theo thứ tự để tránh lỗi foreign key)
-    cur.execute("DELETE FROM shifts")
-    cur.execute("DELETE FROM resident_notifications")
-    cur.execute("DELETE FROM complain")
-    cur.execute("DELETE FROM invoices")
-    cur.execute("DELETE FROM services")
-    cur.execute("DELETE FROM notifications")
-    cur.execute("DELETE FROM residents")
-    cur.execute("DELETE FROM apartments")
-    
-    print('✅ Đã xóa dữ liệu cũ')
-    
-    # Password mặc định
-    plain_password = '123'
-    hashed_password = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-    
-    # 1. Tạo 4 apartments tạm thời
+    inst = inst or Instrument()
+    now = now or datetime.now()
+
+    def new_id():
+        if rng is None:
+            return str(uuid.uuid4())
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+    
+    # 1. Tạo 4 apartments, ID chủ căn hộ được sinh trước nên không cần UPDATE lại
+    apartment_ids = [str(1), str(2), str(3), str(4)]
+    owner_ids = [new_id() for _ in apartment_ids]
     apartments_data = [
-        (str(1), 'A101', '2023-01-01', '2025-12-31', 'temp-owner-001', 75.5),
-        (str(2), 'A102', '2023-03-15', '2026-03-14', 'temp-owner-002', 85.0),
-        (str(3), 'A201', '2023-06-01', '2025-05-31', 'temp-owner-003', 95.5),
-        (str(4), 'A202', '2023-02-10', '2026-02-09', 'temp-owner-004', 80.0),
+        (apartment_ids[0], 'A101', '2023-01-01', '2025-12-31', owner_ids[0], 75.5),
+        (apartment_ids[1], 'A102', '2023-03-15', '2026-03-14', owner_ids[1], 85.0),
+        (apartment_ids[2], 'A201', '2023-06-01', '2025-05-31', owner_ids[2], 95.5),
+        (apartment_ids[3], 'A202', '2023-02-10', '2026-02-09', owner_ids[3], 80.0),
     ]
     
+    inst.mark('apartments')
     execute_values(
         cur,
-        """
-        INSERT INTO apartments ("ID_Apartment", "Name", contract_startdate, contract_enddate, "ID_owner", area)
+        f"""
+        INSERT INTO apartments ({', '.join(gen.APARTMENT_COLUMNS)})
         VALUES %s
         """,
-        apartments_data
+        [(*apartment, now) for apartment in apartments_data]
     )
     
-    cur.execute('SELECT "ID_Apartment", "Name" FROM apartments ORDER BY "Name"')
-    apartments = cur.fetchall()
-    apartment_ids = [apt[0] for apt in apartments]
-    
+    inst.add_rows(len(apartments_data))
     print(f'✅ Đã tạo {len(apartment_ids)} căn hộ')
     
     # 2. Tạo 4 owners (residents)
     owners_data = [
-        (str(uuid.uuid4()), apartment_ids[0], 'Nguyễn Văn An', '0901234567', hashed_password, 
+        (owner_ids[0], apartment_ids[0], 'Nguyễn Văn An', '0901234567', hashed_password, 
          'nguyenvanan@gmail.com', 'resident', False, '001234567890', '1985-03-15', True),
-        (str(uuid.uuid4()), apartment_ids[1], 'Trần Thị Bình', '0901234568', hashed_password,
+        (owner_ids[1], apartment_ids[1], 'Trần Thị Bình', '0901234568', hashed_password,
          'tranthibinh@gmail.com', 'resident', False, '001234567891', '1987-06-20', True),
-        (str(uuid.uuid4()), apartment_ids[2], 'Lê Minh Cường', '0901234569', hashed_password,
+        (owner_ids[2], apartment_ids[2], 'Lê Minh Cường', '0901234569', hashed_password,
          'leminhcuong@gmail.com', 'resident', False, '001234567892', '1990-11-10', True),
-        (str(uuid.uuid4()), apartment_ids[3], 'Phạm Thu Dung', '0901234570', hashed_password,
+        (owner_ids[3], apartment_ids[3], 'Phạm Thu Dung', '0901234570', hashed_password,
          'phamthudung@gmail.com', 'resident', False, '001234567893', '1992-08-25', True),
     ]
     
+    inst.mark('residents')
     execute_values(
         cur,
-        """
-        INSERT INTO residents ("ID_Resident", "ID_apartment", name, phone, password, email, role, "temporaryStatus", "CMND", birth, approved)
+        f"""
+        INSERT INTO residents ({', '.join(gen.RESIDENT_COLUMNS)})
         VALUES %s
         """,
-        owners_data
+        [(*resident, now) for resident in owners_data]
     )
     
-    cur.execute('SELECT "ID_Resident" FROM residents ORDER BY name LIMIT 4')
-    owner_ids = [row[0] for row in cur.fetchall()]
-    
-    # Cập nhật ownerId
-    for i, apt_id in enumerate(apartment_ids):
-        cur.execute(
-            'UPDATE apartments SET "ID_owner" = %s WHERE "ID_Apartment" = %s',
-            (owner_ids[i], apt_id)
-        )
-    
-    print(f'✅ Đã tạo {len(owner_ids)} chủ căn hộ và cập nhật ownerId')
+    print(f'✅ Đã tạo {len(owner_ids)} chủ căn hộ')
     
     # 3. Tạo thêm residents (bao gồm 3 bảo vệ)
     additional_residents_data = [
         # 3 BẢO VỆ - role = 'guard'
-        (str(uuid.uuid4()), None, 'Nguyễn Văn Hùng', '0901111111', hashed_password,
+        (new_id(), None, 'Nguyễn Văn Hùng', '0901111111', hashed_password,
          'guard1@gmail.com', 'guard', False, '001234567901', '1988-01-15', True),
-        (str(uuid.uuid4()), None, 'Trần Minh Tuấn', '0901111112', hashed_password,
+        (new_id(), None, 'Trần Minh Tuấn', '0901111112', hashed_password,
          'guard2@gmail.com', 'guard', False, '001234567902', '1990-05-20', True),
-        (str(uuid.uuid4()), None, 'Lê Hoàng Nam', '0901111113', hashed_password,
+        (new_id(), None, 'Lê Hoàng Nam', '0901111113', hashed_password,
          'guard3@gmail.com', 'guard', False, '001234567903', '1992-09-10', True),
         
         # Cư dân thường
         # Căn hộ A101 - thêm 2 cư dân
-        (str(uuid.uuid4()), apartment_ids[0], 'Nguyễn Thị Mai', '0901234578', hashed_password,
+        (new_id(), apartment_ids[0], 'Nguyễn Thị Mai', '0901234578', hashed_password,
          'nguyenthimai@gmail.com', 'resident', False, '001234567904', '1990-05-20', True),
-        (str(uuid.uuid4()), apartment_ids[0], 'Nguyễn Văn Bình', '0901234579', hashed_password,
+        (new_id(), apartment_ids[0], 'Nguyễn Văn Bình', '0901234579', hashed_password,
          'nguyenvanbinh@gmail.com', 'resident', True, '001234567905', '1995-08-15', True),
         # Căn hộ A102 - thêm 3 cư dân
-        (str(uuid.uuid4()), apartment_ids[1], 'Trần Văn Đức', '0901234580', hashed_password,
+        (new_id(), apartment_ids[1], 'Trần Văn Đức', '0901234580', hashed_password,
          'tranvanduc@gmail.com', 'resident', False, '001234567906', '1992-03-10', True),
-        (str(uuid.uuid4()), apartment_ids[1], 'Trần Thị Lan', '0901234581', hashed_password,
+        (new_id(), apartment_ids[1], 'Trần Thị Lan', '0901234581', hashed_password,
          'tranthilan@gmail.com', 'resident', False, '001234567907', '1994-11-25', True),
-        (str(uuid.uuid4()), apartment_ids[1], 'Trần Văn Phúc', '0901234582', hashed_password,
+        (new_id(), apartment_ids[1], 'Trần Văn Phúc', '0901234582', hashed_password,
          'tranvanphuc@gmail.com', 'resident', True, '001234567908', '1998-07-08', True),
         # Căn hộ A201 - thêm 2 cư dân
-        (str(uuid.uuid4()), apartment_ids[2], 'Lê Thị Hoa', '0901234583', hashed_password,
+        (new_id(), apartment_ids[2], 'Lê Thị Hoa', '0901234583', hashed_password,
          'lethihoa@gmail.com', 'resident', False, '001234567909', '1991-09-12', True),
-        (str(uuid.uuid4()), apartment_ids[2], 'Lê Văn Nam', '0901234584', hashed_password,
+        (new_id(), apartment_ids[2], 'Lê Văn Nam', '0901234584', hashed_password,
          'levannam@gmail.com', 'resident', False, '001234567910', '1993-04-20', True),
         # Căn hộ A202 - thêm 3 cư dân
-        (str(uuid.uuid4()), apartment_ids[3], 'Phạm Văn Khoa', '0901234585', hashed_password,
+        (new_id(), apartment_ids[3], 'Phạm Văn Khoa', '0901234585', hashed_password,
          'phamvankhoa@gmail.com', 'resident', False, '001234567911', '1989-12-05', True),
-        (str(uuid.uuid4()), apartment_ids[3], 'Phạm Thị Oanh', '0901234586', hashed_password,
+        (new_id(), apartment_ids[3], 'Phạm Thị Oanh', '0901234586', hashed_password,
          'phamthioanh@gmail.com', 'resident', True, '001234567912', '1996-06-18', True),
-        (str(uuid.uuid4()), apartment_ids[3], 'Phạm Văn Đạt', '0901234587', hashed_password,
+        (new_id(), apartment_ids[3], 'Phạm Văn Đạt', '0901234587', hashed_password,
          'phamvandat@gmail.com', 'resident', False, '001234567913', '1997-03-22', True),
     ]
     
     execute_values(
         cur,
-        """
-        INSERT INTO residents ("ID_Resident", "ID_apartment", name, phone, password, email, role, "temporaryStatus", "CMND", birth, approved)
+        f"""
+        INSERT INTO residents ({', '.join(gen.RESIDENT_COLUMNS)})
         VALUES %s
         """,
-        additional_residents_data
+        [(*resident, now) for resident in additional_residents_data]
     )
+    inst.add_rows(len(owners_data) + len(additional_residents_data))
     
     cur.execute('SELECT "ID_Resident", name, role FROM residents')
     residents = cur.fetchall()
@@ -179,9 +158,10 @@ try:
     
     # 4. Tạo Shifts (Lịch trực bảo vệ cho 30 ngày tới)
     print('\n📅 Đang tạo lịch trực bảo vệ...')
+    inst.mark('shifts')
     
     shifts_data = []
-    start_date = datetime.now().date()
+    start_date = now.date()
     shift_types = ['morning', 'afternoon', 'night']
     
     for day_offset in range(30):  # 30 ngày tới
@@ -193,7 +173,7 @@ try:
             guard_id = guard_ids[guard_index]
             
             shifts_data.append((
-                str(uuid.uuid4()),
+                new_id(),
                 current_date,
                 shift_type,
                 guard_id
@@ -201,12 +181,13 @@ try:
     
     execute_values(
         cur,
-        """
-        INSERT INTO shifts ("ID_shift", date, shift_type, "ID_guard", created_at, updated_at)
+        f"""
+        INSERT INTO shifts ({', '.join(gen.SHIFT_COLUMNS)})
         VALUES %s
         """,
-        [(s[0], s[1], s[2], s[3], datetime.now(), datetime.now()) for s in shifts_data]
+        [(s[0], s[1], s[2], s[3], now, now) for s in shifts_data]
     )
+    inst.add_rows(len(shifts_data))
     
     print(f'✅ Đã tạo {len(shifts_data)} ca trực (30 ngày x 3 ca/ngày)')
     print(f'   - Ca sáng (morning): {len([s for s in shifts_data if s[2] == "morning"])}')
@@ -215,6 +196,7 @@ try:
     
     # 5. Tạo Services - 7 LOẠI PHÍ CỐ ĐỊNH
     print('\n📝 Đang tạo 7 loại phí (Services)...')
+    inst.mark('services')
     
     service_types = [
         ('Phí thuê', '2024-11', 3000000, 'unpaid'),
@@ -226,187 +208,112 @@ try:
         ('Phí nhà ở', '2024-11', 300000, 'unpaid'),
     ]
     
-    service_ids = []
-    for name, month, amount, status in service_types:
-        cur.execute(
-            """
-            INSERT INTO services (name, month, "totalAmount", status, "createdAt", "updatedAt")
-            VALUES (%s, %s, %s, %s, NOW(), NOW())
-            RETURNING "ID_khoan_thu"
+    # Một câu lệnh INSERT duy nhất thay cho vòng lặp INSERT ... RETURNING từng dòng
+    service_ids = [
+        row[0] for row in execute_values(
+            cur,
+            f"""
+            INSERT INTO services ({', '.join(gen.SERVICE_COLUMNS[1:])})
+            VALUES %s
+            RETURNING {gen.SERVICE_COLUMNS[0]}
             """,
-            (name, month, amount, status)
+            [(*service, now, now) for service in service_types],
+            fetch=True,
         )
-        service_id = cur.fetchone()[0]
-        service_ids.append(service_id)
+    ]
+    inst.add_rows(len(service_ids))
+    for name, month, amount, status in service_types:
         print(f'   ✓ {name}: {amount:,} VNĐ')
     
     print(f'\n✅ Đã tạo {len(service_ids)} loại phí (Services)')
     
     # 6. Tạo Invoices - Mỗi cư dân có 1 invoice cho MỖI loại phí
     print('\n📝 Đang tạo hóa đơn cho từng cư dân...')
+    inst.mark('invoices')
     
-    invoices_data = []
-    invoice_count_per_resident = {}
-    
-    # Chỉ tạo cho 4 chủ căn hộ
-    for resident_id, resident_name, role in residents[:4]:
-        invoice_count_per_resident[resident_name] = 0
-        
-        # Mỗi cư dân có 1 invoice cho MỖI loại phí
-        for service_id in service_ids:
-            # Lấy thông tin service
-            cur.execute('SELECT name, month, "totalAmount" FROM services WHERE "ID_khoan_thu" = %s', (service_id,))
-            service_name, month, amount = cur.fetchone()
-            
-            invoices_data.append((
-                str(uuid.uuid4()),
-                service_id,
-                resident_id,
-                f'HĐ {service_name} tháng {month} - {resident_name}',
-                amount / len(apartment_ids)  # Chia đều cho các căn hộ
-            ))
-            invoice_count_per_resident[resident_name] += 1
-    
-    execute_values(
-        cur,
-        """
-        INSERT INTO invoices ("ID_invoice", "ID_service", "ID_resident", "Name", "Money", "CreateDate")
-        VALUES %s
-        """,
-        [(i[0], i[1], i[2], i[3], i[4], datetime.now()) for i in invoices_data]
-    )
-    
-    print(f'✅ Đã tạo {len(invoices_data)} hóa đơn')
-    for name, count in list(invoice_count_per_resident.items())[:4]:
-        print(f'   - {name}: {count} hóa đơn')
+    # Lập hóa đơn bằng billing engine: chia đều mỗi loại phí cho các căn hộ
+    # trong một lần COPY, không còn truy vấn service cho từng hóa đơn
+    _, billed_apartments, shares, billing_stats = run_billing(cur, '2024-11', method='flat',
+                                                                created=now, new_id=new_id)
+    inst.add_rows(billing_stats.rows)
+
+    print(f'✅ Đã tạo {billing_stats.rows} hóa đơn')
+    for name in billed_apartments.owner_names:
+        print(f'   - {name}: {shares.shape[0]} hóa đơn')
     
     # 7. Tạo Notifications
     notifications_data = [
-        (str(uuid.uuid4()), 'Thông báo bảo trì hệ thống điện vào ngày 15/12/2024. Vui lòng chuẩn bị nguồn điện dự phòng.', 'Ban Quản Lý'),
-        (str(uuid.uuid4()), 'Thông báo tăng phí gửi xe từ tháng 12/2024. Chi tiết xem tại văn phòng quản lý.', 'Ban Quản Lý'),
-        (str(uuid.uuid4()), 'Lịch cắt nước định kỳ vào thứ 7 tuần này từ 8h-12h để vệ sinh bể nước.', 'Ban Quản Lý'),
-        (str(uuid.uuid4()), 'Thông báo tổ chức họp cư dân vào 20h ngày 25/12/2024 tại hội trường tầng 1.', 'Ban Quản Lý'),
-        (str(uuid.uuid4()), 'Nhắc nhở cư dân giữ gìn vệ sinh chung, không xả rác bừa bãi.', 'Ban Quản Lý'),
+        (new_id(), 'Thông báo bảo trì hệ thống điện vào ngày 15/12/2024. Vui lòng chuẩn bị nguồn điện dự phòng.', 'Ban Quản Lý'),
+        (new_id(), 'Thông báo tăng phí gửi xe từ tháng 12/2024. Chi tiết xem tại văn phòng quản lý.', 'Ban Quản Lý'),
+        (new_id(), 'Lịch cắt nước định kỳ vào thứ 7 tuần này từ 8h-12h để vệ sinh bể nước.', 'Ban Quản Lý'),
+        (new_id(), 'Thông báo tổ chức họp cư dân vào 20h ngày 25/12/2024 tại hội trường tầng 1.', 'Ban Quản Lý'),
+        (new_id(), 'Nhắc nhở cư dân giữ gìn vệ sinh chung, không xả rác bừa bãi.', 'Ban Quản Lý'),
     ]
     
+    inst.mark('notifications')
     execute_values(
         cur,
-        """
-        INSERT INTO notifications (id_notification, info, creator, "createDate")
+        f"""
+        INSERT INTO notifications ({', '.join(gen.NOTIFICATION_COLUMNS)})
         VALUES %s
         """,
-        [(n[0], n[1], n[2], datetime.now()) for n in notifications_data]
+        [(n[0], n[1], n[2], now) for n in notifications_data]
     )
     
     notification_ids = [n[0] for n in notifications_data]
+    inst.add_rows(len(notification_ids))
     print(f'✅ Đã tạo {len(notification_ids)} thông báo')
     
     # 8. Tạo ResidentNotifications
-    cur.execute("""
-        SELECT column_name 
-        FROM information_schema.columns 
-        WHERE table_name = 'resident_notifications'
-        ORDER BY column_name
-    """)
-    columns = [row[0] for row in cur.fetchall()]
-    
-    if not columns:
-        print('⚠️  Bảng resident_notifications không tồn tại, bỏ qua...')
-    else:
-        notif_col = None
-        resident_col = None
-        
-        for col in columns:
-            col_lower = col.lower()
-            if 'notification' in col_lower:
-                notif_col = col
-            elif 'resident' in col_lower:
-                resident_col = col
-        
-        if notif_col and resident_col:
-            resident_notif_data = []
-            for notif_id in notification_ids:
-                for resident_id, _, _ in residents[:8]:
-                    resident_notif_data.append((notif_id, resident_id))
-            
-            notif_col_quoted = f'"{notif_col}"' if notif_col != notif_col.lower() else notif_col
-            resident_col_quoted = f'"{resident_col}"' if resident_col != resident_col.lower() else resident_col
-            
-            try:
-                execute_values(
-                    cur,
-                    f"""
-                    INSERT INTO resident_notifications ({notif_col_quoted}, {resident_col_quoted})
-                    VALUES %s
-                    """,
-                    resident_notif_data
-                )
-                print(f'✅ Đã tạo {len(resident_notif_data)} liên kết thông báo-cư dân')
-            except Exception as e:
-                print(f'⚠️  Lỗi khi tạo resident notifications: {e}')
-                try:
-                    execute_values(
-                        cur,
-                        """
-                        INSERT INTO resident_notifications ("notification_ID", "Resident_ID")
-                        VALUES %s
-                        """,
-                        resident_notif_data
-                    )
-                    print(f'✅ Đã tạo {len(resident_notif_data)} liên kết thông báo-cư dân (thử lại)')
-                except Exception as e2:
-                    print(f'❌ Vẫn lỗi: {e2}')
-        else:
-            print(f'⚠️  Không tìm thấy cột phù hợp. Các cột có sẵn: {columns}')
-            resident_notif_data = []
-            for notif_id in notification_ids:
-                for resident_id, _, _ in residents[:8]:
-                    resident_notif_data.append((notif_id, resident_id))
-            
-            try:
-                execute_values(
-                    cur,
-                    """
-                    INSERT INTO resident_notifications ("notification_ID", "Resident_ID")
-                    VALUES %s
-                    """,
-                    resident_notif_data
-                )
-                print(f'✅ Đã tạo {len(resident_notif_data)} liên kết thông báo-cư dân')
-            except Exception as e:
-                print(f'❌ Lỗi: {e}')
+    inst.mark('resident_notifications')
+    resident_notif_data = [(notif_id, resident_id)
+                           for notif_id in notification_ids
+                           for resident_id, _, _ in residents[:8]]
+    execute_values(
+        cur,
+        f"""
+        INSERT INTO resident_notifications ({', '.join(gen.RESIDENT_NOTIFICATION_COLUMNS)})
+        VALUES %s
+        """,
+        resident_notif_data
+    )
+    inst.add_rows(len(resident_notif_data))
+    print(f'✅ Đã tạo {len(resident_notif_data)} liên kết thông báo-cư dân')
     
     # 9. Tạo Complains
     complains_data = [
-        (str(uuid.uuid4()), residents[0][0], 'Thang máy tầng 2 bị hỏng',
+        (new_id(), residents[0][0], 'Thang máy tầng 2 bị hỏng',
          'Thang máy tầng 2 không hoạt động từ 3 ngày nay, rất bất tiện cho cư dân.',
          'resolved', 'Đã liên hệ đội kỹ thuật sửa chữa. Thang máy đã hoạt động trở lại.'),
-        (str(uuid.uuid4()), residents[1][0], 'Tiếng ồn vào ban đêm',
+        (new_id(), residents[1][0], 'Tiếng ồn vào ban đêm',
          'Căn hộ bên cạnh thường xuyên gây ồn vào ban đêm, ảnh hưởng đến giấc ngủ.',
          'in_progress', 'Đã nhắc nhở cư dân căn hộ liên quan. Sẽ tiếp tục theo dõi.'),
-        (str(uuid.uuid4()), residents[2][0], 'Rò rỉ nước tại hành lang tầng 3',
+        (new_id(), residents[2][0], 'Rò rỉ nước tại hành lang tầng 3',
          'Phát hiện rò rỉ nước tại hành lang tầng 3, cần khắc phục gấp.',
          'pending', None),
-        (str(uuid.uuid4()), residents[3][0], 'Đèn hành lang tầng 1 không sáng',
+        (new_id(), residents[3][0], 'Đèn hành lang tầng 1 không sáng',
          'Đèn hành lang tầng 1 đã hỏng từ tuần trước, ban đêm rất tối.',
          'resolved', 'Đã thay bóng đèn mới.'),
-        (str(uuid.uuid4()), residents[4][0], 'Yêu cầu thêm chỗ đậu xe',
+        (new_id(), residents[4][0], 'Yêu cầu thêm chỗ đậu xe',
          'Chỗ đậu xe không đủ, đề nghị ban quản lý mở rộng khu vực gửi xe.',
          'pending', None),
-        (str(uuid.uuid4()), residents[5][0], 'Wifi khu vực công cộng yếu',
+        (new_id(), residents[5][0], 'Wifi khu vực công cộng yếu',
          'Tín hiệu wifi tại khu vực sảnh rất yếu, không sử dụng được.',
          'in_progress', 'Đang kiểm tra hệ thống router và sẽ nâng cấp thiết bị.'),
     ]
     
+    inst.mark('complain')
     execute_values(
         cur,
-        """
-        INSERT INTO complain ("ID_request", "ID_resident", title, message, status, response, created_at, updated_at)
+        f"""
+        INSERT INTO complain ({', '.join(DEMO_COMPLAIN_COLUMNS)})
         VALUES %s
         """,
-        [(c[0], c[1], c[2], c[3], c[4], c[5], datetime.now(), datetime.now()) for c in complains_data]
+        [(c[0], c[1], c[2], c[3], c[4], c[5], now, now) for c in complains_data]
     )
     
+    inst.add_rows(len(complains_data))
+    inst.stop()
     print(f'✅ Đã tạo {len(complains_data)} khiếu nại')
     
     # Tính tổng phí
@@ -421,7 +328,7 @@ try:
     print(f'   - Cư dân: {len(residents)} (bao gồm {len(guards)} bảo vệ)')
     print(f'   - Lịch trực: {len(shifts_data)} ca ({len(shifts_data)//3} ngày)')
     print(f'   - Loại phí (Services): {len(service_ids)} loại')
-    print(f'   - Hóa đơn (Invoices): {len(invoices_data)}')
+    print(f'   - Hóa đơn (Invoices): {billing_stats.rows}')
     print(f'   - Thông báo: {len(notification_ids)}')
     print(f'   - Khiếu nại: {len(complains_data)}')
     print(f'\n💰 TỔNG PHÍ THÁNG 11/2024: {total_fee:,} VNĐ')
@@ -439,13 +346,284 @@ try:
     print('   Bảo vệ 2: guard2@gmail.com / 123')
     print('   Bảo vệ 3: guard3@gmail.com / 123')
     print('='*60)
-    
-except Exception as e:
-    print(f'\n❌ LỖI: {e}')
-    import traceback
-    traceback.print_exc()
-    conn.rollback()
-    raise
-finally:
-    cur.close()
-    conn.close()
\ No newline at end of file
+
+
+def scale_spec(table, columns, generate, label, **options):
+    # Thứ tự nạp (depends_on) suy ra từ các @relation trong schema.prisma
+    return TableSpec(table, columns, generate, label,
+                     depends_on=gen.SCHEMA.depends_on(table), **options)
+
+
+SCALE_TABLES = [
+    scale_spec('apartments', gen.APARTMENT_COLUMNS, gen.generate_apartments, 'căn hộ',
+               sharded=True),
+    scale_spec('residents', gen.RESIDENT_COLUMNS, gen.generate_residents, 'cư dân',
+               sharded=True),
+    scale_spec('shifts', gen.SHIFT_COLUMNS, gen.generate_shifts, 'ca trực',
+               incremental=True),
+    scale_spec('services', gen.SERVICE_COLUMNS, gen.generate_services, 'khoản thu (Services)',
+               incremental=True),
+    scale_spec('invoices', gen.INVOICE_COLUMNS, gen.generate_invoices, 'hóa đơn',
+               sharded=True, incremental=True),
+    scale_spec('notifications', gen.NOTIFICATION_COLUMNS, gen.generate_notifications,
+               'thông báo', incremental=True),
+    scale_spec('resident_notifications', gen.RESIDENT_NOTIFICATION_COLUMNS,
+               gen.generate_resident_notifications, 'liên kết thông báo-cư dân',
+               sharded=True, incremental=True),
+    scale_spec('complain', gen.COMPLAIN_COLUMNS, gen.generate_complains, 'khiếu nại',
+               sharded=True, incremental=True),
+]
+
+
+def reset_service_sequence(cur):
+    cur.execute(
+        """SELECT setval(pg_get_serial_sequence('services', 'ID_khoan_thu'),
+                         COALESCE(MAX("ID_khoan_thu"), 1)) FROM services"""
+    )
+
+
+def load_tables(cur, cfg, specs, workers, load=copy_rows, inst=None):
+    inst = inst or Instrument()
+    totals = {}
+
+    def load_in_phase(cur, table, columns, rows):
+        # Một tiến trình: mỗi bảng là một phase đầy đủ (CPU, RSS, lệnh, byte)
+        with inst.phase(table):
+            stats = load(cur, table, columns, rows)
+            inst.add_rows(stats.rows)
+        return stats
+
+    def on_done(task, stats):
+        rows, nbytes = totals.get(task.spec.table, (0, 0))
+        totals[task.spec.table] = (rows + stats.rows, nbytes + stats.bytes)
+        if workers > 1:
+            # Worker chạy trên kết nối riêng nên lấy số liệu từ LoadStats:
+            # wall và CPU cộng dồn qua các shard, một lệnh COPY mỗi shard
+            inst.record(task.spec.table, rows=stats.rows, bytes_sent=stats.bytes,
+                        wall_s=stats.seconds, statements=1, cpu_s=stats.cpu_s,
+                        rss_mb=stats.rss_high_water_mb)
+        print(f'   ✓ {task.name}: {stats.rows:,} dòng ({stats.rows_per_second:,.0f} dòng/s)')
+
+    tasks = plan_tasks(cfg, specs, workers)
+    elapsed = run_tasks(cfg, tasks, workers, on_done, cur=cur,
+                        load=load if workers > 1 else load_in_phase)
+    with inst.phase('reset sequence'):
+        reset_service_sequence(cur)
+
+    print()
+    for spec in specs:
+        rows, nbytes = totals.get(spec.table, (0, 0))
+        print(f'✅ Đã tạo {rows:,} {spec.label} ({nbytes / 1e6:.1f} MB)')
+
+    total_rows = sum(rows for rows, _ in totals.values())
+    print(f'\n⚡ Tổng: {total_rows:,} dòng trong {elapsed:.2f}s '
+          f'({total_rows / max(elapsed, 1e-9):,.0f} dòng/s)')
+
+
+def print_scale_logins(cfg):
+    print('\n🔑 THÔNG TIN ĐĂNG NHẬP:')
+    for label, email in (('Chủ căn hộ', 'resident0000000.0@bluemoon.vn'),
+                         ('Bảo vệ', 'guard1@bluemoon.vn'),
+                         ('Admin', 'admin1@bluemoon.vn'),
+                         ('Kế toán', 'accountant1@bluemoon.vn')):
+        password = password_for(cfg.password_strategy, email, cfg.password_pool_size)
+        print(f'   {label}: {email} / {password}')
+
+
+def seed_scale(cur, cfg, workers=1, inst=None):
+    months = cfg.month_keys
+    print(f'📐 Chế độ scale: {cfg.apartments:,} căn hộ, {len(months)} tháng '
+          f'({months[0]} → {months[-1]}), {cfg.residents_min}-{cfg.residents_max} cư dân/căn hộ')
+    if workers > 1:
+        print(f'🧵 Nạp song song với {workers} tiến trình')
+
+    # apartments."ID_owner" được sinh trước (không có khóa ngoại), nên không
+    # còn vòng UPDATE apartments sau khi tạo cư dân
+    load_tables(cur, cfg, SCALE_TABLES, workers, inst=inst)
+    print_scale_logins(cfg)
+
+
+def has_base_data(cur):
+    cur.execute('SELECT EXISTS (SELECT 1 FROM apartments)')
+    return cur.fetchone()[0]
+
+
+def with_existing_state(cur, cfg):
+    """Record which months and shift days are already loaded."""
+    cur.execute('SELECT DISTINCT month FROM services')
+    existing_months = frozenset(row[0] for row in cur.fetchall())
+    cur.execute('SELECT MAX(date) FROM shifts')
+    last_shift = cur.fetchone()[0]
+    shifts_from = last_shift.date() + timedelta(days=1) if last_shift else None
+    return dataclasses.replace(cfg, existing_months=existing_months, shifts_from=shifts_from)
+
+
+def seed_incremental(cur, cfg, workers=1, inst=None):
+    """
+    Add only what a previous run with the same --apartments/--seed is missing:
+    new billing months (services, invoices, notifications, complaints) and
+    shifts after the last scheduled day. Apartments and residents are left
+    untouched. Rows go through upsert_rows, so re-running is a no-op.
+    """
+    inst = inst or Instrument()
+    with inst.phase('existing state'):
+        cfg = with_existing_state(cur, cfg)
+    months = [month for _, month in cfg.pending_months()]
+    print(f'🔁 Chế độ incremental: {cfg.apartments:,} căn hộ, '
+          f'tháng còn thiếu: {", ".join(months) or "không có"}, '
+          f'ca trực từ {cfg.shifts_from or "đầu kỳ"}')
+
+    load_tables(cur, cfg, [spec for spec in SCALE_TABLES if spec.incremental], workers,
+                load=upsert_rows, inst=inst)
+    print_scale_logins(cfg)
+
+
+def parse_range(value):
+    low, _, high = value.partition('-')
+    return int(low), int(high or low)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Seed dữ liệu cho BlueMoon')
+    parser.add_argument('--apartments', type=int,
+                        help='Bật chế độ scale với số căn hộ chỉ định (mặc định: dữ liệu demo)')
+    parser.add_argument('--months', type=int, default=12, help='Số tháng hóa đơn cần sinh')
+    parser.add_argument('--end-month', help='Tháng cuối cùng (YYYY-MM), mặc định tháng hiện tại')
+    parser.add_argument('--residents-per-apartment', type=parse_range, default=(1, 6),
+                        help='Khoảng số cư dân mỗi căn hộ, ví dụ 1-6')
+    parser.add_argument('--guards', type=int, default=12)
+    parser.add_argument('--staff-per-role', type=int, default=2,
+                        help='Số tài khoản admin/accountant/police mỗi vai trò')
+    parser.add_argument('--notifications-per-month', type=int, default=4)
+    parser.add_argument('--notification-reach', type=float, default=0.2,
+                        help='Tỉ lệ căn hộ nhận mỗi thông báo')
+    parser.add_argument('--complaint-rate', type=float, default=0.05,
+                        help='Xác suất một căn hộ khiếu nại trong một tháng')
+    parser.add_argument('--seed', type=int, default=42, help='Seed cho bộ sinh ngẫu nhiên')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Số tiến trình nạp song song (mỗi tiến trình một kết nối)')
+    parser.add_argument('--password-strategy', choices=STRATEGIES, default='shared',
+                        help='shared: mọi tài khoản dùng "123"; pool: xoay vòng N mật khẩu; '
+                             'unique: mỗi tài khoản một mật khẩu riêng')
+    parser.add_argument('--password-pool-size', type=int, default=100)
+    parser.add_argument('--bcrypt-cost', type=int, default=DEFAULT_COST,
+                        help=f'Cost factor của bcrypt (mặc định {DEFAULT_COST}, '
+                             'giảm cho môi trường load test, ví dụ 10)')
+    parser.add_argument('--hash-workers', type=int,
+                        help='Số tiến trình băm mật khẩu (mặc định: số CPU)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Chỉ bổ sung tháng/ca trực còn thiếu thay vì xóa và nạp lại '
+                             '(cần cùng --apartments/--seed với lần nạp đầu)')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='ID (theo --seed) và thời gian cố định: mỗi lần chạy sinh cùng dữ liệu')
+    parser.add_argument('--today', type=date.fromisoformat,
+                        help=f'Với --deterministic: ngày hiện tại giả lập '
+                             f'(mặc định {DETERMINISTIC_TODAY.isoformat()})')
+    parser.add_argument('--report', metavar='PATH',
+                        help='Đo thời gian/CPU/số dòng/số lệnh/bytes/RSS từng giai đoạn, '
+                             'in bảng tổng kết và ghi báo cáo JSON vào PATH')
+    parser.add_argument('--profile', action='store_true',
+                        help='Đo từng giai đoạn như --report nhưng chỉ in bảng tổng kết')
+    parser.add_argument('--cprofile', metavar='PATH',
+                        help='Chạy dưới cProfile và ghi thống kê (pstats) vào PATH')
+    args = parser.parse_args(argv)
+    if args.incremental and not args.apartments:
+        parser.error('--incremental chỉ dùng được với --apartments')
+    if args.today and not args.deterministic:
+        parser.error('--today chỉ dùng được với --deterministic')
+    return args
+
+
+def scale_config(args):
+    return gen.ScaleConfig(
+        apartments=args.apartments,
+        months=args.months,
+        residents_min=args.residents_per_apartment[0],
+        residents_max=args.residents_per_apartment[1],
+        guards=args.guards,
+        staff_per_role=args.staff_per_role,
+        notifications_per_month=args.notifications_per_month,
+        notification_reach=args.notification_reach,
+        complaint_rate=args.complaint_rate,
+        end_month=args.end_month,
+        seed=args.seed,
+        password_strategy=args.password_strategy,
+        password_pool_size=args.password_pool_size,
+        today=fixed_today(args),
+    )
+
+
+def fixed_today(args):
+    if not args.deterministic:
+        return None
+    return args.today or DETERMINISTIC_TODAY
+
+
+def with_password_hashes(cfg, args, inst=None):
+    inst = inst or Instrument()
+    inst.mark('hash passwords')
+    cache = HashCache(args.bcrypt_cost)
+    hashes, computed = cache.hash_all(gen.account_passwords(cfg), workers=args.hash_workers)
+    print(f'🔐 {len(hashes):,} mật khẩu (cost {args.bcrypt_cost}), '
+          f'{computed:,} hash mới, {len(hashes) - computed:,} lấy từ cache')
+    inst.add_rows(len(hashes))
+    inst.stop()
+    return dataclasses.replace(cfg, password_hashes=hashes)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    measure = bool(args.report or args.profile)
+
+    # Kết nối database; khi đo thì dùng cursor đếm số lệnh và bytes gửi đi
+    conn = connect(**(instrument.connection_kwargs() if measure else {}))
+    cur = conn.cursor()
+    inst = Instrument(enabled=measure, conn=conn)
+    profiler = cProfile.Profile() if args.cprofile else None
+    if profiler:
+        profiler.enable()
+
+    try:
+        print('🌱 Bắt đầu seed dữ liệu...')
+
+        if args.incremental and has_base_data(cur):
+            seed_incremental(cur, scale_config(args), args.workers, inst)
+            return
+
+        with inst.phase('truncate'):
+            truncate_all(cur)
+        print('✅ Đã xóa dữ liệu cũ')
+
+        if args.apartments:
+            cfg = with_password_hashes(scale_config(args), args, inst)
+            seed_scale(cur, cfg, args.workers, inst)
+        else:
+            with inst.phase('hash passwords'):
+                hashes, _ = HashCache(args.bcrypt_cost).hash_all([DEFAULT_PASSWORD])
+            if args.deterministic:
+                seed_demo(cur, hashes[DEFAULT_PASSWORD], inst, random.Random(args.seed),
+                          datetime.combine(fixed_today(args), gen.SEED_TIME))
+            else:
+                seed_demo(cur, hashes[DEFAULT_PASSWORD], inst)
+
+    except Exception as e:
+        print(f'\n❌ LỖI: {e}')
+        import traceback
+        traceback.print_exc()
+        conn.rollback()
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f'\n🔬 Đã ghi cProfile vào {args.cprofile} (python -m pstats {args.cprofile})')
+        inst.print_summary()
+        if args.report:
+            inst.write_report(args.report, sys.argv[1:] if argv is None else argv)
+            print(f'📄 Đã ghi báo cáo vào {args.report}')
+        cur.close()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
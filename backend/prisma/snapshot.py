@@ -0,0 +1,362 @@
+"""
+Export/import a database as chunked, gzip-compressed binary COPY files.
+
+Export covers every model in schema.prisma, including the aggregates.py
+summary tables. It splits every table (or each partition of a partitioned
+table) into ctid page ranges of about --chunk-mb and streams each range
+with COPY ... TO STDOUT (FORMAT binary) from a pool of workers. A ctid
+range is read with a TID Range Scan only on PostgreSQL 14 and later; older
+servers fall back to a sequential scan of the whole table per chunk, so
+use a single large chunk there. All workers share one exported snapshot,
+so the dump is consistent. A manifest.json records tables in dependency
+order, their columns, chunk files, row counts and sequence values.
+
+Import disables the user triggers of the target tables (the aggregates.py
+delta triggers would otherwise record one delta per restored row),
+truncates the tables and drops their foreign keys and secondary indexes,
+all in one transaction. It then loads every chunk in parallel, rebuilds
+the indexes (also in parallel), re-adds the foreign keys, re-enables the
+triggers and restores the sequences. If any step after the truncate
+fails, the tables are emptied again and the indexes, foreign keys and
+triggers are put back before the error is re-raised, so a failed import
+leaves an empty but complete schema. The dropped DDL is also written to
+deferred.sql next to the manifest. Finally the summary tables are checked
+against a fresh aggregates rebuild and rebuilt if they differ.
+
+Binary COPY requires identical column types on both sides: create the
+target schema with `prisma db push` from the same schema.prisma first.
+
+    python prisma/snapshot.py export dumps/prod --workers 8
+    python prisma/snapshot.py import dumps/prod --workers 8
+"""
+import argparse
+import gzip
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import psycopg2.errors
+
+import aggregates
+from db import connect
+import prisma_schema
+
+
+FORMAT = 'pgcopy-binary-gzip'
+MANIFEST = 'manifest.json'
+DEFERRED_DDL = 'deferred.sql'
+# Mọi bảng trong schema.prisma (kể cả bảng tổng hợp), bảng cha trước bảng con
+TABLES = tuple(prisma_schema.load().dependency_order())
+
+
+def table_columns(cur, table):
+    cur.execute(
+        """
+        SELECT quote_ident(attname) FROM pg_attribute
+        WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+        ORDER BY attnum
+        """,
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def leaf_relations(cur, table):
+    """The table itself, or its leaf partitions when it is partitioned."""
+    cur.execute(
+        """
+        SELECT relid::regclass::text FROM pg_partition_tree(%s::regclass)
+        WHERE isleaf
+        """,
+        (table,),
+    )
+    return [row[0] for row in cur.fetchall()] or [table]
+
+
+def page_ranges(cur, relation, pages_per_chunk):
+    """[(start, stop)] page ranges covering `relation`; the last one is open-ended."""
+    cur.execute("SELECT pg_relation_size(%s::regclass) / current_setting('block_size')::int",
+                (relation,))
+    pages = cur.fetchone()[0]
+    starts = list(range(0, max(pages, 1), pages_per_chunk))
+    return [(start, starts[i + 1] if i + 1 < len(starts) else None)
+            for i, start in enumerate(starts)]
+
+
+def sequences(cur, table, columns):
+    found = []
+    for column in columns:
+        cur.execute('SELECT pg_get_serial_sequence(%s, %s)', (table, column.strip('"')))
+        name = cur.fetchone()[0]
+        if name:
+            cur.execute(f'SELECT last_value, is_called FROM {name}')
+            value, is_called = cur.fetchone()
+            found.append({'name': name, 'value': value, 'is_called': is_called})
+    return found
+
+
+def _export_chunk(job):
+    snapshot, relation, columns, pages, path, compresslevel = job
+    conn = connect(autocommit=False)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cur.execute('SET TRANSACTION SNAPSHOT %s', (snapshot,))
+            where = f"ctid >= '({pages[0]},0)'::tid"
+            if pages[1] is not None:
+                where += f" AND ctid < '({pages[1]},0)'::tid"
+            with gzip.open(path, 'wb', compresslevel=compresslevel) as out:
+                cur.copy_expert(
+                    f'COPY (SELECT {", ".join(columns)} FROM ONLY {relation} WHERE {where}) '
+                    'TO STDOUT WITH (FORMAT binary)',
+                    out,
+                )
+            rows = cur.rowcount
+        conn.rollback()
+    finally:
+        conn.close()
+    return rows, os.path.getsize(path)
+
+
+def export_snapshot(directory, workers=4, chunk_mb=128, compresslevel=1):
+    os.makedirs(directory, exist_ok=True)
+    pages_per_chunk = max(1, chunk_mb * 1024 * 1024 // 8192)
+    started = time.perf_counter()
+
+    # Giữ transaction này mở để các worker dùng chung snapshot
+    conn = connect(autocommit=False)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+            cur.execute('SELECT pg_export_snapshot()')
+            snapshot = cur.fetchone()[0]
+
+            manifest = {
+                'format': FORMAT,
+                'version': 1,
+                'created_at': datetime.now().isoformat(timespec='seconds'),
+                'tables': [],
+            }
+            jobs = []
+            for table in TABLES:
+                columns = table_columns(cur, table)
+                entry = {'name': table, 'columns': columns, 'chunks': [],
+                         'sequences': sequences(cur, table, columns)}
+                for relation in leaf_relations(cur, table):
+                    for pages in page_ranges(cur, relation, pages_per_chunk):
+                        filename = f'{table}.{len(entry["chunks"]):05d}.copy.gz'
+                        entry['chunks'].append({'file': filename, 'relation': relation})
+                        jobs.append((snapshot, relation, columns, pages,
+                                     os.path.join(directory, filename), compresslevel))
+                manifest['tables'].append(entry)
+
+            chunks = [chunk for entry in manifest['tables'] for chunk in entry['chunks']]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for chunk, (rows, nbytes) in zip(chunks, pool.map(_export_chunk, jobs)):
+                    chunk.update(rows=rows, bytes=nbytes)
+        conn.rollback()
+    finally:
+        conn.close()
+
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest, time.perf_counter() - started
+
+
+def deferred_ddl(cur, tables):
+    """(drop statements, create statements) for FKs and secondary indexes on `tables`."""
+    cur.execute(
+        """
+        SELECT conrelid::regclass::text, quote_ident(conname), pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])
+        ORDER BY 1, 2
+        """,
+        (list(tables),),
+    )
+    foreign_keys = cur.fetchall()
+    cur.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        ORDER BY 1
+        """,
+        (list(tables),),
+    )
+    indexes = cur.fetchall()
+
+    drops = [f'ALTER TABLE {table} DROP CONSTRAINT {name}' for table, name, _ in foreign_keys]
+    drops += [f'DROP INDEX {name}' for name, _ in indexes]
+    index_creates = [definition for _, definition in indexes]
+    fk_creates = [f'ALTER TABLE {table} ADD CONSTRAINT {name} {definition}'
+                  for table, name, definition in foreign_keys]
+    return drops, index_creates, fk_creates
+
+
+def _import_chunk(job):
+    table, columns, path = job
+    conn = connect()
+    try:
+        with conn.cursor() as cur, gzip.open(path, 'rb') as source:
+            cur.copy_expert(
+                f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT binary)',
+                source,
+                size=1 << 20,
+            )
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+def _execute(statement):
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(statement)
+    finally:
+        conn.close()
+
+
+def user_triggers(cur, tables):
+    """(table, trigger) of the enabled, non-internal triggers on `tables`."""
+    cur.execute(
+        """
+        SELECT tgrelid::regclass::text, quote_ident(tgname) FROM pg_trigger
+        WHERE tgrelid = ANY(%s::regclass[]) AND NOT tgisinternal AND tgenabled <> 'D'
+        ORDER BY 1, 2
+        """,
+        (list(tables),),
+    )
+    return cur.fetchall()
+
+
+def set_triggers(cur, triggers, enabled):
+    action = 'ENABLE' if enabled else 'DISABLE'
+    for table, trigger in triggers:
+        cur.execute(f'ALTER TABLE {table} {action} TRIGGER {trigger}')
+
+
+def recover(tables, index_creates, fk_creates, triggers):
+    """
+    After a failed load: empty the tables (partial data could break the
+    foreign keys), then put back whatever DDL is still missing.
+    """
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f'TRUNCATE {", ".join(tables)} RESTART IDENTITY CASCADE')
+            for statement in index_creates + fk_creates:
+                try:
+                    cur.execute(statement)
+                except (psycopg2.errors.DuplicateTable, psycopg2.errors.DuplicateObject):
+                    pass  # Index/FK đã được tạo lại trước khi lỗi xảy ra
+            set_triggers(cur, triggers, enabled=True)
+    finally:
+        conn.close()
+
+
+def import_snapshot(directory, workers=4):
+    with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT:
+        raise ValueError(f'Định dạng snapshot không hỗ trợ: {manifest.get("format")}')
+
+    tables = [entry['name'] for entry in manifest['tables']]
+    started = time.perf_counter()
+    timings = {}
+    conn = connect(autocommit=False)
+    try:
+        with conn.cursor() as cur:
+            drops, index_creates, fk_creates = deferred_ddl(cur, tables)
+            triggers = user_triggers(cur, tables)
+            with open(os.path.join(directory, DEFERRED_DDL), 'w', encoding='utf-8') as f:
+                f.writelines(f'{statement};\n' for statement in index_creates + fk_creates)
+                f.writelines(f'ALTER TABLE {table} ENABLE TRIGGER {trigger};\n'
+                             for table, trigger in triggers)
+
+            # Một transaction: lỗi ở đây thì rollback, DB giữ nguyên như trước khi import
+            set_triggers(cur, triggers, enabled=False)
+            cur.execute(f'TRUNCATE {", ".join(tables)} RESTART IDENTITY CASCADE')
+            for statement in drops:
+                cur.execute(statement)
+        conn.commit()
+        conn.autocommit = True
+
+        jobs = [(entry['name'], entry['columns'], os.path.join(directory, chunk['file']))
+                for entry in manifest['tables'] for chunk in entry['chunks']]
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                loaded = sum(pool.map(_import_chunk, jobs))
+                timings['load'] = time.perf_counter() - started
+
+                # Index độc lập với nhau nên dựng song song; FK cần index của bảng cha
+                list(pool.map(_execute, index_creates))
+                timings['indexes'] = time.perf_counter() - started - timings['load']
+            with conn.cursor() as cur:
+                for statement in fk_creates:
+                    cur.execute(statement)
+                set_triggers(cur, triggers, enabled=True)
+        except BaseException:
+            recover(tables, index_creates, fk_creates, triggers)
+            raise
+
+        with conn.cursor() as cur:
+            for entry in manifest['tables']:
+                for sequence in entry['sequences']:
+                    cur.execute('SELECT setval(%s, %s, %s)',
+                                (sequence['name'], sequence['value'], sequence['is_called']))
+            cur.execute(f'ANALYZE {", ".join(tables)}')
+        timings['stale_summaries'] = aggregates.verify(conn)
+    except Exception:
+        if not conn.autocommit:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return manifest, loaded, timings, time.perf_counter() - started
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Xuất/nhập snapshot dữ liệu bằng binary COPY')
+    sub = parser.add_subparsers(dest='command', required=True)
+    export = sub.add_parser('export', help='Xuất DB hiện tại ra thư mục')
+    export.add_argument('directory')
+    export.add_argument('--workers', type=int, default=4)
+    export.add_argument('--chunk-mb', type=int, default=128,
+                        help='Kích thước (trước nén) của mỗi file chunk')
+    export.add_argument('--compress-level', type=int, default=1, choices=range(0, 10))
+    restore = sub.add_parser('import', help='Nạp snapshot vào DB (xóa dữ liệu hiện có)')
+    restore.add_argument('directory')
+    restore.add_argument('--workers', type=int, default=4)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'export':
+        manifest, elapsed = export_snapshot(args.directory, args.workers, args.chunk_mb,
+                                            args.compress_level)
+        total_rows = total_bytes = 0
+        for entry in manifest['tables']:
+            rows = sum(chunk['rows'] for chunk in entry['chunks'])
+            nbytes = sum(chunk['bytes'] for chunk in entry['chunks'])
+            total_rows, total_bytes = total_rows + rows, total_bytes + nbytes
+            print(f'   ✓ {entry["name"]}: {rows:,} dòng, {len(entry["chunks"])} chunk, '
+                  f'{nbytes / 1e6:.1f} MB')
+        print(f'\n✅ Đã xuất {total_rows:,} dòng ({total_bytes / 1e6:.1f} MB nén) '
+              f'vào {args.directory} trong {elapsed:.2f}s')
+    else:
+        manifest, loaded, timings, elapsed = import_snapshot(args.directory, args.workers)
+        print(f'✅ Đã nạp {loaded:,} dòng từ {args.directory} trong {elapsed:.2f}s '
+              f'(COPY {timings["load"]:.2f}s, index {timings["indexes"]:.2f}s)')
+        if timings['stale_summaries']:
+            print(f'⚠️  {timings["stale_summaries"]:,} dòng tổng hợp lệch với invoices, '
+                  'đã dựng lại bảng tổng hợp')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Các script trong prisma/ import lẫn nhau theo tên module (chạy bằng python prisma/<script>.py)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
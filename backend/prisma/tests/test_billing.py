@@ -0,0 +1,29 @@
+import numpy as np
+
+from billing import allocate
+
+
+def test_rows_sum_to_rounded_totals():
+    rng = np.random.default_rng(0)
+    totals = rng.uniform(0, 10_000_000, size=5)
+    weights = rng.uniform(0, 120, size=(5, 37))
+    shares = allocate(totals, weights)
+    assert shares.dtype == np.int64
+    assert shares.shape == (5, 37)
+    assert (shares.sum(axis=1) == np.rint(totals)).all()
+
+
+def test_shares_follow_weights():
+    shares = allocate([1000], [[1, 3]])
+    assert shares.tolist() == [[250, 750]]
+
+
+def test_largest_remainder_gets_the_extra_unit():
+    shares = allocate([10], [[1, 1, 1]])
+    assert sorted(shares[0].tolist()) == [3, 3, 4]
+    assert allocate([2], [[1, 2]]).tolist() == [[1, 1]]
+
+
+def test_zero_weights_fall_back_to_equal_shares():
+    shares = allocate([90, 60], [[0, 0, 0], [1, 0, 1]])
+    assert shares.tolist() == [[30, 30, 30], [30, 0, 30]]
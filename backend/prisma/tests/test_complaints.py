@@ -0,0 +1,57 @@
+import itertools
+from datetime import datetime
+
+from complaints import SimConfig, simulate
+
+START = datetime(2026, 1, 1)
+
+
+def events(cfg, count=2_000):
+    return list(itertools.islice(simulate(cfg, ['r1', 'r2', 'r3']), count))
+
+
+def test_events_are_time_ordered():
+    stream = events(SimConfig(arrivals_per_hour=3.0, start=START))
+    times = [event.time for event in stream]
+    assert times == sorted(times)
+    assert times[0] >= START
+
+
+def test_each_complaint_arrives_starts_then_resolves():
+    seen = {}
+    for event in events(SimConfig(arrivals_per_hour=2.0, start=START)):
+        seen.setdefault(event.complaint_id, []).append(event.kind)
+    for kinds in seen.values():
+        assert kinds == ['arrive', 'start', 'resolve'][:len(kinds)]
+
+
+def test_handlers_are_never_oversubscribed():
+    cfg = SimConfig(arrivals_per_hour=5.0, start=START)
+    busy = {role: 0 for role in cfg.handlers}
+    for event in events(cfg, 5_000):
+        if event.kind == 'start':
+            busy[event.role] += 1
+        elif event.kind == 'resolve':
+            busy[event.role] -= 1
+        assert 0 <= busy[event.role] <= cfg.handlers[event.role]
+
+
+def test_arrivals_carry_content_from_the_resident_pool():
+    arrivals = [event for event in events(SimConfig(start=START)) if event.kind == 'arrive']
+    assert arrivals
+    assert {event.content[0] for event in arrivals} <= {'r1', 'r2', 'r3'}
+    assert {event.role for event in arrivals} <= {'admin', 'guard'}
+
+
+def test_same_seed_is_deterministic():
+    cfg = SimConfig(start=START, seed=9)
+    assert events(cfg, 500) == events(cfg, 500)
+
+
+def test_horizon_covers_requested_arrivals():
+    cfg = SimConfig(arrivals_per_hour=4.0, start=START)
+    assert cfg.horizon_hours(400) == (400 + 3 * 20) / 4.0
+    end = START.timestamp() + cfg.horizon_hours(400) * 3600
+    arrivals = [event for event in events(cfg, 5_000)
+                if event.kind == 'arrive' and event.time.timestamp() <= end]
+    assert len(arrivals) >= 400
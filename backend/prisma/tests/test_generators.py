@@ -0,0 +1,69 @@
+from datetime import date
+
+import pytest
+
+import generators as gen
+
+
+@pytest.fixture
+def cfg():
+    base = gen.ScaleConfig(apartments=40, months=3, guards=4, today=date(2026, 1, 15))
+    hashes = {password: f'hash:{password}' for password in gen.account_passwords(base)}
+    return gen.ScaleConfig(apartments=40, months=3, guards=4, today=date(2026, 1, 15),
+                           password_hashes=hashes)
+
+
+def sharded(generate, cfg, size=7):
+    rows = []
+    for start in range(0, cfg.apartments, size):
+        rows.extend(generate(cfg, (start, start + size)))
+    return rows
+
+
+def test_row_widths_match_columns(cfg):
+    assert {len(row) for row in gen.generate_apartments(cfg)} == {len(gen.APARTMENT_COLUMNS)}
+    assert {len(row) for row in gen.generate_residents(cfg)} == {len(gen.RESIDENT_COLUMNS)}
+    assert {len(row) for row in gen.generate_invoices(cfg)} == {len(gen.INVOICE_COLUMNS)}
+    assert {len(row) for row in gen.generate_shifts(cfg)} == {len(gen.SHIFT_COLUMNS)}
+
+
+@pytest.mark.parametrize('generate', [gen.generate_apartments, gen.generate_residents,
+                                      gen.generate_invoices, gen.generate_complains])
+def test_ids_are_unique(cfg, generate):
+    ids = [row[0] for row in generate(cfg)]
+    assert len(ids) == len(set(ids))
+
+
+def test_shift_and_service_ids_are_unique(cfg):
+    shifts = [row[0] for row in gen.generate_shifts(cfg)]
+    services = [row[0] for row in gen.generate_services(cfg)]
+    assert len(shifts) == len(set(shifts))
+    assert len(services) == len(set(services)) == len(gen.SERVICE_TYPES) * cfg.months
+
+
+def test_foreign_keys_point_at_generated_rows(cfg):
+    apartments = {row[0] for row in gen.generate_apartments(cfg)}
+    residents = {row[0] for row in gen.generate_residents(cfg)}
+    services = {row[0] for row in gen.generate_services(cfg)}
+    assert {row[1] for row in gen.generate_residents(cfg)} - {None} <= apartments
+    assert {row[4] for row in gen.generate_apartments(cfg)} <= residents
+    assert {row[1] for row in gen.generate_invoices(cfg)} <= services
+    assert {row[2] for row in gen.generate_invoices(cfg)} <= residents
+    assert {row[3] for row in gen.generate_shifts(cfg)} == set(gen.guard_ids(cfg))
+    assert {row[1] for row in gen.generate_complains(cfg)} <= residents
+
+
+@pytest.mark.parametrize('generate', [gen.generate_apartments, gen.generate_residents,
+                                      gen.generate_invoices, gen.generate_resident_notifications,
+                                      gen.generate_complains])
+def test_sharded_output_matches_unsharded(cfg, generate):
+    assert sorted(sharded(generate, cfg)) == sorted(generate(cfg))
+
+
+def test_same_seed_is_deterministic(cfg):
+    assert list(gen.generate_residents(cfg)) == list(gen.generate_residents(cfg))
+
+
+def test_service_id_is_stable_across_months():
+    assert gen.service_id('2000-01', 0) == 1
+    assert gen.service_id('2026-02', 0) - gen.service_id('2026-01', 0) == len(gen.SERVICE_TYPES)
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+import prisma_schema
+
+SCHEMA_TEXT = '''
+enum Role {
+  admin
+  resident
+}
+
+model Apartment {
+  id        String     @id @map("ID_Apartment")
+  name      String     @map("Name") // tên căn hộ
+  residents Resident[]
+
+  @@map("apartments")
+}
+
+model Resident {
+  id          String     @id @default(uuid()) @map("ID_Resident")
+  apartmentId String?    @map("ID_apartment")
+  apartment   Apartment? @relation(fields: [apartmentId], references: [id])
+  email       String     @unique
+  role        Role       @default(resident)
+  updatedAt   DateTime   @updatedAt @map("updated_at") @db.Timestamp(3)
+
+  @@index([apartmentId, updatedAt(sort: Desc)])
+  @@map("residents")
+}
+'''
+
+
+@pytest.fixture
+def schema():
+    return prisma_schema.parse(SCHEMA_TEXT)
+
+
+def test_tables_and_columns(schema):
+    assert schema.columns('residents', 'id', 'email') == ('"ID_Resident"', 'email')
+    assert schema.model('Apartment').table == 'apartments'
+    assert schema.columns('apartments') == ('"ID_Apartment"', '"Name"')
+
+
+def test_field_attributes(schema):
+    resident = schema.model('residents')
+    assert resident.primary_key == ('id',)
+    assert resident.unique == (('email',),)
+    assert resident.indexes == (('apartmentId', 'updatedAt'),)
+    updated = resident.field('updatedAt')
+    assert updated.updated_at and updated.db_type == 'Timestamp'
+    assert resident.field('apartmentId').optional
+    assert resident.field('id').default == 'uuid()'
+
+
+def test_relations_and_dependency_order(schema):
+    apartment = schema.model('residents').field('apartment')
+    assert apartment.is_relation
+    assert apartment.relation_fields == ('apartmentId',) and apartment.references == ('id',)
+    assert schema.depends_on('residents') == ('apartments',)
+    assert schema.dependency_order(['residents', 'apartments']) == ['apartments', 'residents']
+    with pytest.raises(ValueError):
+        schema.columns('residents', 'apartment')
+
+
+def test_unknown_names_raise(schema):
+    with pytest.raises(KeyError):
+        schema.model('missing')
+    with pytest.raises(KeyError):
+        schema.columns('residents', 'missing')
+
+
+def test_quote_ident():
+    assert prisma_schema.quote_ident('email') == 'email'
+    assert prisma_schema.quote_ident('ID_Resident') == '"ID_Resident"'
+    assert prisma_schema.quote_ident('desc') == '"desc"'
+
+
+def test_load_round_trips_through_cache(tmp_path):
+    path = tmp_path / 'schema.prisma'
+    path.write_text(SCHEMA_TEXT, encoding='utf-8')
+    cache = tmp_path / 'cache'
+    parsed = prisma_schema.load.__wrapped__(str(path), str(cache))
+    assert len(os.listdir(cache)) == 1
+    cached = prisma_schema.load.__wrapped__(str(path), str(cache))
+    assert cached.to_json() == parsed.to_json()
+
+    path.write_text(SCHEMA_TEXT + '\nmodel Extra {\n  id Int @id\n}\n', encoding='utf-8')
+    prisma_schema.load.__wrapped__(str(path), str(cache))
+    assert len(os.listdir(cache)) == 1
+
+
+def test_repository_schema_parses():
+    schema = prisma_schema.parse(open(prisma_schema.SCHEMA_PATH, encoding='utf-8').read())
+    order = schema.dependency_order()
+    assert order.index('apartments') < order.index('residents') < order.index('invoices')
@@ -0,0 +1,52 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import reports
+
+
+def where_clause(sql):
+    return sql.split('WHERE', 1)[1].split('AND', 1)[0].strip()
+
+
+def test_temporary_full_export_keeps_only_residents_away():
+    sql = reports.DATASETS['temporary'].query()
+    assert where_clause(sql) == 'r."temporaryStatus"'
+
+
+def test_temporary_delta_includes_residents_who_came_back():
+    sql = reports.DATASETS['temporary'].query(since=datetime(2026, 1, 1))
+    assert where_clause(sql) == 'TRUE'
+    assert 'r."temporaryStatus"' in sql.split('FROM', 1)[0]
+
+
+def test_residents_query_does_not_depend_on_since():
+    dataset = reports.DATASETS['residents']
+    assert dataset.query() == dataset.query(since=datetime(2026, 1, 1))
+
+
+def test_every_query_has_its_parameters():
+    for dataset in reports.DATASETS.values():
+        for since in (None, datetime(2026, 1, 1)):
+            sql = dataset.query(since)
+            assert '{' not in sql
+            assert '%(since)s' in sql and '%(roles)s' in sql
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2026-03-01T10:00:00', datetime(2026, 3, 1, 10)),
+    ('2026-03-01T10:00:00Z', datetime(2026, 3, 1, 10)),
+    ('2026-03-01T17:00:00+07:00', datetime(2026, 3, 1, 10)),
+    ('2026-03-01T02:00:00-08:00', datetime(2026, 3, 1, 10)),
+    ('2026-03-01', datetime(2026, 3, 1)),
+])
+def test_parse_timestamp_returns_naive_utc(value, expected):
+    parsed = reports.parse_timestamp(value)
+    assert parsed == expected and parsed.tzinfo is None
+
+
+def test_parse_since_reuses_manifest_until_minus_overlap(tmp_path):
+    (tmp_path / reports.MANIFEST).write_text(json.dumps({'until': '2026-03-01T10:00:00Z'}))
+    assert reports.parse_since(str(tmp_path)) == datetime(2026, 3, 1, 10) - reports.DELTA_OVERLAP
+    assert reports.parse_since(None) is None
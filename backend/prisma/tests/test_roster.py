@@ -0,0 +1,68 @@
+import random
+from datetime import date
+
+import numpy as np
+
+import roster
+from roster import (MORNING, NIGHT, OTHER_GUARD, UNASSIGNED, Roster, RosterProblem, greedy,
+                    local_search, solve)
+
+
+def problem(guards=5, days=14, **options):
+    return RosterProblem(start=date(2026, 3, 2), days=days, guard_ids=[f'g{i}' for i in range(guards)],
+                         available=np.ones((guards, days), dtype=bool), **options)
+
+
+def test_solution_has_no_hard_violations():
+    p = problem()
+    p.available[0, 3] = False
+    solved, _ = solve(p, seed=1)
+    assert solved.hard_violations() == []
+    assert (solved.assigned >= 0).all()
+    assert solved.assigned[3, :].tolist().count(0) == 0
+
+
+def test_local_search_never_makes_greedy_worse():
+    p = problem(guards=4, days=21, max_per_week=6)
+    rng = random.Random(7)
+    start = greedy(Roster(p), rng)
+    before = int((start.totals ** 2).sum())
+    local_search(start, rng)
+    assert start.hard_violations() == []
+    assert int((start.totals ** 2).sum()) <= before
+
+
+def test_local_search_balances_shifts():
+    solved, _ = solve(problem(guards=6, days=28), seed=3)
+    assert solved.totals.max() - solved.totals.min() <= 1
+
+
+def test_no_morning_right_after_night():
+    solved, _ = solve(problem(guards=4, days=14), seed=5)
+    for d in range(1, 14):
+        assert solved.assigned[d, MORNING] != solved.assigned[d - 1, NIGHT]
+
+
+def test_night_before_start_blocks_first_morning():
+    solved, _ = solve(problem(night_before=2), seed=0)
+    assert solved.assigned[0, MORNING] != 2
+
+
+def test_week_before_counts_toward_max_per_week():
+    # Thứ Tư: 2 ngày đầu tuần đã trực đủ 5 ca, chỉ còn 1 ca được xếp trong tuần này
+    p = RosterProblem(start=date(2026, 3, 4), days=5, guard_ids=['a', 'b', 'c', 'd'],
+                      available=np.ones((4, 5), dtype=bool), max_per_week=6,
+                      week_before=np.array([5, 0, 0, 0]))
+    solved, _ = solve(p, seed=0)
+    assert solved.hard_violations() == []
+    assert (solved.assigned == 0).sum() <= 1
+
+
+def test_pinned_shifts_of_other_guards_are_kept():
+    pinned = np.full((14, len(roster.SHIFT_TYPES)), UNASSIGNED, dtype=np.int64)
+    pinned[0, :] = OTHER_GUARD
+    pinned[1, MORNING] = 1
+    solved, _ = solve(problem(pinned=pinned), seed=0)
+    assert (solved.assigned[0] == OTHER_GUARD).all()
+    assert solved.assigned[1, MORNING] == 1
+    assert solved.hard_violations() == []